@@ -0,0 +1,83 @@
+"""
+Compare the JSON-RPC batch backend with the Multicall3 aggregate3 backend.
+
+Run from the repository root with the usual .env (SUGAR_LP_ADDRESS,
+PRICE_ORACLE_ADDRESS, ACCOUNT_ADDRESS). Point RPC_ENDPOINTS at a local
+anvil fork (`anvil --fork-url <base rpc>`) to benchmark without burning
+provider quota:
+
+    RPC_ENDPOINTS=http://127.0.0.1:8545 python benchmarks/bench_batch_backends.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from web3 import Web3
+
+import helpers
+from contract import rpc_endpoints
+
+POOL_SAMPLE = int(os.getenv("BENCH_POOL_SAMPLE", "60"))
+POSITION_PAGES = int(os.getenv("BENCH_POSITION_PAGES", "10"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+
+
+class CountingHTTPProvider(Web3.HTTPProvider):
+    round_trips = 0
+    eth_calls = 0
+
+    def make_request(self, method, params):
+        CountingHTTPProvider.round_trips += 1
+        CountingHTTPProvider.eth_calls += method == "eth_call"
+        return super().make_request(method, params)
+
+    def make_batch_request(self, requests):
+        CountingHTTPProvider.round_trips += 1
+        CountingHTTPProvider.eth_calls += sum(1 for method, _ in requests if method == "eth_call")
+        return super().make_batch_request(requests)
+
+
+def counting_web3():
+    return Web3(CountingHTTPProvider(rpc_endpoints[0]))
+
+
+def workloads(pools):
+    addresses = [lp.lp for lp in pools]
+    tokens = list(dict.fromkeys(addr for lp in pools for addr in (lp.token0, lp.token1)))
+    return {
+        # The reader itself: get_lps_from_positions goes through the pool index
+        "byAddress": lambda: helpers.get_lps_by_address(addresses),
+        "ERC20 symbol/decimals": lambda: helpers.fetch_tokens_batch(tokens),
+        "getRateToEth": lambda: helpers.get_rate_to_eth_batch(tokens),
+        "positions pages": lambda: helpers.get_positions_batch(limit=100, batch_size=POSITION_PAGES),
+    }
+
+
+def run(name, func, backend):
+    helpers.batch_backend = backend
+    CountingHTTPProvider.round_trips = CountingHTTPProvider.eth_calls = 0
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    print(
+        f"{name:<24} {backend:<11} {elapsed * 1000:>9.1f} ms "
+        f"{CountingHTTPProvider.round_trips / REPEAT:>7.1f} trips "
+        f"{CountingHTTPProvider.eth_calls / REPEAT:>7.1f} eth_calls"
+    )
+
+
+def main():
+    helpers.get_web3 = counting_web3
+    pools = helpers.get_all_lp_batch(limit=POOL_SAMPLE, batch_size=1, start_offset=0)
+    print(f"Benchmarking against {rpc_endpoints[0]} with {len(pools)} pools, repeat={REPEAT}\n")
+
+    for name, func in workloads(pools).items():
+        for backend in ("jsonrpc", "multicall3"):
+            run(name, func, backend)
+
+
+if __name__ == "__main__":
+    main()
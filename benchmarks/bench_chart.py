@@ -0,0 +1,138 @@
+"""
+Renders-per-second micro-benchmark for the price slider chart.
+
+Compares the original pyplot implementation (kept below as the baseline)
+with the template/blitting matplotlib renderer, the Pillow renderer and a
+warm PNG cache:
+
+    python benchmarks/bench_chart.py
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_DOWN
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.patches import FancyBboxPatch
+from matplotlib.pyplot import subplots
+
+import chart
+
+RENDERS = int(os.getenv("BENCH_RENDERS", "50"))
+
+
+def legacy_price_slider(lower_price, price_now, upper_price, precision=8):
+    def fmt(val):
+        d = Decimal(str(val)).quantize(Decimal(f"1e-{precision}"), rounding=ROUND_DOWN)
+        return format(d.normalize(), 'f')
+
+    lower, current, upper = map(lambda v: Decimal(str(v)), (lower_price, price_now, upper_price))
+    min_range, max_range = min(lower, current, upper), max(lower, current, upper)
+    margin = (max_range - min_range) * Decimal("0.3")
+    view_min, view_max = float(min_range - margin), float(max_range + margin)
+    lower_f, current_f, upper_f = map(float, (lower, current, upper))
+
+    fig, ax = subplots(figsize=(9, 3.6), facecolor='#101615')
+    ax.set(xlim=(view_min, view_max), ylim=(0, 1.8))
+    ax.axis('off')
+
+    # Layout constants
+    bar_y = 0.9
+    bar_height = 0.06
+    arrow_offset = 0.10
+    label_offset = 0.45  # đã kéo xuống thêm để tránh đè
+    symmetric_offset = 0.18
+
+    active_color = '#00e6b8'
+    bg_color = '#5f6d67'
+    tick_color = '#f6c744'
+
+    # Bar backgrounds
+    ax.add_patch(FancyBboxPatch((view_min, bar_y - bar_height / 2),
+                                view_max - view_min, bar_height,
+                                boxstyle="round,pad=0.01", linewidth=0, facecolor=bg_color))
+    ax.add_patch(matplotlib.patches.Rectangle((lower_f, bar_y - bar_height / 2),
+                                              upper_f - lower_f, bar_height,
+                                              linewidth=0, facecolor=active_color, zorder=1))
+
+    # Endpoint circles
+    for x in (lower_f, upper_f):
+        ax.plot(x, bar_y, marker='o', markersize=13, color=active_color, zorder=2)
+
+    # Vertical tick
+    ax.plot([current_f]*2, [bar_y - arrow_offset, bar_y + arrow_offset],
+            color=tick_color, linewidth=2, zorder=3)
+    ax.annotate('', xy=(current_f, bar_y), xytext=(current_f, bar_y + arrow_offset),
+                arrowprops=dict(arrowstyle='-|>', color=tick_color, linewidth=2), zorder=4)
+    ax.annotate('', xy=(current_f, bar_y - arrow_offset), xytext=(current_f, bar_y),
+                arrowprops=dict(arrowstyle='<|-', color=tick_color, linewidth=2), zorder=4)
+
+    # Zone labels (kéo thấp hơn)
+    ax.text((view_min + lower_f) / 2, bar_y - label_offset, "OUT",
+            ha='center', va='center', fontsize=9, color='gray')
+    ax.text((lower_f + upper_f) / 2, bar_y - label_offset, "ACTIVE RANGE",
+            ha='center', va='center', fontsize=9, color=active_color)
+    ax.text((upper_f + view_max) / 2, bar_y - label_offset, "OUT",
+            ha='center', va='center', fontsize=9, color='gray')
+
+    # Price values (upper/lower)
+    ax.text(lower_f, bar_y + symmetric_offset, fmt(lower),
+            ha='center', va='bottom', fontsize=10, color=active_color, fontweight='bold')
+    ax.text(upper_f, bar_y + symmetric_offset, fmt(upper),
+            ha='center', va='bottom', fontsize=10, color=active_color, fontweight='bold')
+
+    # Boxed current price (cách thanh giá một khoảng bằng upper/lower)
+    ax.text(current_f, bar_y - symmetric_offset, fmt(current),
+            ha='center', va='top', fontsize=10, fontweight='bold',
+            color=tick_color,
+            bbox=dict(boxstyle="round,pad=0.25", fc="#101615", ec=tick_color, lw=1.5))
+
+    buf = BytesIO()
+    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor=fig.get_facecolor())
+    plt.close()
+    buf.seek(0)
+    return buf
+
+
+def random_prices(n):
+    rng = random.Random(42)
+    prices = []
+    for _ in range(n):
+        lower = Decimal(str(rng.uniform(0.0001, 3000)))
+        upper = lower * Decimal(str(rng.uniform(1.01, 1.5)))
+        now = lower * Decimal(str(rng.uniform(0.9, 1.6)))
+        prices.append((lower, now, upper))
+    return prices
+
+
+def bench(name, func, prices):
+    start = time.perf_counter()
+    for lower, now, upper in prices:
+        func(lower, now, upper)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {len(prices) / elapsed:>8.1f} renders/s  ({elapsed / len(prices) * 1000:.1f} ms each)")
+
+
+def main():
+    prices = random_prices(RENDERS)
+    # Build both templates before timing
+    chart.get_renderer("matplotlib")
+    chart.get_renderer("pillow")
+
+    bench("legacy pyplot", legacy_price_slider, prices)
+    bench("matplotlib template", lambda *p: chart.get_renderer("matplotlib").render(*chart.chart_key(*p)), prices)
+    bench("pillow", lambda *p: chart.get_renderer("pillow").render(*chart.chart_key(*p)), prices)
+
+    for lower, now, upper in prices:
+        chart.render_price_slider(lower, now, upper)
+    bench("cached (warm LRU)", chart.render_price_slider, prices)
+
+
+if __name__ == "__main__":
+    main()
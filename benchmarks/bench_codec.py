@@ -0,0 +1,136 @@
+"""
+Cost of building and decoding the Sugar calls of a scan, through web3's
+contract machinery (a fresh web3.eth.contract per call, as the helpers used
+to do) versus the ContractCodec in codec.py. Return data comes from the
+synthetic chain in fake_rpc.py, ABI-encoded like real LpSugar.all() and
+positions() pages:
+
+    python benchmarks/bench_codec.py
+    BENCH_POOLS=50000 python benchmarks/bench_codec.py
+"""
+import os
+import sys
+import time
+
+from eth_abi import decode
+from eth_abi.exceptions import DecodingError
+from eth_utils.abi import abi_to_signature, get_abi_output_types
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput
+from web3.contract.utils import format_contract_call_return_data_curried
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+from fake_rpc import SUGAR_ADDRESS, SyntheticChain, fake_address, load_abi
+from codec import ContractCodec
+from data_models import Lp, Position
+from pool_discovery import POOL_PAGE_LIMIT
+
+POOLS = int(os.getenv("BENCH_POOLS", "20000"))
+POSITIONS = int(os.getenv("BENCH_POSITIONS", "2000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+
+def timed(label: str, func, items: int):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    print(f"{label:<54} {elapsed * 1000:>9.2f}ms {elapsed / items * 1e6:>9.2f}us/item")
+    return result
+
+
+def lowered(record) -> tuple:
+    # web3 hands out checksummed addresses, the codec lowercase ones
+    return tuple(v.lower() if isinstance(v, str) and v.startswith("0x") else v for v in record)
+
+
+def main():
+    account = fake_address("account", 0)
+    chain = SyntheticChain(pools=POOLS, positions=POSITIONS, accounts=[account])
+    sugar_abi = load_abi("LpSugar")
+    codec = ContractCodec(sugar_abi)
+    sugar = codec.at(SUGAR_ADDRESS)
+    web3 = Web3()
+    checksummed = (Web3.to_checksum_address(SUGAR_ADDRESS), Web3.to_checksum_address(account))
+
+    offsets = list(range(0, POOLS, POOL_PAGE_LIMIT))
+    all_pages = [sugar.all(POOL_PAGE_LIMIT, offset) for offset in offsets]
+    lp_data = [chain.call(SUGAR_ADDRESS, call.data) for call in all_pages]
+    position_pages = [sugar.positions(POOL_PAGE_LIMIT, offset, account) for offset in offsets]
+    position_data = [chain.call(SUGAR_ADDRESS, call.data) for call in position_pages]
+    positions = sum(len(codec.functions["positions"].decode(data)) for data in position_data)
+    print(f"{POOLS} pools / {positions} positions in {len(offsets)} pages each\n")
+
+    def web3_calldata():
+        return [
+            web3.eth.contract(address=checksummed[0], abi=sugar_abi)
+            .functions.positions(POOL_PAGE_LIMIT, offset, checksummed[1])._encode_transaction_data()
+            for offset in offsets
+        ]
+
+    def codec_calldata():
+        return [sugar.positions(POOL_PAGE_LIMIT, offset, account).data for offset in offsets]
+
+    web3_data = timed("positions() calldata: web3 contract", web3_calldata, len(offsets))
+    codec_data = timed("positions() calldata: codec", codec_calldata, len(offsets))
+    assert [bytes.fromhex(data[2:]) for data in web3_data] == codec_data
+
+    print()
+    for name, records, pages, data, model in (
+        ("all", POOLS, all_pages, lp_data, Lp),
+        ("positions", positions, position_pages, position_data, Position),
+    ):
+        fn = getattr(web3.eth.contract(address=checksummed[0], abi=sugar_abi).functions, name)
+        output_types = codec.functions[name].output_types
+        label = f"{name}() pages -> {model.__name__}"
+        timed(f"{label}: web3 call() decoding", lambda: [
+            model(*row) for page in data for row in web3_decode(web3, fn, page)
+        ], max(records, 1))
+        reference = timed(f"{label}: eth_abi", lambda: [
+            model(*row) for page in data for row in decode(output_types, page)[0]
+        ], max(records, 1))
+        fast = timed(f"{label}: codec", lambda: [
+            model(*row) for call, page in zip(pages, data) for row in call.decode(page)
+        ], max(records, 1))
+        assert [lowered(as_tuple(record)) for record in fast] == [lowered(as_tuple(record)) for record in reference]
+
+    check_short_data(codec, "all", max(lp_data, key=len))
+    check_short_data(codec, "positions", max(position_data, key=len))
+
+
+def raises(error, func) -> bool:
+    try:
+        func()
+    except error:
+        return True
+    return False
+
+
+def check_short_data(codec, name: str, page: bytes):
+    """Empty or cut-off return data must raise like web3/eth_abi did, never decode as fewer records."""
+    fn = codec.functions[name]
+    assert raises(BadFunctionCallOutput, lambda: fn.decode(b"")), f"{name}: empty return data decoded"
+    for cut in (len(page) - 1, len(page) // 2, 64, 63, 31):
+        truncated = page[:cut]
+        assert raises(DecodingError, lambda: decode(fn.output_types, truncated)), f"{name}[:{cut}]: eth_abi accepted it"
+        assert raises(DecodingError, lambda: fn.decode(truncated)), f"{name}[:{cut}]: codec accepted truncated data"
+    print(f"{name}(): empty and truncated return data raise")
+
+
+def web3_decode(web3, fn, return_data: bytes):
+    """What ContractFunction.call() does with the eth_call result."""
+    return format_contract_call_return_data_curried(
+        web3, False, fn.abi, abi_to_signature(fn.abi), fn._return_data_normalizers,
+        get_abi_output_types(fn.abi), return_data,
+    )
+
+
+def as_tuple(record) -> tuple:
+    return tuple(getattr(record, name) for name in record.__slots__)
+
+
+if __name__ == "__main__":
+    main()
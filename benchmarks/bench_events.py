@@ -0,0 +1,174 @@
+"""
+ALERT_MODE=events end to end, offline: runs main.run_event_loop against
+fake_rpc.py's synthetic chain and fake_ntfy.py, mines blocks on the chain
+and checks what each Swap-log poll costs:
+
+- idle (new blocks without swaps in watched pools): one eth_blockNumber plus
+  at most one eth_getLogs per poll, no eth_call
+- a Swap that moves a position out of its range: the pool is re-read through
+  the pool index and the position is alerted and marked, without a rescan
+- the same during an ntfy outage: the position is un-marked once delivery
+  fails, and alerted again on the pool's next move
+
+    python benchmarks/bench_events.py
+    BENCH_IDLE_BLOCKS=50 python benchmarks/bench_events.py
+"""
+import os
+import sys
+import tempfile
+import time
+from threading import Lock, Thread
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import start_server
+from fake_ntfy import NtfyStandIn, start
+from fake_rpc import ORACLE_ADDRESS, SUGAR_ADDRESS, fake_address
+
+IDLE_BLOCKS = int(os.getenv("BENCH_IDLE_BLOCKS", "20"))
+POLL_SECONDS = "0.05"
+TIMEOUT = 60
+
+
+def wait_for(condition, what: str):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"timed out waiting for {what}")
+        time.sleep(0.01)
+
+
+class PollGate:
+    """Counts SwapWatcher polls; holding the lock keeps a poll from straddling a stats reset."""
+
+    def __init__(self, watcher):
+        self.lock = Lock()
+        self.polls = 0
+        poll = watcher.poll
+
+        def counted(pools):
+            with self.lock:
+                self.polls += 1
+                return poll(pools)
+
+        watcher.poll = counted
+
+    def wait_polls(self, count: int):
+        start = self.polls
+        wait_for(lambda: self.polls >= start + count, f"{count} polls")
+
+
+def main():
+    accounts = [fake_address("account", 0)]
+    server, rpc_url = start_server(accounts)
+    ntfy = NtfyStandIn()
+    ntfy_url = f"http://127.0.0.1:{start(ntfy).server_port}"
+    workdir = tempfile.mkdtemp(prefix="bench-events-")
+    # contract.py loads ./abi, the SQLite files land next to it
+    os.symlink(os.path.join(REPO_ROOT, "abi"), os.path.join(workdir, "abi"))
+    os.chdir(workdir)
+    os.environ.update(
+        RPC_ENDPOINTS=rpc_url,
+        NTFY_URL=ntfy_url,
+        NTFY_TOPIC="alerts",
+        SUGAR_LP_ADDRESS=SUGAR_ADDRESS,
+        PRICE_ORACLE_ADDRESS=ORACLE_ADDRESS,
+        ACCOUNT_ADDRESSES=",".join(accounts),
+        AERO_ADDRESS=fake_address("token", 0),
+        ALERT_MODE="events",
+        EVENT_POLL_SECONDS=POLL_SECONDS,
+        NTFY_MAX_ATTEMPTS="2",
+        NTFY_BACKOFF="0.01",
+    )
+
+    try:
+        run(rpc_url, ntfy)
+    finally:
+        server.terminate()
+
+
+def run(rpc_url: str, ntfy: NtfyStandIn):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+    import main
+    from state_db import init_state_db
+
+    init_state_db()
+    main.alert_store.init()
+    gate = PollGate(main.swap_watcher)
+    Thread(target=main.run_event_loop, kwargs={"rescan_minutes": 60}, daemon=True).start()
+    wait_for(lambda: main.snapshot_service.latest is not None, "the first scan")
+    gate.wait_polls(2)
+
+    def stats() -> dict:
+        return requests.get(f"{rpc_url}/stats").json()
+
+    def mine(**swap) -> int:
+        return requests.get(f"{rpc_url}/mine", params=swap).json()["block"]
+
+    # Idle: blocks keep coming, nothing watched swaps
+    with gate.lock:
+        requests.get(f"{rpc_url}/reset")
+        polls_before = gate.polls
+    for _ in range(IDLE_BLOCKS):
+        head = mine()
+        wait_for(lambda: main.swap_watcher.last_block >= head, f"block {head}")
+    gate.wait_polls(1)
+    with gate.lock:
+        idle, polls = stats(), gate.polls - polls_before
+    methods = idle["methods"]
+    assert set(methods) <= {"eth_blockNumber", "eth_getLogs"}, f"idle polls made other calls: {methods}"
+    assert methods["eth_blockNumber"] == polls, methods
+    assert methods.get("eth_getLogs", 0) <= IDLE_BLOCKS, methods
+    assert idle["calls"] <= 2 * polls, idle
+    print(f"idle:  {polls} polls over {IDLE_BLOCKS} blocks, {idle['calls']} calls "
+          f"({idle['calls'] / polls:.2f}/poll, {dict(methods)})")
+
+    def in_range_position(skip_pools=()):
+        snapshot = main.snapshot_service.latest
+        alerted = main.alert_store.alerted_keys()
+        return next(
+            pos for pos, lp in zip(snapshot.positions + snapshot.unstaked_positions, snapshot.lps + snapshot.unstaked_lps)
+            if lp.type > 0 and pos.tick_lower <= lp.tick < pos.tick_upper
+            and main.alert_key(pos) not in alerted and pos.lp not in skip_pools
+        )
+
+    # A swap moves one in-range position below its lower tick
+    pos = in_range_position()
+    key = main.alert_key(pos)
+    requests.get(f"{rpc_url}/reset")
+    posts_before = ntfy.stats()["posts"]
+    block = mine(pool=pos.lp, tick=pos.tick_lower - 100)
+    wait_for(lambda: key in main.alert_store.alerted_keys(), f"{key} to be alerted")
+    main.ntfy_dispatcher.drain()
+    moved = stats()
+    assert moved["methods"].get("eth_call", 0) >= 1, f"the moved pool was not re-read: {moved['methods']}"
+    assert ntfy.stats()["posts"] > posts_before, "no ntfy post for the position that left its range"
+    print(f"swap:  block {block} moved pool {pos.lp[:10]}… to tick {pos.tick_lower - 100}, "
+          f"{key} alerted after {moved['calls']} calls ({dict(moved['methods'])})")
+
+    # ntfy is down: the alert is marked while in flight, then un-marked when delivery fails
+    pos = in_range_position(skip_pools={pos.lp})
+    key = main.alert_key(pos)
+    ntfy.fail_rate = 1.0
+    failed_before = ntfy.stats()["failed"]
+    mine(pool=pos.lp, tick=pos.tick_lower - 100)
+    wait_for(lambda: ntfy.stats()["failed"] > failed_before, "the failed ntfy post")
+    main.ntfy_dispatcher.drain()
+    assert key not in main.alert_store.alerted_keys(), "undelivered alert left the position marked"
+
+    # ntfy is back: the next move of the pool sends it
+    ntfy.fail_rate = 0.0
+    delivered_before = len(ntfy.stats()["messages"])
+    mine(pool=pos.lp, tick=pos.tick_lower - 101)
+    wait_for(lambda: key in main.alert_store.alerted_keys(), f"{key} to be alerted again")
+    main.ntfy_dispatcher.drain()
+    assert len(ntfy.stats()["messages"]) > delivered_before, "the retried alert was not delivered"
+    print(f"outage: {key} un-marked after the failed delivery, delivered on the pool's next move")
+
+
+if __name__ == "__main__":
+    main()
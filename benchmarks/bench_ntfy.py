@@ -0,0 +1,75 @@
+"""
+How long a burst of range-exit alerts holds up the alert loop, with the
+original inline requests.post per alert versus ntfy_dispatcher, against
+the local ntfy stand-in in fake_ntfy.py:
+
+    python benchmarks/bench_ntfy.py
+    BENCH_ALERTS=200 BENCH_NTFY_DELAY=0.2 BENCH_NTFY_FAIL_RATE=0.2 python benchmarks/bench_ntfy.py
+
+The inline baseline aborts on the first non-200, as the old helper raised.
+"""
+import os
+import sys
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+from fake_ntfy import NtfyStandIn, start
+from ntfy_dispatcher import NtfyDispatcher, NtfyMessage
+
+ALERTS = int(os.getenv("BENCH_ALERTS", "50"))
+DELAY = float(os.getenv("BENCH_NTFY_DELAY", "0.05"))
+FAIL_RATE = float(os.getenv("BENCH_NTFY_FAIL_RATE", "0"))
+
+
+def alert_body(i: int) -> str:
+    return f"🔴 Position #{i} is out of range\nPool: WETH/USDC\nLower: 3000.1\nNow: 2999.7\nUpper: 3100.4"
+
+
+def run_inline(url: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    sent = 0
+    for i in range(ALERTS):
+        response = requests.post(f"{url}/alerts", headers={"Title": "Alert"}, data=alert_body(i).encode("utf-8"))
+        if response.status_code != 200:
+            break
+        sent += 1
+    return time.perf_counter() - start, sent
+
+
+def run_dispatcher(url: str, digest_min: int) -> tuple[float, float]:
+    dispatcher = NtfyDispatcher(url, topic="alerts", backoff=0.1, digest_min=digest_min)
+    start = time.perf_counter()
+    with dispatcher.coalesce(title="Positions out of range"):
+        for i in range(ALERTS):
+            dispatcher.submit(NtfyMessage(alert_body(i)))
+    blocked = time.perf_counter() - start
+    dispatcher.drain(timeout=600)
+    return blocked, time.perf_counter() - start
+
+
+def main():
+    ntfy = NtfyStandIn(delay=DELAY, fail_rate=FAIL_RATE)
+    url = f"http://127.0.0.1:{start(ntfy).server_port}"
+    print(f"{ALERTS} alerts, {DELAY * 1000:.0f}ms per POST, {FAIL_RATE:.0%} 503s\n")
+    print(f"{'mode':<20} {'loop blocked':>13} {'delivered in':>13} {'POSTs':>6} {'alerts in':>10}")
+
+    elapsed, sent = run_inline(url)
+    stats = requests.get(f"{url}/stats").json()
+    requests.get(f"{url}/reset")
+    print(f"{'inline':<20} {elapsed * 1000:>11.1f}ms {elapsed * 1000:>11.1f}ms {stats['posts']:>6} {sent:>10}")
+
+    for label, digest_min in (("dispatcher", 0), ("dispatcher+digest", 3)):
+        blocked, delivered = run_dispatcher(url, digest_min)
+        stats = requests.get(f"{url}/stats").json()
+        requests.get(f"{url}/reset")
+        alerts = sum(message["body"].count("is out of range") for message in stats["messages"])
+        print(f"{label:<20} {blocked * 1000:>11.1f}ms {delivered * 1000:>11.1f}ms {stats['posts']:>6} {alerts:>10}")
+
+
+if __name__ == "__main__":
+    main()
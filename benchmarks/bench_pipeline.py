@@ -0,0 +1,153 @@
+"""
+Stage-by-stage benchmark of the full scan and render pipeline, offline.
+
+Starts benchmarks/fake_rpc.py (a seeded synthetic chain, or a recorded
+fixture with BENCH_FIXTURE) and runs discovery, position paging, LP
+lookup, token and price resolution, APR, range evaluation, formatting and
+chart rendering against it. For every stage it reports wall time, HTTP
+requests and JSON-RPC calls seen by the server, and memory: the process's
+peak RSS so far, or with BENCH_TRACE_MEMORY=1 the stage's own tracemalloc
+peak (tracemalloc slows allocation-heavy stages several times over, so
+wall times from such a run are not comparable):
+
+    python benchmarks/bench_pipeline.py
+    BENCH_POSITIONS=10000 BENCH_ACCOUNTS=3 RPC_BATCH_BACKEND=multicall3 python benchmarks/bench_pipeline.py
+
+State (SQLite caches, learned pager sizes) lives in a throwaway directory,
+so every run starts cold.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_rpc import ORACLE_ADDRESS, SUGAR_ADDRESS, fake_address
+
+POOLS = int(os.getenv("BENCH_POOLS", "20000"))
+POSITIONS = int(os.getenv("BENCH_POSITIONS", "1000"))
+ACCOUNTS = int(os.getenv("BENCH_ACCOUNTS", "1"))
+RENDERS = int(os.getenv("BENCH_RENDERS", "50"))
+FIXTURE = os.getenv("BENCH_FIXTURE")
+TRACE_MEMORY = os.getenv("BENCH_TRACE_MEMORY") == "1"
+
+
+def start_server(accounts):
+    if FIXTURE:
+        args = ["replay", "--fixture", FIXTURE]
+    else:
+        args = ["synthetic", "--pools", str(POOLS), "--positions", str(POSITIONS), "--accounts", ",".join(accounts)]
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_rpc.py"), *args, "--port", "0"],
+        stdout=subprocess.PIPE, text=True
+    )
+    url = server.stdout.readline().strip().rsplit(" ", 1)[-1]
+    return server, url
+
+
+class Stages:
+    def __init__(self, url):
+        self.url = url
+        self.rows = []
+
+    def run(self, name, func):
+        requests.get(f"{self.url}/reset")
+        if TRACE_MEMORY:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if TRACE_MEMORY:
+            _, peak = tracemalloc.get_traced_memory()
+        else:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        stats = requests.get(f"{self.url}/stats").json()
+        self.rows.append((name, elapsed, stats["http_requests"], stats["calls"], peak))
+        return result
+
+    def report(self):
+        memory = "stage peak" if TRACE_MEMORY else "peak RSS"
+        print(f"\n{'stage':<22} {'wall':>10} {'requests':>9} {'calls':>8} {memory:>10}")
+        for name, elapsed, http_requests, calls, peak in self.rows:
+            print(f"{name:<22} {elapsed * 1000:>8.1f}ms {http_requests:>9} {calls:>8} {peak / 2 ** 20:>8.1f}MB")
+        total = sum(row[1] for row in self.rows)
+        print(f"{'total':<22} {total * 1000:>8.1f}ms {sum(r[2] for r in self.rows):>9} {sum(r[3] for r in self.rows):>8}")
+
+
+def main():
+    accounts = [fake_address("account", i) for i in range(ACCOUNTS)]
+    server, url = start_server(accounts)
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    # contract.py loads ./abi, the SQLite files land next to it
+    os.symlink(os.path.join(REPO_ROOT, "abi"), os.path.join(workdir, "abi"))
+    os.chdir(workdir)
+
+    os.environ["RPC_ENDPOINTS"] = url
+    if not FIXTURE:
+        # A replayed fixture keeps the contract/wallet settings from .env it was recorded with
+        os.environ.update({
+            "SUGAR_LP_ADDRESS": SUGAR_ADDRESS,
+            "PRICE_ORACLE_ADDRESS": ORACLE_ADDRESS,
+            "ACCOUNT_ADDRESSES": ",".join(accounts),
+            "AERO_ADDRESS": fake_address("token", 0),
+        })
+    sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+    try:
+        import helpers
+        from formatter import LPFormatter
+        from pool_discovery import discover_last_pool_offset
+        from range_engine import evaluate_positions
+        from state_db import init_state_db
+
+        init_state_db()
+        if TRACE_MEMORY:
+            tracemalloc.start()
+        stages = Stages(url)
+        source = f"fixture {FIXTURE}" if FIXTURE else f"{POOLS} pools, {POSITIONS} positions, {ACCOUNTS} wallet(s)"
+        print(f"Benchmarking against {url} ({source}), backend={helpers.batch_backend}")
+
+        stages.run("discovery", lambda: discover_last_pool_offset(helpers.probe_lp_pages))
+        staked, unstaked = stages.run("position paging", helpers.get_all_positions)
+        positions = staked + unstaked
+        lps = stages.run("LP lookup", lambda: helpers.get_lps_from_positions(positions))
+        # Every pool is now indexed and recent: concentrated ones only need slot0()
+        stages.run("LP lookup (warm)", lambda: helpers.get_lps_from_positions(positions))
+        stages.run("tokens", lambda: helpers.resolve_lp_tokens(lps))
+        stages.run("prices", lambda: helpers.snapshot_lp_prices(lps))
+        stages.run("APR", lambda: [helpers.cal_lp_apr(lp) for lp in lps])
+        stages.run("range evaluation", lambda: evaluate_positions(positions, lps))
+
+        formatter = LPFormatter(style="telegram")
+        pairs = [helpers.get_lp_token_info(lp) for lp in lps]
+        stages.run("format", lambda: [
+            formatter.format_position(pos, lp, token0, token1, i < len(staked))
+            for i, (pos, lp, (token0, token1)) in enumerate(zip(positions, lps, pairs))
+        ])
+
+        def render():
+            for pos, lp, (token0, token1) in list(zip(positions, lps, pairs))[:RENDERS]:
+                upper, now, lower = helpers.get_range_prices(pos, lp, token0, token1)
+                helpers.create_price_slider(lower, now, upper)
+
+        stages.run(f"render x{min(RENDERS, len(positions))}", render)
+
+        print(f"Scanned {len(staked)} staked + {len(unstaked)} unstaked positions in {len(set(p.lp for p in positions))} pools")
+        stages.report()
+
+        from metrics import summary
+        print(f"\n{summary()}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Price/APR math micro-benchmark, and a cross-check of price_math against
+the original getcontext()-based Decimal helpers (kept below as the
+baseline) on random positions. range_prices_batch() is checked against
+range_prices() with several positions per pool:
+
+    python benchmarks/bench_price_math.py
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal, getcontext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import price_math
+
+POSITIONS = int(os.getenv("BENCH_POSITIONS", "20000"))
+SEED = int(os.getenv("BENCH_SEED", "7"))
+
+
+def legacy_convert_by_decimals(raw_balance, decimals, precision=4):
+    getcontext().prec = precision + 10
+    return Decimal(raw_balance) / Decimal(10 ** decimals)
+
+
+def legacy_convert_sqrtPriceX96_to_price(sqrtPriceX96, precision=8):
+    getcontext().prec = precision + 10
+    return (Decimal(sqrtPriceX96) / (2 ** 96)) ** 2
+
+
+def legacy_cal_real_price(decimals0, decimals1, upper, now, lower):
+    decimal_diff = decimals0 - decimals1
+    # The original multiplied by 10**diff, a float for negative diffs; scaleb keeps it comparable
+    return (upper.scaleb(decimal_diff), now.scaleb(decimal_diff), lower.scaleb(decimal_diff))
+
+
+def legacy_cal_lp_apr(emissions, staked0, staked1, decimals0, decimals1, rates, precision=3):
+    getcontext().prec = precision + 10
+    one_year_emissions = legacy_convert_by_decimals(31_556_926 * emissions, 18)
+    staked_token0 = legacy_convert_by_decimals(staked0, decimals0)
+    staked_token1 = legacy_convert_by_decimals(staked1, decimals1)
+    rate_token0 = Decimal(rates[0]) / 10 ** (18 - decimals0)
+    rate_token1 = Decimal(rates[1]) / 10 ** (18 - decimals1)
+    rate_aero = Decimal(rates[2])
+    return 100 * one_year_emissions * rate_aero / (rate_token0 * staked_token0 + rate_token1 * staked_token1)
+
+
+def random_case(rng):
+    decimals0, decimals1 = rng.choice([6, 8, 18]), rng.choice([6, 8, 18])
+    tick = rng.randint(-300000, 300000)
+    width = rng.randint(1, 4000)
+    sqrt_at = lambda t: int(Decimal("1.0001") ** (Decimal(t) / 2) * (1 << 96))
+    return {
+        "decimals": (decimals0, decimals1),
+        "sqrt": (sqrt_at(tick - width), sqrt_at(tick) + rng.randint(0, 1 << 60), sqrt_at(tick + width)),
+        "raw": rng.randint(1, 10 ** 30),
+        "apr": (
+            rng.randint(10 ** 12, 10 ** 18),  # emissions per second
+            rng.randint(10 ** 6, 10 ** 24), rng.randint(10 ** 6, 10 ** 24),
+            rng.randint(10 ** 6, 10 ** 18), rng.randint(10 ** 6, 10 ** 18), rng.randint(10 ** 14, 10 ** 16),
+        ),
+    }
+
+
+def close(a: Decimal, b: Decimal, digits: int) -> bool:
+    # Both sides carry `digits` significant digits; allow for the legacy double rounding
+    return a == b or abs(a - b) <= abs(b) * Decimal(10) ** (3 - digits)
+
+
+def check(cases):
+    for case in cases:
+        d0, d1 = case["decimals"]
+        lower, now, upper = case["sqrt"]
+
+        legacy = legacy_cal_real_price(d0, d1, *(legacy_convert_sqrtPriceX96_to_price(s) for s in (upper, now, lower)))
+        exact = price_math.range_prices(
+            type("Pos", (), {"sqrt_ratio_upper": upper, "sqrt_ratio_lower": lower}),
+            type("Lp", (), {"sqrt_ratio": now}),
+            type("T0", (), {"decimals": d0}), type("T1", (), {"decimals": d1}),
+        )
+        assert all(close(e, l, 18) for e, l in zip(exact, legacy)), (case, exact, legacy)
+
+        assert close(price_math.raw_to_decimal(case["raw"], d0), legacy_convert_by_decimals(case["raw"], d0), 14)
+
+        emissions, staked0, staked1, rate0, rate1, rate_aero = case["apr"]
+        legacy_apr = legacy_cal_lp_apr(emissions, staked0, staked1, d0, d1, (rate0, rate1, rate_aero))
+        exact_apr = price_math.lp_apr(emissions, staked0, staked1, rate0, rate1, rate_aero)
+        assert close(exact_apr, legacy_apr, 13), (case, exact_apr, legacy_apr)
+
+
+def as_objects(cases, positions_per_pool=4):
+    """(positions, lps, token_pairs) with every `positions_per_pool` consecutive cases sharing one pool."""
+    positions, lps, token_pairs = [], [], []
+    for idx, case in enumerate(cases):
+        d0, d1 = case["decimals"]
+        lower, now, upper = case["sqrt"]
+        if idx % positions_per_pool == 0:
+            pool = type("Lp", (), {"sqrt_ratio": now})
+            pair = (type("T0", (), {"decimals": d0}), type("T1", (), {"decimals": d1}))
+        positions.append(type("Pos", (), {"sqrt_ratio_upper": upper, "sqrt_ratio_lower": lower}))
+        lps.append(pool)
+        token_pairs.append(pair)
+    return positions, lps, token_pairs
+
+
+def check_batch(objects):
+    positions, lps, token_pairs = objects
+    batch = price_math.range_prices_batch(positions, lps, token_pairs)
+    single = [price_math.range_prices(pos, lp, *pair) for pos, lp, pair in zip(positions, lps, token_pairs)]
+    assert batch == single
+
+
+def timed(label, fn, cases):
+    start = time.perf_counter()
+    fn(cases)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {len(cases) / elapsed:>12,.0f} positions/s")
+
+
+def run_legacy(cases):
+    for case in cases:
+        d0, d1 = case["decimals"]
+        lower, now, upper = case["sqrt"]
+        legacy_cal_real_price(d0, d1, *(legacy_convert_sqrtPriceX96_to_price(s) for s in (upper, now, lower)))
+        legacy_convert_by_decimals(case["raw"], d0)
+        emissions, staked0, staked1, rate0, rate1, rate_aero = case["apr"]
+        legacy_cal_lp_apr(emissions, staked0, staked1, d0, d1, (rate0, rate1, rate_aero))
+
+
+def run_exact(cases):
+    for case in cases:
+        d0, d1 = case["decimals"]
+        lower, now, upper = case["sqrt"]
+        for sqrt_price in (upper, now, lower):
+            price_math.real_price(sqrt_price, d0, d1)
+        price_math.raw_to_decimal(case["raw"], d0)
+        price_math.lp_apr(*case["apr"])
+
+
+def run_single_range(objects):
+    for pos, lp, pair in zip(*objects):
+        price_math.range_prices(pos, lp, *pair)
+
+
+def run_batch_range(objects):
+    price_math.range_prices_batch(*objects)
+
+
+def main():
+    rng = random.Random(SEED)
+    cases = [random_case(rng) for _ in range(POSITIONS)]
+
+    check(cases)
+    print(f"✅ price_math matches the legacy Decimal helpers on {len(cases)} random positions")
+    objects = as_objects(cases)
+    check_batch(objects)
+    print("✅ range_prices_batch matches range_prices")
+
+    timed("legacy", run_legacy, cases)
+    timed("price_math", run_exact, cases)
+    timed("range x1", lambda _: run_single_range(objects), cases)
+    timed("range batch", lambda _: run_batch_range(objects), cases)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Startup cost of the bot process, offline: import time of main.py and time
+to the end of the first alert cycle, against fake_rpc.py and fake_ntfy.py.
+Each run is a fresh interpreter, like a systemd restart. The first run
+starts from an empty state directory; the following ones reuse the SQLite
+state (tokens, pool index, scan snapshot) the previous run left behind:
+
+    python benchmarks/bench_startup.py
+    BENCH_RUNS=5 ALERT_MODE=events python benchmarks/bench_startup.py
+
+With ALERT_MODE=events a restored snapshot younger than the rescan
+interval is resumed from its block, so warm runs skip the full scan.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import start_server
+from fake_ntfy import NtfyStandIn, start
+from fake_rpc import ORACLE_ADDRESS, SUGAR_ADDRESS, fake_address
+
+RUNS = int(os.getenv("BENCH_RUNS", "3"))
+# The child's timings line; anything else it prints (e.g. the ntfy worker at exit) is skipped
+RESULT_MARKER = "BENCH_RESULT "
+ALERT_MODE = os.getenv("ALERT_MODE", "poll")
+
+
+def child():
+    """One bot start: import main, warm caches from disk, run the first alert cycle."""
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+    import main
+    imported = time.perf_counter()
+
+    from state_db import init_state_db
+    init_state_db()
+    main.warm_from_disk()
+    warmed = time.perf_counter()
+
+    main.alert_store.init()
+    snapshot = main.snapshot_service.latest
+    if ALERT_MODE == "events" and snapshot is not None and snapshot.age < 3 * 60:
+        main.watch_snapshot(snapshot)
+    else:
+        main.scan_and_alert()
+    done = time.perf_counter()
+
+    print(RESULT_MARKER + json.dumps({
+        "import": imported - start,
+        "warm": warmed - imported,
+        "first_cycle": done - warmed,
+        "total": done - start,
+        "matplotlib": "matplotlib" in sys.modules,
+    }), flush=True)
+
+
+def run(workdir: str, env: dict, rpc_url: str) -> dict:
+    requests.get(f"{rpc_url}/reset")
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    line = next(line for line in result.stdout.splitlines() if line.startswith(RESULT_MARKER))
+    timings = json.loads(line[len(RESULT_MARKER):])
+    timings.update(requests.get(f"{rpc_url}/stats").json())
+    return timings
+
+
+def import_cost(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+
+
+def main():
+    accounts = [fake_address("account", 0)]
+    server, rpc_url = start_server(accounts)
+    ntfy_url = f"http://127.0.0.1:{start(NtfyStandIn()).server_port}"
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    # contract.py loads ./abi, the SQLite files land next to it
+    os.symlink(os.path.join(REPO_ROOT, "abi"), os.path.join(workdir, "abi"))
+
+    env = dict(
+        os.environ,
+        RPC_ENDPOINTS=rpc_url,
+        NTFY_URL=ntfy_url,
+        NTFY_TOPIC="alerts",
+        SUGAR_LP_ADDRESS=SUGAR_ADDRESS,
+        PRICE_ORACLE_ADDRESS=ORACLE_ADDRESS,
+        ACCOUNT_ADDRESSES=",".join(accounts),
+        AERO_ADDRESS=fake_address("token", 0),
+        ALERT_MODE=ALERT_MODE,
+    )
+
+    try:
+        print(f"Against {rpc_url}, ALERT_MODE={ALERT_MODE}, state in {workdir}")
+        print(f"Deferred until the first chart: matplotlib.figure {import_cost('matplotlib.figure') * 1000:.0f}ms\n")
+        print(f"{'run':<8} {'import':>9} {'warm':>9} {'1st cycle':>10} {'total':>9} {'requests':>9} {'calls':>7} {'matplotlib':>11}")
+        for i in range(RUNS):
+            timings = run(workdir, env, rpc_url)
+            print(
+                f"{'cold' if i == 0 else f'warm {i}':<8} {timings['import'] * 1000:>7.0f}ms {timings['warm'] * 1000:>7.0f}ms "
+                f"{timings['first_cycle'] * 1000:>8.0f}ms {timings['total'] * 1000:>7.0f}ms "
+                f"{timings['http_requests']:>9} {timings['calls']:>7} {str(timings['matplotlib']):>11}"
+            )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--child"]:
+        child()
+    else:
+        main()
@@ -0,0 +1,59 @@
+"""
+Checks that a cancelled SnapshotService.arefresh() (a /liquidity handler
+cancelled at shutdown or on a timeout) does not wedge the alert thread:
+a sync refresh() waiting on the cancelled fetch, and any later one, still
+return a snapshot.
+
+    python benchmarks/check_snapshot_service.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from scan_snapshot import ScanSnapshot, SnapshotService
+
+
+def snapshot(block_number: int) -> ScanSnapshot:
+    return ScanSnapshot([], [], [], [], {}, {}, block_number)
+
+
+async def check_cancelled_leader():
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.Event().wait()
+
+    service = SnapshotService(lambda: snapshot(1), hang, db_path=os.path.join(tempfile.mkdtemp(), "state.db"))
+    leader = asyncio.ensure_future(service.arefresh())
+    await started.wait()
+
+    # The alert thread joins the in-flight async fetch...
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(service.refresh()))
+    waiter.start()
+    await asyncio.sleep(0.1)
+
+    # ...which is then cancelled
+    leader.cancel()
+    try:
+        await leader
+    except asyncio.CancelledError:
+        pass
+    else:
+        raise AssertionError("arefresh() swallowed its own cancellation")
+
+    await asyncio.to_thread(waiter.join, 5)
+    assert not waiter.is_alive(), "refresh() is still blocked on the cancelled fetch"
+    assert results[0].block_number == 1
+    assert service.refresh().block_number == 1
+    assert service._inflight is None
+    print("✅ refresh() returns after the arefresh() it joined was cancelled")
+
+
+if __name__ == "__main__":
+    asyncio.run(check_cancelled_leader())
@@ -0,0 +1,114 @@
+"""
+Local stand-in for an ntfy server.
+
+    python benchmarks/fake_ntfy.py --port 8080 --delay 0.2 --fail-rate 0.3
+
+Every POST /<topic> is recorded (topic, headers, body) and answered 200,
+unless it is picked to fail: then it gets a 503, or a 429 with
+Retry-After: 1 for --rate-limit-rate. --delay adds latency to every reply.
+GET /stats returns the counters and received messages, GET /reset clears
+them. Point the bot at it with NTFY_URL=http://127.0.0.1:8080.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+
+class NtfyStandIn:
+    def __init__(self, delay: float = 0.0, fail_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 7):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.posts = 0
+            self.failed = 0
+            self.messages = []
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"posts": self.posts, "failed": self.failed, "messages": list(self.messages)}
+
+    def handle(self, topic: str, headers: dict, body: str) -> tuple[int, dict]:
+        time.sleep(self.delay)
+        with self.lock:
+            self.posts += 1
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                self.failed += 1
+                return 429, {"Retry-After": "1"}
+            if roll < self.rate_limit_rate + self.fail_rate:
+                self.failed += 1
+                return 503, {}
+            self.messages.append({"topic": topic, "title": headers.get("Title"), "body": body})
+            return 200, {}
+
+
+def make_handler(ntfy: NtfyStandIn):
+    class NtfyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # One write per response: separate header/body segments stall on delayed ACKs with keep-alive clients
+        wbufsize = -1
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/reset":
+                ntfy.reset()
+            self._reply(200, ntfy.stats())
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            status, headers = ntfy.handle(self.path.lstrip("/"), dict(self.headers), body)
+            self._reply(status, {"status": status}, headers)
+
+    return NtfyHandler
+
+
+def start(ntfy: NtfyStandIn, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve `ntfy` from a daemon thread, returns the server (its port is server.server_port)."""
+    server = ThreadingHTTPServer((host, port), make_handler(ntfy))
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True, name="fake-ntfy").start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of POSTs answered 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of POSTs answered 429")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    server = start(NtfyStandIn(args.delay, args.fail_rate, args.rate_limit_rate, args.seed), port=args.port)
+    print(f"🧪 Fake ntfy listening on http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""
+Local JSON-RPC server for offline benchmarks.
+
+    # Serve a seeded synthetic chain: N pools, M positions spread over the given wallets
+    python benchmarks/fake_rpc.py synthetic --pools 20000 --positions 5000 --port 8545
+
+    # Proxy to a real RPC and append every request/response pair to a fixture
+    python benchmarks/fake_rpc.py record --upstream https://mainnet.base.org --fixture benchmarks/fixtures/base.jsonl
+
+    # Serve a recorded fixture, no network needed
+    python benchmarks/fake_rpc.py replay --fixture benchmarks/fixtures/base.jsonl
+
+The server answers single and batched JSON-RPC POSTs. GET /stats returns
+request/call counters and GET /reset clears them, which is how
+bench_pipeline.py attributes RPC volume to each pipeline stage. On the
+synthetic chain GET /mine adds a block, and GET /mine?pool=<address>&tick=<n>
+also moves that pool to the tick with a Swap log, served by eth_getLogs
+(bench_events.py drives the event alert mode with it).
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from eth_abi import decode, encode
+from eth_utils import keccak
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types, get_abi_output_types
+
+ABI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "abi")
+
+SUGAR_ADDRESS = "0x" + "5a" * 20
+ORACLE_ADDRESS = "0x" + "0c" * 20
+MULTICALL3_ADDRESS = "0xca11bde05977b3631167028862be2a173976ca11"
+CHAIN_ID = 8453
+BLOCK_NUMBER = 30_000_000
+SWAP_TOPIC = "0x" + keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24)").hex()
+
+
+def load_abi(name: str) -> list:
+    with open(os.path.join(ABI_DIR, f"{name}.json")) as abi_file:
+        return json.load(abi_file)
+
+
+def fake_address(kind: str, index: int) -> str:
+    return "0x" + hashlib.sha256(f"{kind}:{index}".encode()).hexdigest()[:40]
+
+
+def sqrt_ratio_at(tick: int) -> int:
+    return int(math.pow(1.0001, tick / 2) * (1 << 96))
+
+
+def fake_hash(kind: str, *parts) -> str:
+    return "0x" + hashlib.sha256(":".join([kind, *map(str, parts)]).encode()).hexdigest()
+
+
+def block_tag(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def canonical(method: str, params) -> str:
+    return json.dumps([method, params], sort_keys=True).lower()
+
+
+class Backend:
+    """Answers JSON-RPC requests and counts them."""
+
+    def __init__(self):
+        self.stats_lock = Lock()
+        self.http_requests = 0
+        self.methods = Counter()
+        self.batch_sizes = Counter()
+
+    def handle(self, method: str, params: list):
+        raise NotImplementedError
+
+    def answer(self, request: dict) -> dict:
+        try:
+            result = self.handle(request["method"], request.get("params", []))
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32000, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def handle_payload(self, payload):
+        requests_ = payload if isinstance(payload, list) else [payload]
+        with self.stats_lock:
+            self.http_requests += 1
+            self.batch_sizes[len(requests_)] += 1
+            self.methods.update(request["method"] for request in requests_)
+        responses = [self.answer(request) for request in requests_]
+        return responses if isinstance(payload, list) else responses[0]
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            return {
+                "http_requests": self.http_requests,
+                "calls": sum(self.methods.values()),
+                "methods": dict(self.methods),
+                "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            }
+
+    def reset(self):
+        with self.stats_lock:
+            self.http_requests = 0
+            self.methods.clear()
+            self.batch_sizes.clear()
+
+
+class SyntheticChain(Backend):
+    """
+    Deterministic stand-in for Base with the Sugar, oracle, ERC20,
+    Multicall3 and CL pool (slot0) contracts. Pools are numbered like Sugar's all() pages, and
+    positions(limit, offset, account) returns the account's positions in
+    pools [offset, offset + limit), as the real contract does.
+    """
+
+    def __init__(self, pools: int = 20000, positions: int = 1000, accounts=None, tokens: int = 500, seed: int = 7):
+        super().__init__()
+        rng = random.Random(seed)
+        self.head = BLOCK_NUMBER
+        self.swap_logs = []
+        self.chain_lock = Lock()
+        self.accounts = [account.lower() for account in (accounts or [fake_address("account", 0)])]
+        self.tokens = [fake_address("token", i) for i in range(tokens)]
+        self.token_info = {
+            address: (f"TKN{i}", rng.choice((6, 8, 18)), rng.randint(10 ** 12, 10 ** 19))
+            for i, address in enumerate(self.tokens)
+        }
+
+        sugar_abi = load_abi("LpSugar")
+        self._contracts = {
+            SUGAR_ADDRESS: self._register(sugar_abi),
+            ORACLE_ADDRESS: self._register(load_abi("OffchainOracle")),
+            MULTICALL3_ADDRESS: self._register(load_abi("Multicall3")),
+        }
+        self._erc20 = self._register(load_abi("ERC20"))
+        self._cl_pool = self._register(load_abi("CLPool"))
+        components = {f["name"]: f["outputs"][0]["components"] for f in sugar_abi if f.get("name") in ("all", "positions")}
+        self._lp_fields = components["all"]
+        self._position_fields = components["positions"]
+
+        self.pools = []
+        self.pool_index = {}
+        for i in range(pools):
+            token0, token1 = rng.sample(self.tokens, 2)
+            tick = rng.randint(-50000, 50000)
+            self.pools.append(self._row(self._lp_fields, {
+                "lp": fake_address("pool", i), "symbol": f"CL-{i}", "decimals": 18, "type": 100,
+                "liquidity": rng.randint(10 ** 15, 10 ** 24), "tick": tick, "sqrt_ratio": sqrt_ratio_at(tick),
+                "token0": token0, "token1": token1,
+                "reserve0": rng.randint(10 ** 18, 10 ** 24), "reserve1": rng.randint(10 ** 18, 10 ** 24),
+                "staked0": rng.randint(10 ** 16, 10 ** 22), "staked1": rng.randint(10 ** 16, 10 ** 22),
+                "gauge": fake_address("gauge", i), "gauge_alive": True, "emissions": rng.randint(10 ** 12, 10 ** 17),
+                "emissions_token": self.tokens[0], "pool_fee": 500, "unstaked_fee": 100,
+            }))
+            self.pool_index[fake_address("pool", i)] = i
+
+        # pool index -> [(account, staked, position row)]
+        self.positions = {}
+        for position_id in range(1, positions + 1):
+            pool = rng.randrange(pools)
+            tick = self.pools[pool][5]
+            lower = tick - rng.randint(-2000, 4000)
+            upper = lower + rng.randint(10, 6000)
+            staked = rng.random() < 0.5
+            amount0, amount1 = rng.randint(10 ** 15, 10 ** 21), rng.randint(10 ** 15, 10 ** 21)
+            self.positions.setdefault(pool, []).append((rng.choice(self.accounts), staked, self._row(self._position_fields, {
+                "id": position_id, "lp": self.pools[pool][0], "liquidity": rng.randint(10 ** 12, 10 ** 20),
+                "staked": int(staked), "amount0": amount0, "amount1": amount1,
+                "staked0": amount0 if staked else 0, "staked1": amount1 if staked else 0,
+                "emissions_earned": rng.randint(0, 10 ** 20),
+                "tick_lower": lower, "tick_upper": upper,
+                "sqrt_ratio_lower": sqrt_ratio_at(lower), "sqrt_ratio_upper": sqrt_ratio_at(upper),
+            })))
+
+    @staticmethod
+    def _row(fields: list, values: dict) -> tuple:
+        defaults = {"address": "0x" + "00" * 20, "string": "", "bool": False}
+        return tuple(values.get(field["name"], defaults.get(field["type"], 0)) for field in fields)
+
+    def _register(self, abi: list) -> dict:
+        table = {}
+        for fn in abi:
+            if fn.get("type") == "function":
+                table[function_abi_to_4byte_selector(fn)] = fn
+        return table
+
+    def _positions(self, limit, offset, account, staked: bool):
+        account = account.lower()
+        return [
+            row
+            for pool in range(offset, min(offset + limit, len(self.pools)))
+            for owner, is_staked, row in self.positions.get(pool, ())
+            if owner == account and is_staked == staked
+        ]
+
+    def _dispatch(self, fn: dict, to: str, args: tuple):
+        name = fn["name"]
+        if name == "all":
+            limit, offset = args
+            return (self.pools[offset:offset + limit],)
+        if name == "byAddress":
+            return (self.pools[self.pool_index[args[0].lower()]],)
+        if name == "positions":
+            return (self._positions(*args, staked=True),)
+        if name == "positionsUnstakedConcentrated":
+            return (self._positions(*args, staked=False),)
+        if name == "getRateToEth":
+            return (self.token_info[args[0].lower()][2],)
+        if name == "symbol":
+            return (self.token_info[to][0],)
+        if name == "decimals":
+            return (self.token_info[to][1],)
+        if name == "aggregate3":
+            results = []
+            for target, allow_failure, call_data in args[0]:
+                try:
+                    results.append((True, self.call(target.lower(), call_data)))
+                except Exception:
+                    if not allow_failure:
+                        raise
+                    results.append((False, b""))
+            return (results,)
+        if name == "slot0":
+            pool = self.pools[self.pool_index[to]]
+            return (pool[6], pool[5], 0, 1, 1, True)
+        if name == "getBlockNumber":
+            return (self.head,)
+        raise ValueError(f"execution reverted: {name} not simulated")
+
+    def call(self, to: str, data: bytes) -> bytes:
+        functions = self._contracts.get(to)
+        if functions is None:
+            functions = self._cl_pool if to in self.pool_index else self._erc20 if to in self.token_info else {}
+        fn = functions.get(data[:4])
+        if fn is None:
+            raise ValueError("execution reverted")
+        args = decode(get_abi_input_types(fn), data[4:])
+        return encode(get_abi_output_types(fn), self._dispatch(fn, to, args))
+
+    def handle(self, method: str, params: list):
+        if method == "eth_call":
+            tx = params[0]
+            data = tx.get("data") or tx.get("input")
+            return "0x" + self.call(tx["to"].lower(), bytes.fromhex(data[2:])).hex()
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_chainId":
+            return hex(CHAIN_ID)
+        if method == "eth_getLogs":
+            return self.get_logs(params[0])
+        raise ValueError(f"method {method} not simulated")
+
+    def mine(self, pool: str = None, tick: int = None) -> int:
+        """Add a block; with `pool` and `tick`, move that pool there with a Swap log in it."""
+        with self.chain_lock:
+            self.head += 1
+            if pool is not None:
+                index = self.pool_index[pool.lower()]
+                row = list(self.pools[index])
+                row[5], row[6] = tick, sqrt_ratio_at(tick)
+                self.pools[index] = tuple(row)
+                self.swap_logs.append(self._swap_log(pool.lower(), tick, row[6], row[3]))
+            return self.head
+
+    def _swap_log(self, pool: str, tick: int, sqrt_ratio: int, liquidity: int) -> dict:
+        sender = "0x" + "00" * 12 + fake_address("account", 0)[2:]
+        data = encode(["int256", "int256", "uint160", "uint128", "int24"], [10 ** 18, -(10 ** 18), sqrt_ratio, liquidity, tick])
+        return {
+            "address": pool,
+            "topics": [SWAP_TOPIC, sender, sender],
+            "data": "0x" + data.hex(),
+            "blockNumber": hex(self.head),
+            "blockHash": fake_hash("block", self.head),
+            "transactionHash": fake_hash("tx", self.head, len(self.swap_logs)),
+            "transactionIndex": "0x0",
+            "logIndex": hex(len(self.swap_logs)),
+            "removed": False,
+        }
+
+    def get_logs(self, log_filter: dict) -> list:
+        addresses = log_filter.get("address") or []
+        addresses = {address.lower() for address in ([addresses] if isinstance(addresses, str) else addresses)}
+        topics = log_filter.get("topics") or []
+        from_block = block_tag(log_filter.get("fromBlock", self.head))
+        to_block = block_tag(log_filter.get("toBlock", self.head))
+        with self.chain_lock:
+            return [
+                log for log in self.swap_logs
+                if from_block <= int(log["blockNumber"], 16) <= to_block
+                and (not addresses or log["address"] in addresses)
+                and (not topics or topics[0] in (None, log["topics"][0]))
+            ]
+
+
+class ReplayBackend(Backend):
+    """Serves responses recorded by RecordingBackend, matched on (method, params)."""
+
+    def __init__(self, fixture: str):
+        super().__init__()
+        self.responses = {}
+        with open(fixture) as f:
+            for line in f:
+                entry = json.loads(line)
+                self.responses[canonical(entry["method"], entry["params"])] = entry
+
+    def handle(self, method: str, params: list):
+        entry = self.responses.get(canonical(method, params))
+        if entry is None:
+            raise ValueError(f"no recorded response for {method}")
+        if "error" in entry:
+            raise ValueError(entry["error"].get("message", "recorded error"))
+        return entry["result"]
+
+
+class RecordingBackend(Backend):
+    """Forwards payloads unchanged to a real endpoint and appends each pair to a JSONL fixture."""
+
+    def __init__(self, upstream: str, fixture: str):
+        super().__init__()
+        self.upstream = upstream
+        self.session = requests.Session()
+        self.fixture = open(fixture, "a")
+        self.write_lock = Lock()
+
+    def handle_payload(self, payload):
+        requests_ = payload if isinstance(payload, list) else [payload]
+        with self.stats_lock:
+            self.http_requests += 1
+            self.batch_sizes[len(requests_)] += 1
+            self.methods.update(request["method"] for request in requests_)
+
+        response = self.session.post(self.upstream, json=payload, timeout=60).json()
+        responses = response if isinstance(response, list) else [response]
+        by_id = {item.get("id"): item for item in responses}
+
+        with self.write_lock:
+            for request in requests_:
+                item = by_id.get(request.get("id"), {})
+                entry = {"method": request["method"], "params": request.get("params", [])}
+                if "error" in item:
+                    entry["error"] = item["error"]
+                else:
+                    entry["result"] = item.get("result")
+                self.fixture.write(json.dumps(entry) + "\n")
+            self.fixture.flush()
+        return response
+
+
+def make_handler(backend: Backend):
+    class RPCHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # One write per response: separate header/body segments stall on delayed ACKs with keep-alive clients
+        wbufsize = -1
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/mine" and hasattr(backend, "mine"):
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                tick = int(query["tick"]) if "tick" in query else None
+                self._reply({"block": backend.mine(query.get("pool"), tick)})
+                return
+            if url.path == "/reset":
+                backend.reset()
+            self._reply(backend.stats())
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            self._reply(backend.handle_payload(payload))
+
+    return RPCHandler
+
+
+def serve(backend: Backend, host: str = "127.0.0.1", port: int = 8545):
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    server.daemon_threads = True
+    # bench_pipeline.py reads this line to find the port
+    print(f"🧪 Fake RPC listening on http://{host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("synthetic", "record", "replay"))
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--fixture", help="JSONL fixture to record to or replay from")
+    parser.add_argument("--upstream", help="real RPC endpoint to record from")
+    parser.add_argument("--pools", type=int, default=20000)
+    parser.add_argument("--positions", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--accounts", default="", help="comma-separated wallets owning the synthetic positions")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.mode == "synthetic":
+        accounts = [account.strip() for account in args.accounts.split(",") if account.strip()]
+        backend = SyntheticChain(args.pools, args.positions, accounts or None, args.tokens, args.seed)
+    elif args.mode == "record":
+        if not (args.upstream and args.fixture):
+            parser.error("record needs --upstream and --fixture")
+        backend = RecordingBackend(args.upstream, args.fixture)
+    else:
+        if not args.fixture:
+            parser.error("replay needs --fixture")
+        backend = ReplayBackend(args.fixture)
+
+    serve(backend, port=args.port)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
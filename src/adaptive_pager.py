@@ -0,0 +1,182 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, AsyncIterator
+
+from state_db import get_state, set_state
+
+PAGE_LIMIT = 100
+BAND_WIDTH = 1000
+MIN_BATCH_SIZE = 1
+MAX_BATCH_SIZE = int(os.getenv("PAGER_MAX_BATCH_SIZE", "40"))
+# A window answering faster than half of this grows, slower than 1.5x shrinks
+TARGET_SECONDS = float(os.getenv("PAGER_TARGET_SECONDS", "4"))
+PAGER_WORKERS = int(os.getenv("PAGER_WORKERS", "3"))
+MAX_ATTEMPTS = 4
+# A size that failed is not tried again in that band for this long
+CEILING_TTL = float(os.getenv("PAGER_CEILING_TTL", "3600"))
+STATE_KEY = "pager_batch_sizes"
+
+# fetch_window(start_offset, batch_size) -> whatever the caller wants streamed back
+WindowFetcher = Callable[[int, int], Any]
+AsyncWindowFetcher = Callable[[int, int], Awaitable[Any]]
+
+
+def default_batch_size(offset: int) -> int:
+    # The old hand-tuned sizes, only used until a band has been measured
+    if offset < 10000:
+        return 20
+    elif offset < 11000:
+        return 10
+    return 3
+
+
+class AdaptivePager:
+    """
+    Splits the pool range into position windows whose page count adapts per
+    offset band: it grows while windows come back quickly, shrinks when they
+    are slow, and a failed window (timeout, out of gas, oversized response)
+    is halved and retried. The learned sizes are persisted between cycles.
+    """
+
+    def __init__(self, limit: int = PAGE_LIMIT, workers: int = PAGER_WORKERS):
+        self.limit = limit
+        self.workers = workers
+        self._sizes: Dict[int, int] = {}
+        self._ceilings: Dict[int, tuple[int, float]] = {}  # band -> (failing size, wall time)
+        self._loaded = False
+        self._lock = Lock()
+
+    def _load(self):
+        if not self._loaded:
+            stored = get_state(STATE_KEY)
+            if stored:
+                state = json.loads(stored)
+                self._sizes.update({int(band): size for band, size in state.get("sizes", {}).items()})
+                self._ceilings.update({int(band): tuple(c) for band, c in state.get("ceilings", {}).items()})
+            self._loaded = True
+
+    def save(self):
+        with self._lock:
+            set_state(STATE_KEY, json.dumps({"sizes": self._sizes, "ceilings": self._ceilings}, sort_keys=True))
+
+    def _max_size(self, band: int) -> int:
+        ceiling = self._ceilings.get(band)
+        if ceiling and time.time() - ceiling[1] < CEILING_TTL:
+            return max(MIN_BATCH_SIZE, ceiling[0] - 1)
+        return MAX_BATCH_SIZE
+
+    def batch_size_for(self, offset: int) -> int:
+        with self._lock:
+            self._load()
+            return self._sizes.get(offset // BAND_WIDTH, default_batch_size(offset))
+
+    def plan(self, last_non_empty_offset: int) -> List[tuple[int, int]]:
+        windows = []
+        offset = 0
+        while offset <= last_non_empty_offset:
+            batch_size = self.batch_size_for(offset)
+            windows.append((offset, batch_size))
+            offset += self.limit * batch_size
+        return windows
+
+    def record_success(self, offset: int, batch_size: int, elapsed: float):
+        band = offset // BAND_WIDTH
+        with self._lock:
+            current = self._sizes.get(band, default_batch_size(offset))
+            if elapsed < TARGET_SECONDS / 2 and batch_size >= current:
+                self._sizes[band] = min(self._max_size(band), math.ceil(current * 1.5))
+            elif elapsed > TARGET_SECONDS * 1.5:
+                self._sizes[band] = max(MIN_BATCH_SIZE, min(current, batch_size * 2 // 3))
+
+    def record_failure(self, offset: int, batch_size: int, error: Exception):
+        band = offset // BAND_WIDTH
+        with self._lock:
+            current = self._sizes.get(band, default_batch_size(offset))
+            self._sizes[band] = max(MIN_BATCH_SIZE, min(current, batch_size // 2))
+            ceiling = self._ceilings.get(band)
+            if batch_size > MIN_BATCH_SIZE and (not ceiling or batch_size <= ceiling[0] or time.time() - ceiling[1] >= CEILING_TTL):
+                self._ceilings[band] = (batch_size, time.time())
+        print(f"[WARN] Window at offset {offset} x{batch_size} failed ({type(error).__name__}: {str(error)[:120]}), shrinking...")
+
+    def split(self, offset: int, batch_size: int) -> List[tuple[int, int]]:
+        if batch_size <= 1:
+            return [(offset, batch_size)]
+        half = batch_size // 2
+        return [(offset, half), (offset + half * self.limit, batch_size - half)]
+
+    def _timed(self, fetch_window: WindowFetcher, offset: int, batch_size: int):
+        start = time.monotonic()
+        return fetch_window(offset, batch_size), time.monotonic() - start
+
+    def run(self, last_non_empty_offset: int, fetch_window: WindowFetcher) -> Iterator[Any]:
+        """Fetch every window on `workers` threads, yielding results as windows complete."""
+        pending = deque((offset, size, 1) for offset, size in self.plan(last_non_empty_offset))
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pager") as executor:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    offset, batch_size, attempt = pending.popleft()
+                    print(f"[INFO] Fetching positions from offset {offset} with batch_size {batch_size}...")
+                    future = executor.submit(self._timed, fetch_window, offset, batch_size)
+                    running[future] = (offset, batch_size, attempt)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset, batch_size, attempt = running.pop(future)
+                    try:
+                        result, elapsed = future.result()
+                    except Exception as e:
+                        self.record_failure(offset, batch_size, e)
+                        if attempt >= MAX_ATTEMPTS:
+                            raise
+                        pending.extendleft(
+                            (part_offset, part_size, attempt + 1)
+                            for part_offset, part_size in reversed(self.split(offset, batch_size))
+                        )
+                        continue
+                    self.record_success(offset, batch_size, elapsed)
+                    yield result
+
+        self.save()
+
+    async def arun(self, last_non_empty_offset: int, afetch_window: AsyncWindowFetcher) -> AsyncIterator[Any]:
+        """Async counterpart of run(): windows run as concurrent tasks on the event loop."""
+        pending = deque((offset, size, 1) for offset, size in self.plan(last_non_empty_offset))
+        running = {}
+
+        async def timed(offset, batch_size):
+            start = time.monotonic()
+            return await afetch_window(offset, batch_size), time.monotonic() - start
+
+        while pending or running:
+            while pending and len(running) < self.workers:
+                offset, batch_size, attempt = pending.popleft()
+                running[asyncio.ensure_future(timed(offset, batch_size))] = (offset, batch_size, attempt)
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                offset, batch_size, attempt = running.pop(task)
+                try:
+                    result, elapsed = task.result()
+                except Exception as e:
+                    self.record_failure(offset, batch_size, e)
+                    if attempt >= MAX_ATTEMPTS:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    pending.extendleft(
+                        (part_offset, part_size, attempt + 1)
+                        for part_offset, part_size in reversed(self.split(offset, batch_size))
+                    )
+                    continue
+                self.record_success(offset, batch_size, elapsed)
+                yield result
+
+        await asyncio.to_thread(self.save)
@@ -1,36 +1,171 @@
 import sqlite3
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, Optional, Set
 
 DB_PATH = "alerted_positions.db"
 
-def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS alerted_positions (
-                key TEXT PRIMARY KEY
-            )
-        """)
+COLUMNS = {
+    "alerted": "INTEGER NOT NULL DEFAULT 1",
+    "last_tick": "INTEGER",
+    "last_alert_at": "REAL",
+    "alert_count": "INTEGER NOT NULL DEFAULT 0",
+}
 
-def load_alerted_positions():
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.execute("SELECT key FROM alerted_positions")
-        return set(row[0] for row in cursor.fetchall())
 
+@dataclass
+class AlertState:
+    alerted: bool = False
+    last_tick: Optional[int] = None
+    last_alert_at: Optional[float] = None
+    alert_count: int = 0
 
-def add_alerted_position(key: str):
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("INSERT OR IGNORE INTO alerted_positions (key) VALUES (?)", (key,))
 
+class AlertStore:
+    """
+    Per-position alert state behind one long-lived WAL connection. Reads are
+    served from an in-memory mirror loaded once; changes are buffered and
+    written with executemany in a single transaction on flush(), which the
+    alert loop calls once per cycle.
+    """
 
-def remove_alerted_position(key: str):
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("DELETE FROM alerted_positions WHERE key = ?", (key,))
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._states: Dict[str, AlertState] = {}
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._lock = Lock()
 
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS alerted_positions (
+                        key TEXT PRIMARY KEY
+                    )
+                """)
+                # Older databases only have the key column, every row an active alert
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(alerted_positions)")}
+                for column, definition in COLUMNS.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE alerted_positions ADD COLUMN {column} {definition}")
 
-def cleanup_alerted_positions(valid_keys: set):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.execute("SELECT key FROM alerted_positions")
-        existing_keys = set(row[0] for row in cursor.fetchall())
+            rows = conn.execute(
+                "SELECT key, alerted, last_tick, last_alert_at, alert_count FROM alerted_positions"
+            ).fetchall()
+            self._states = {
+                key: AlertState(bool(alerted), last_tick, last_alert_at, alert_count)
+                for key, alerted, last_tick, last_alert_at, alert_count in rows
+            }
+            self._conn = conn
+        return self._conn
 
-        keys_to_delete = existing_keys - valid_keys
-        for key in keys_to_delete:
-            conn.execute("DELETE FROM alerted_positions WHERE key = ?", (key,))
+    def init(self):
+        with self._lock:
+            self._connect()
+
+    def alerted_keys(self) -> Set[str]:
+        with self._lock:
+            self._connect()
+            return {key for key, state in self._states.items() if state.alerted}
+
+    def get(self, key: str) -> AlertState:
+        with self._lock:
+            self._connect()
+            return self._states.get(key, AlertState())
+
+    def _touch(self, key: str) -> AlertState:
+        self._connect()
+        self._deleted.discard(key)
+        self._dirty.add(key)
+        return self._states.setdefault(key, AlertState())
+
+    def observe(self, key: str, tick: int):
+        """Remember the pool tick a position was last checked at, written only if it moved."""
+        with self._lock:
+            self._connect()
+            state = self._states.get(key)
+            if state is None or state.last_tick != tick:
+                self._touch(key).last_tick = tick
+
+    def mark_alerted(self, key: str, tick: Optional[int] = None):
+        with self._lock:
+            state = self._touch(key)
+            state.alerted = True
+            state.last_alert_at = time.time()
+            state.alert_count += 1
+            if tick is not None:
+                state.last_tick = tick
+
+    def clear_alert(self, key: str):
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None and state.alerted:
+                self._touch(key).alerted = False
+
+    def rename(self, renames: Dict[str, str]) -> int:
+        """Move state from old keys to new ones (e.g. a key format change), returns how many moved."""
+        moved = 0
+        with self._lock:
+            self._connect()
+            for old_key, new_key in renames.items():
+                if old_key == new_key or old_key not in self._states:
+                    continue
+                self._states.setdefault(new_key, self._states.pop(old_key))
+                self._dirty.discard(old_key)
+                self._deleted.add(old_key)
+                self._deleted.discard(new_key)
+                self._dirty.add(new_key)
+                moved += 1
+        return moved
+
+    def cleanup(self, valid_keys: Iterable[str]):
+        """Forget every position that is no longer in `valid_keys`."""
+        with self._lock:
+            self._connect()
+            stale = self._states.keys() - set(valid_keys)
+            for key in stale:
+                del self._states[key]
+            self._dirty -= stale
+            self._deleted |= stale
+
+    def flush(self) -> int:
+        """Write buffered changes in one transaction, returns the number of rows touched."""
+        with self._lock:
+            conn = self._connect()
+            if not (self._dirty or self._deleted):
+                return 0
+
+            rows = [
+                (key, int(state.alerted), state.last_tick, state.last_alert_at, state.alert_count)
+                for key, state in ((key, self._states[key]) for key in self._dirty)
+            ]
+            with conn:
+                conn.executemany(
+                    "INSERT INTO alerted_positions (key, alerted, last_tick, last_alert_at, alert_count) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                    "alerted = excluded.alerted, last_tick = excluded.last_tick, "
+                    "last_alert_at = excluded.last_alert_at, alert_count = excluded.alert_count",
+                    rows
+                )
+                conn.executemany("DELETE FROM alerted_positions WHERE key = ?", [(key,) for key in self._deleted])
+
+            touched = len(rows) + len(self._deleted)
+            self._dirty.clear()
+            self._deleted.clear()
+            return touched
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+alert_store = AlertStore()
@@ -0,0 +1,121 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+from web3 import Web3
+
+from async_rpc import AsyncBatch, post_batch
+from contract import cl_pool, erc20, price_oracle, sugar_lp
+from data_models import Lp, Position, Token
+from pool_discovery import discover_last_pool_offset
+from helpers import (
+    account_addresses,
+    aero,
+    pool_index,
+    position_pager,
+    price_snapshot,
+    probe_lp_pages,
+    split_account_pages,
+    token_registry,
+)
+
+
+async def async_get_block_number() -> int:
+    (response,) = await post_batch([{"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []}])
+    return int(response["result"], 16)
+
+
+async def async_get_positions_window(
+    limit: int = 100,
+    batch_size: int = 3,
+    start_offset: int = 0,
+    accounts: List[str] = None
+) -> tuple[List[Position], List[Position]]:
+    offsets = [start_offset + i * limit for i in range(batch_size)]
+    accounts = [Web3.to_checksum_address(account) for account in (accounts or account_addresses)]
+
+    batch = AsyncBatch()
+    for account in accounts:
+        for offset in offsets:
+            batch.add(sugar_lp().positions(limit, offset, account))
+    for account in accounts:
+        for offset in offsets:
+            batch.add(sugar_lp().positionsUnstakedConcentrated(limit, offset, account))
+    batch_responses = await batch.execute()
+
+    return split_account_pages(batch_responses, accounts, batch_size)
+
+
+async def async_scan_positions() -> AsyncIterator[tuple[List[Position], List[Position]]]:
+    # Discovery is usually one small batch plus SQLite, keep it off the loop
+    last_non_empty_offset = await asyncio.to_thread(discover_last_pool_offset, probe_lp_pages)
+    if last_non_empty_offset is None:
+        return
+
+    async def fetch_window(offset: int, batch_size: int):
+        return await async_get_positions_window(limit=100, batch_size=batch_size, start_offset=offset, accounts=account_addresses)
+
+    async for window in position_pager.arun(last_non_empty_offset, fetch_window):
+        yield window
+
+
+async def async_get_all_positions() -> tuple[List[Position], List[Position]]:
+    all_positions = []
+    all_unstaked_positions = []
+
+    async for pos_batch, unstaked_batch in async_scan_positions():
+        all_positions.extend(pos_batch)
+        all_unstaked_positions.extend(unstaked_batch)
+
+    return (all_positions, all_unstaked_positions)
+
+
+async def async_get_lps_by_address(pool_addresses: List[str]) -> List[Lp]:
+    batch = AsyncBatch()
+    for pool in pool_addresses:
+        batch.add(sugar_lp().byAddress(pool))
+    return [Lp(*result) for result in await batch.execute()]
+
+
+async def async_get_pool_slot0(pool_addresses: List[str]) -> List[tuple[int, int]]:
+    batch = AsyncBatch()
+    for pool in pool_addresses:
+        batch.add(cl_pool(pool).slot0())
+    return [(result[0], result[1]) for result in await batch.execute()]
+
+
+async def async_get_lps_from_positions(positions: List[Position]) -> List[Lp]:
+    by_pool = await pool_index.alookup(
+        (pos.lp for pos in positions), async_get_lps_by_address, async_get_pool_slot0, full_read=True
+    )
+    return [by_pool[pos.lp.lower()] for pos in positions]
+
+
+async def async_fetch_tokens_batch(addresses: List[str]) -> List[Token]:
+    batch = AsyncBatch()
+    for address in addresses:
+        token = erc20(address)
+        batch.add(token.symbol())
+        batch.add(token.decimals())
+    batch_responses = await batch.execute()
+
+    return [Token(batch_responses[i], batch_responses[i + 1]) for i in range(0, len(batch_responses), 2)]
+
+
+async def async_get_rate_to_eth_batch(token_list: List[str]) -> List[int]:
+    batch = AsyncBatch()
+    for token in token_list:
+        batch.add(price_oracle().getRateToEth(token, False))
+    return await batch.execute()
+
+
+async def async_resolve_lp_tokens(lps: List[Lp]) -> Dict[str, Token]:
+    return await token_registry.aresolve([addr for lp in lps for addr in (lp.token0, lp.token1)], async_fetch_tokens_batch)
+
+
+async def async_snapshot_lp_prices(lps: List[Lp]) -> Dict[str, int]:
+    if not lps:
+        return {}
+    return await price_snapshot.aprefetch(
+        [addr for lp in lps for addr in (lp.token0, lp.token1)] + [aero],
+        async_get_rate_to_eth_batch
+    )
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+from web3.exceptions import Web3RPCError
+
+from codec import ContractCall, decode_results, eth_call_params
+from contract import endpoint_pool
+from metrics import batch_method, record_rpc
+from rpc_pool import RPC_TIMEOUT
+
+ASYNC_RPC_CONCURRENCY = int(os.getenv("ASYNC_RPC_CONCURRENCY", "4"))
+
+_sessions: Dict[str, aiohttp.ClientSession] = {}
+_semaphore = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(ASYNC_RPC_CONCURRENCY)
+    return _semaphore
+
+
+def _get_session(url: str) -> aiohttp.ClientSession:
+    session = _sessions.get(url)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT),
+            raise_for_status=True,
+        )
+        _sessions[url] = session
+    return session
+
+
+async def post_batch(payload: List[dict]) -> List[dict]:
+    """
+    Send a JSON-RPC batch to the healthiest endpoint, failing over in the
+    same order as the sync EndpointPool and feeding it latency/error stats.
+    At most ASYNC_RPC_CONCURRENCY batches are in flight at once.
+    """
+    async with _get_semaphore():
+        error = None
+        for ep in endpoint_pool.ranked():
+            endpoint_pool.begin(ep)
+            start = time.monotonic()
+            try:
+                async with _get_session(ep.url).post(ep.url, json=payload) as response:
+                    body = await response.json(content_type=None)
+                if isinstance(body, dict):
+                    # A single error object instead of a batch response
+                    raise Web3RPCError(str(body.get("error", body)), rpc_response=body)
+            except Exception as e:
+                elapsed = time.monotonic() - start
+                endpoint_pool.record_failure(ep, e, elapsed)
+                record_rpc(ep.name, batch_method(payload), elapsed, len(payload), error=e)
+                error = e
+                continue
+            elapsed = time.monotonic() - start
+            endpoint_pool.record_success(ep, elapsed)
+            record_rpc(ep.name, batch_method(payload), elapsed, len(payload))
+            return sorted(body, key=lambda item: item["id"])
+        raise error
+
+
+class AsyncBatch:
+    """Async counterpart of JsonRpcBatch: add() ContractCalls, then await execute()."""
+
+    def __init__(self):
+        self._calls = []
+
+    def add(self, call: ContractCall):
+        self._calls.append(call)
+
+    async def execute(self) -> List[Any]:
+        if not self._calls:
+            return []
+
+        calls, self._calls = self._calls, []
+        payload = [
+            {"jsonrpc": "2.0", "id": idx, "method": "eth_call", "params": eth_call_params(call)}
+            for idx, call in enumerate(calls)
+        ]
+        return decode_results(calls, await post_batch(payload))
+
+
+async def close_sessions():
+    for session in _sessions.values():
+        await session.close()
+    _sessions.clear()
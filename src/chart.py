@@ -0,0 +1,274 @@
+import os
+from collections import OrderedDict
+from decimal import Decimal, ROUND_DOWN
+from importlib.util import find_spec
+from io import BytesIO
+from threading import Lock
+
+from PIL import Image, ImageDraw, ImageFont
+
+from metrics import record_cache, stage_timer
+
+# "matplotlib" (template + blitting) or "pillow" (pure Pillow, fastest)
+CHART_RENDERER = os.getenv("CHART_RENDERER", "matplotlib")
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "256"))
+
+WIDTH, HEIGHT, DPI = 1080, 300, 150
+ACTIVE_COLOR = '#00e6b8'
+BG_COLOR = '#5f6d67'
+TICK_COLOR = '#f6c744'
+FACE_COLOR = '#101615'
+
+# Layout constants (y in data units, x normalized to the visible price range)
+BAR_Y = 0.9
+BAR_HEIGHT = 0.06
+ARROW_OFFSET = 0.10
+LABEL_OFFSET = 0.45
+SYMMETRIC_OFFSET = 0.18
+Y_LIMITS = (0.33, 1.3)
+X_LIMITS = (-0.02, 1.02)
+
+
+def quantize_price(value, precision: int = 8) -> Decimal:
+    """`value` cut to `precision` decimal places, as the formatter prints prices."""
+    d = Decimal(str(value))
+    if not d.is_finite():
+        return d
+    return d.quantize(Decimal(f"1e-{precision}"), rounding=ROUND_DOWN)
+
+
+def chart_key(lower_price, price_now, upper_price, precision: int = 8) -> tuple[Decimal, Decimal, Decimal]:
+    """
+    Prices as the chart labels show them. Moves below the label precision
+    map to the same key, and so reuse the cached PNG.
+    """
+    return tuple(quantize_price(v, precision) for v in (lower_price, price_now, upper_price))
+
+
+def format_label(val, precision: int = 8) -> str:
+    return format(quantize_price(val, precision).normalize(), 'f')
+
+
+def normalize(lower: Decimal, current: Decimal, upper: Decimal) -> tuple[float, float, float]:
+    """Map the three prices into [0, 1] of a view padded by 30% of their spread."""
+    min_range, max_range = min(lower, current, upper), max(lower, current, upper)
+    margin = (max_range - min_range) * Decimal("0.3")
+    view_min, view_max = min_range - margin, max_range + margin
+    span = view_max - view_min
+    if span == 0:
+        return (0.5, 0.5, 0.5)
+    return tuple(float((v - view_min) / span) for v in (lower, current, upper))
+
+
+class MatplotlibSliderRenderer:
+    """
+    Keeps one Agg figure whose static background (facecolor and the grey
+    bar, which always spans the normalized view) is rendered once and
+    cached as a pixel buffer. Each chart restores that background, moves the
+    dynamic artists and blits only them.
+    """
+
+    def __init__(self):
+        # matplotlib is imported on the first chart, not at startup: it is
+        # a few hundred ms of the bot's import time and most cycles draw nothing
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.lines import Line2D
+        from matplotlib.patches import FancyBboxPatch, Rectangle
+
+        self._lock = Lock()
+        self.fig = Figure(figsize=(WIDTH / DPI, HEIGHT / DPI), dpi=DPI, facecolor=FACE_COLOR)
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_axes((0, 0, 1, 1))
+        ax.set(xlim=X_LIMITS, ylim=Y_LIMITS)
+        ax.set_facecolor(FACE_COLOR)
+        ax.axis('off')
+
+        ax.add_patch(FancyBboxPatch((0, BAR_Y - BAR_HEIGHT / 2), 1, BAR_HEIGHT,
+                                    boxstyle="round,pad=0.01", linewidth=0, facecolor=BG_COLOR))
+
+        self.active = ax.add_patch(Rectangle((0, BAR_Y - BAR_HEIGHT / 2), 0, BAR_HEIGHT,
+                                             linewidth=0, facecolor=ACTIVE_COLOR, zorder=1))
+        self.endpoints = ax.add_line(Line2D([0, 0], [BAR_Y, BAR_Y], linestyle='', marker='o',
+                                            markersize=13, color=ACTIVE_COLOR, zorder=2))
+        self.tick = ax.add_line(Line2D([0, 0], [BAR_Y - ARROW_OFFSET, BAR_Y + ARROW_OFFSET],
+                                       color=TICK_COLOR, linewidth=2, zorder=3))
+        self.arrow_down = ax.annotate('', xy=(0, BAR_Y), xytext=(0, BAR_Y + ARROW_OFFSET),
+                                      arrowprops=dict(arrowstyle='-|>', color=TICK_COLOR, linewidth=2), zorder=4)
+        self.arrow_up = ax.annotate('', xy=(0, BAR_Y - ARROW_OFFSET), xytext=(0, BAR_Y),
+                                    arrowprops=dict(arrowstyle='<|-', color=TICK_COLOR, linewidth=2), zorder=4)
+
+        zone_y = BAR_Y - LABEL_OFFSET
+        self.zone_labels = [
+            ax.text(0, zone_y, "OUT", ha='center', va='center', fontsize=9, color='gray'),
+            ax.text(0, zone_y, "ACTIVE RANGE", ha='center', va='center', fontsize=9, color=ACTIVE_COLOR),
+            ax.text(0, zone_y, "OUT", ha='center', va='center', fontsize=9, color='gray'),
+        ]
+        self.lower_label = ax.text(0, BAR_Y + SYMMETRIC_OFFSET, '', ha='center', va='bottom',
+                                   fontsize=10, color=ACTIVE_COLOR, fontweight='bold')
+        self.upper_label = ax.text(0, BAR_Y + SYMMETRIC_OFFSET, '', ha='center', va='bottom',
+                                   fontsize=10, color=ACTIVE_COLOR, fontweight='bold')
+        self.current_label = ax.text(0, BAR_Y - SYMMETRIC_OFFSET, '', ha='center', va='top',
+                                     fontsize=10, fontweight='bold', color=TICK_COLOR,
+                                     bbox=dict(boxstyle="round,pad=0.25", fc=FACE_COLOR, ec=TICK_COLOR, lw=1.5))
+
+        self.dynamic = [self.active, self.endpoints, self.tick, self.arrow_down, self.arrow_up,
+                        *self.zone_labels, self.lower_label, self.upper_label, self.current_label]
+        for artist in self.dynamic:
+            artist.set_animated(True)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def render(self, lower: Decimal, current: Decimal, upper: Decimal, precision: int = 8) -> bytes:
+        lower_f, current_f, upper_f = normalize(lower, current, upper)
+
+        with self._lock:
+            self.active.set_x(lower_f)
+            self.active.set_width(upper_f - lower_f)
+            self.endpoints.set_xdata([lower_f, upper_f])
+            self.tick.set_xdata([current_f, current_f])
+            self.arrow_down.xy = (current_f, BAR_Y)
+            self.arrow_down.set_position((current_f, BAR_Y + ARROW_OFFSET))
+            self.arrow_up.xy = (current_f, BAR_Y - ARROW_OFFSET)
+            self.arrow_up.set_position((current_f, BAR_Y))
+            for label, x in zip(self.zone_labels, (lower_f / 2, (lower_f + upper_f) / 2, (upper_f + 1) / 2)):
+                label.set_x(x)
+            self.lower_label.set_x(lower_f)
+            self.lower_label.set_text(format_label(lower, precision))
+            self.upper_label.set_x(upper_f)
+            self.upper_label.set_text(format_label(upper, precision))
+            self.current_label.set_x(current_f)
+            self.current_label.set_text(format_label(current, precision))
+
+            self.canvas.restore_region(self.background)
+            for artist in self.dynamic:
+                self.ax.draw_artist(artist)
+
+            width, height = self.canvas.get_width_height()
+            image = Image.frombuffer("RGBA", (width, height), bytes(self.canvas.buffer_rgba()), "raw", "RGBA", 0, 1)
+
+        buf = BytesIO()
+        image.convert("RGB").save(buf, format="PNG", compress_level=1)
+        return buf.getvalue()
+
+
+def _font_dir() -> str:
+    # matplotlib's bundled DejaVu fonts, located without importing matplotlib
+    spec = find_spec("matplotlib")
+    return os.path.join(spec.submodule_search_locations[0], "mpl-data", "fonts", "ttf") if spec else ""
+
+
+def _load_font(size: int, bold: bool = False):
+    try:
+        return ImageFont.truetype(os.path.join(_font_dir(), "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"), size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+class PillowSliderRenderer:
+    """Draws the same slider with ImageDraw only, skipping matplotlib entirely."""
+
+    def __init__(self):
+        self.font = _load_font(19)
+        self.bold_font = _load_font(21, bold=True)
+
+    def _x(self, value: float) -> int:
+        return round((value - X_LIMITS[0]) / (X_LIMITS[1] - X_LIMITS[0]) * WIDTH)
+
+    def _y(self, value: float) -> int:
+        return round((Y_LIMITS[1] - value) / (Y_LIMITS[1] - Y_LIMITS[0]) * HEIGHT)
+
+    def render(self, lower: Decimal, current: Decimal, upper: Decimal, precision: int = 8) -> bytes:
+        lower_f, current_f, upper_f = normalize(lower, current, upper)
+        image = Image.new("RGB", (WIDTH, HEIGHT), FACE_COLOR)
+        draw = ImageDraw.Draw(image)
+
+        bar_top, bar_bottom = self._y(BAR_Y + BAR_HEIGHT / 2), self._y(BAR_Y - BAR_HEIGHT / 2)
+        bar_mid = self._y(BAR_Y)
+        draw.rounded_rectangle((self._x(0), bar_top, self._x(1), bar_bottom), radius=4, fill=BG_COLOR)
+        draw.rectangle((self._x(lower_f), bar_top, self._x(upper_f), bar_bottom), fill=ACTIVE_COLOR)
+        for x in (lower_f, upper_f):
+            draw.ellipse((self._x(x) - 13, bar_mid - 13, self._x(x) + 13, bar_mid + 13), fill=ACTIVE_COLOR)
+
+        cx = self._x(current_f)
+        tick_top, tick_bottom = self._y(BAR_Y + ARROW_OFFSET), self._y(BAR_Y - ARROW_OFFSET)
+        draw.line((cx, tick_top, cx, tick_bottom), fill=TICK_COLOR, width=4)
+        draw.polygon([(cx - 9, bar_mid - 16), (cx + 9, bar_mid - 16), (cx, bar_mid)], fill=TICK_COLOR)
+        draw.polygon([(cx - 9, tick_bottom), (cx + 9, tick_bottom), (cx, bar_mid + 16)], fill=TICK_COLOR)
+
+        zone_y = self._y(BAR_Y - LABEL_OFFSET)
+        for x, text, color in ((lower_f / 2, "OUT", "gray"),
+                               ((lower_f + upper_f) / 2, "ACTIVE RANGE", ACTIVE_COLOR),
+                               ((upper_f + 1) / 2, "OUT", "gray")):
+            draw.text((self._x(x), zone_y), text, fill=color, font=self.font, anchor="mm")
+
+        label_y = self._y(BAR_Y + SYMMETRIC_OFFSET)
+        draw.text((self._x(lower_f), label_y), format_label(lower, precision), fill=ACTIVE_COLOR, font=self.bold_font, anchor="md")
+        draw.text((self._x(upper_f), label_y), format_label(upper, precision), fill=ACTIVE_COLOR, font=self.bold_font, anchor="md")
+
+        current_text = format_label(current, precision)
+        box = draw.textbbox((cx, self._y(BAR_Y - SYMMETRIC_OFFSET) + 8), current_text, font=self.bold_font, anchor="ma")
+        draw.rounded_rectangle((box[0] - 10, box[1] - 8, box[2] + 10, box[3] + 8), radius=8,
+                               fill=FACE_COLOR, outline=TICK_COLOR, width=3)
+        draw.text((cx, self._y(BAR_Y - SYMMETRIC_OFFSET) + 8), current_text, fill=TICK_COLOR, font=self.bold_font, anchor="ma")
+
+        buf = BytesIO()
+        image.save(buf, format="PNG", compress_level=1)
+        return buf.getvalue()
+
+
+class ChartCache:
+    """LRU of rendered PNG bytes keyed by quantized (lower, now, upper) prices."""
+
+    def __init__(self, max_size: int = CHART_CACHE_SIZE):
+        self.max_size = max_size
+        self._items: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+        record_cache("chart", hits=png is not None, misses=png is None)
+        return png
+
+    def put(self, key, png: bytes):
+        with self._lock:
+            self._items[key] = png
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+_renderers = {}
+_renderers_lock = Lock()
+chart_cache = ChartCache()
+
+
+def get_renderer(name: str = None):
+    name = name or CHART_RENDERER
+    with _renderers_lock:
+        if name not in _renderers:
+            _renderers[name] = PillowSliderRenderer() if name == "pillow" else MatplotlibSliderRenderer()
+        return _renderers[name]
+
+
+def render_price_slider(lower_price, price_now, upper_price, precision: int = 8, renderer: str = None) -> BytesIO:
+    lower, current, upper = chart_key(lower_price, price_now, upper_price, precision)
+    key = (lower, current, upper, precision, renderer or CHART_RENDERER)
+
+    png = chart_cache.get(key)
+    if png is None:
+        with stage_timer("render"):
+            png = get_renderer(renderer).render(lower, current, upper, precision)
+        chart_cache.put(key, png)
+    return BytesIO(png)
@@ -0,0 +1,218 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from eth_abi import decode, encode
+from eth_abi.exceptions import InsufficientDataBytes
+from eth_utils.abi import collapse_if_tuple, function_abi_to_4byte_selector
+from web3.exceptions import BadFunctionCallOutput, Web3RPCError
+
+# Calldata of repeated calls (the same page of positions() every cycle) is encoded once
+CALLDATA_CACHE_SIZE = 8192
+
+WORD = 32
+
+
+def _word(data: bytes, offset: int) -> int:
+    return int.from_bytes(data[offset:offset + WORD], "big")
+
+
+def _need(data: bytes, end: int):
+    """Raise like eth_abi when the return data stops before `end`, instead of reading zeros."""
+    if end > len(data):
+        raise InsufficientDataBytes(f"Tried to read up to byte {end}, only got {len(data)} bytes.")
+
+
+def _static_reader(abi_type: str) -> Optional[Callable[[bytes, int], Any]]:
+    """Reader for one head word of an elementary static type, None if there is no fast path."""
+    if "[" in abi_type:
+        return None
+    if abi_type == "address":
+        return lambda data, at: "0x" + data[at + 12:at + WORD].hex()
+    if abi_type == "bool":
+        return lambda data, at: data[at + WORD - 1] == 1
+    if abi_type.startswith("uint"):
+        return _word
+    if abi_type.startswith("int"):
+        return lambda data, at: int.from_bytes(data[at:at + WORD], "big", signed=True)
+    return None
+
+
+def _string_reader(data: bytes, base: int, at: int) -> str:
+    start = base + _word(data, at)
+    _need(data, start + WORD)
+    length = _word(data, start)
+    _need(data, start + WORD + -(-length // WORD) * WORD)  # padded to a whole word, as eth_abi checks
+    return data[start + WORD:start + WORD + length].decode("utf-8")
+
+
+def _tuple_reader(components: List[dict]) -> Optional[Callable[[bytes, int], tuple]]:
+    """
+    Reader for a tuple of elementary values and strings (the shape of every
+    Sugar record), given the tuple's start offset. None for anything else.
+    """
+    readers = []
+    for index, component in enumerate(components):
+        at = index * WORD
+        if component["type"] == "string":
+            readers.append(lambda data, base, at=at: _string_reader(data, base, base + at))
+            continue
+        read = _static_reader(component["type"])
+        if read is None:
+            return None
+        readers.append(lambda data, base, at=at, read=read: read(data, base + at))
+
+    size = len(components) * WORD
+
+    def read_tuple(data: bytes, base: int) -> tuple:
+        _need(data, base + size)
+        return tuple(read(data, base) for read in readers)
+
+    return read_tuple
+
+
+def _fast_decoder(outputs: List[dict]) -> Optional[Callable[[bytes], Any]]:
+    """
+    Direct decoder for a single `tuple[]` or `tuple` output of elementary
+    values and strings, e.g. LpSugar.all/positions/byAddress: reads the
+    head words straight out of the return data instead of going through
+    eth_abi's generic decoder stack, which is ~10x slower on these.
+    """
+    if len(outputs) != 1 or outputs[0]["type"] not in ("tuple", "tuple[]"):
+        return None
+    components = outputs[0]["components"]
+    read_tuple = _tuple_reader(components)
+    if read_tuple is None:
+        return None
+    # A tuple with a string member sits behind an offset; a static one is inlined
+    dynamic = any(component["type"] == "string" for component in components)
+    size = len(components) * WORD
+
+    def decode_tuple(data: bytes) -> tuple:
+        if not dynamic:
+            return read_tuple(data, 0)
+        _need(data, WORD)
+        return read_tuple(data, _word(data, 0))
+
+    if outputs[0]["type"] == "tuple":
+        return decode_tuple
+
+    def decode_array(data: bytes) -> list:
+        _need(data, WORD)
+        array = _word(data, 0)
+        _need(data, array + WORD)
+        heads = array + WORD
+        count = _word(data, array)
+        # Every element needs at least its head; also rules out absurd counts from garbage data
+        _need(data, heads + count * (WORD if dynamic else size))
+        if not dynamic:
+            return [read_tuple(data, heads + i * size) for i in range(count)]
+        return [read_tuple(data, heads + _word(data, heads + i * WORD)) for i in range(count)]
+
+    return decode_array
+
+
+class ContractFunction:
+    """One ABI function, parsed once: selector, types, calldata encoder and return data decoder."""
+
+    def __init__(self, abi: dict):
+        self.abi = abi
+        self.name = abi["name"]
+        self.selector = function_abi_to_4byte_selector(abi)
+        self.input_types = [collapse_if_tuple(item) for item in abi["inputs"]]
+        self.output_types = [collapse_if_tuple(item) for item in abi["outputs"]]
+        self._fast_decode = _fast_decoder(abi["outputs"])
+        self._cached_encode = lru_cache(maxsize=CALLDATA_CACHE_SIZE)(self._encode)
+
+    def _encode(self, *args) -> bytes:
+        return self.selector + encode(self.input_types, args)
+
+    def encode(self, *args) -> bytes:
+        try:
+            return self._cached_encode(*args)
+        except TypeError:
+            # Unhashable arguments (lists of sub-calls) are encoded every time
+            return self._encode(*args)
+
+    def decode(self, data: bytes) -> Any:
+        """
+        Return data as Python values, a single output unwrapped like web3's
+        call() does. Addresses come back lowercase, not checksummed. Empty
+        return data (no contract at the address, or a node answering "0x")
+        raises BadFunctionCallOutput and short data InsufficientDataBytes,
+        never an empty result.
+        """
+        if not data and self.output_types:
+            raise BadFunctionCallOutput(
+                f"{self.name} returned no data: is the contract deployed at this address and synced?"
+            )
+        if self._fast_decode is not None:
+            return self._fast_decode(data)
+        values = decode(self.output_types, data)
+        return values[0] if len(values) == 1 else values
+
+
+class ContractCall:
+    __slots__ = ("to", "data", "function", "args")
+
+    def __init__(self, to: str, data: bytes, function: ContractFunction, args: tuple):
+        self.to = to
+        self.data = data
+        self.function = function
+        self.args = args
+
+    def decode(self, data: bytes) -> Any:
+        return self.function.decode(data)
+
+
+def _normalize(abi_type: str, value):
+    # The ABI encoder rejects mixed-case addresses with a bad checksum; lowercase is always valid
+    return value.lower() if abi_type == "address" and isinstance(value, str) else value
+
+
+class ContractCodec:
+    """
+    A contract ABI parsed once. at(address) gives call builders, e.g.
+    sugar.at(address).positions(limit, offset, account) -> ContractCall.
+    """
+
+    def __init__(self, abi: List[dict]):
+        self.functions: Dict[str, ContractFunction] = {
+            item["name"]: ContractFunction(item) for item in abi if item.get("type") == "function"
+        }
+
+    def at(self, address: str) -> "BoundContract":
+        return BoundContract(self, address)
+
+
+class BoundContract:
+    __slots__ = ("codec", "address")
+
+    def __init__(self, codec: ContractCodec, address: str):
+        self.codec = codec
+        self.address = address
+
+    def __getattr__(self, name: str) -> Callable[..., ContractCall]:
+        function = self.codec.functions[name]
+
+        def build(*args) -> ContractCall:
+            args = tuple(_normalize(abi_type, arg) for abi_type, arg in zip(function.input_types, args))
+            return ContractCall(self.address, function.encode(*args), function, args)
+
+        return build
+
+
+def eth_call_params(call: ContractCall) -> list:
+    return [{"to": call.to, "data": "0x" + call.data.hex()}, "latest"]
+
+
+def decode_results(calls: Sequence[ContractCall], responses: List[dict]) -> List[Any]:
+    """Decode JSON-RPC eth_call responses (sorted by id) for `calls`, raising on the first error."""
+    if not isinstance(responses, list):
+        # RPC errors return only one response with the error object
+        raise Web3RPCError(str(responses.get("error", responses)), rpc_response=responses)
+    results = []
+    for call, response in zip(calls, responses):
+        if "error" in response:
+            raise Web3RPCError(f"{call.function.name}: {response['error']}", rpc_response=response)
+        results.append(call.decode(bytes.fromhex(response["result"][2:])))
+    return results
@@ -1,37 +1,65 @@
 from web3 import Web3
 import json
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-from itertools import cycle
+
+from codec import BoundContract, ContractCodec
+from rpc_pool import EndpointPool
 
 load_dotenv()
 
+ABI_DIR = os.getenv("ABI_DIR", "./abi")
+DEFAULT_MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
 rpc_endpoints = [
     "https://base-rpc.publicnode.com",
     "https://base-mainnet.g.alchemy.com/v2/kPcGp_dGOu5_SZcimim9MENYoCRjRhme",
     "https://base-mainnet.blastapi.io/60127835-9b43-4e83-a01f-264fb2a820f4"
 ]
-sugar_lp_address = Web3.to_checksum_address(os.getenv("SUGAR_LP_ADDRESS"))
-price_oracle_address = Web3.to_checksum_address(os.getenv("PRICE_ORACLE_ADDRESS"))
+if os.getenv("RPC_ENDPOINTS"):
+    # e.g. a local anvil fork: RPC_ENDPOINTS=http://127.0.0.1:8545
+    rpc_endpoints = [rpc.strip() for rpc in os.getenv("RPC_ENDPOINTS").split(",") if rpc.strip()]
 
-with open('./abi/LpSugar.json', 'r') as abi_file:
-    sugar_lp_abi = json.load(abi_file)
+endpoint_pool = EndpointPool(rpc_endpoints)
 
-with open('./abi/ERC20.json', 'r') as abi_file:
-    erc20_abi = json.load(abi_file)
+def get_web3():
+    return endpoint_pool.get_web3()
 
-with open('./abi/OffchainOracle.json', 'r') as abi_file:
-    price_oracle_abi = json.load(abi_file)
+# ABIs, addresses and codecs are loaded on first use, not at import: a
+# missing setting fails the call that needs it instead of the whole process
 
-rpc_cycle = cycle(rpc_endpoints)
+@lru_cache(maxsize=None)
+def load_abi(name: str) -> list:
+    with open(os.path.join(ABI_DIR, f"{name}.json"), 'r') as abi_file:
+        return json.load(abi_file)
 
-def get_web3():
-    rpc = next(rpc_cycle)
-    print(f"👉 Using RPC: {rpc}")
-    return Web3(Web3.HTTPProvider(rpc))
+@lru_cache(maxsize=None)
+def codec(name: str) -> ContractCodec:
+    """ABI `name` parsed once; calls are built and decoded without web3 contract objects."""
+    return ContractCodec(load_abi(name))
+
+@lru_cache(maxsize=None)
+def contract_address(env_var: str, default: str = None) -> str:
+    address = os.getenv(env_var, default)
+    if not address:
+        raise RuntimeError(f"{env_var} is not set")
+    return Web3.to_checksum_address(address)
+
+@lru_cache(maxsize=None)
+def sugar_lp() -> BoundContract:
+    return codec("LpSugar").at(contract_address("SUGAR_LP_ADDRESS"))
+
+@lru_cache(maxsize=None)
+def price_oracle() -> BoundContract:
+    return codec("OffchainOracle").at(contract_address("PRICE_ORACLE_ADDRESS"))
+
+@lru_cache(maxsize=None)
+def multicall3() -> BoundContract:
+    return codec("Multicall3").at(contract_address("MULTICALL3_ADDRESS", DEFAULT_MULTICALL3_ADDRESS))
 
-def sugar_lp(web3):
-    return web3.eth.contract(address=sugar_lp_address, abi=sugar_lp_abi)
+def erc20(address) -> BoundContract:
+    return codec("ERC20").at(address)
 
-def price_oracle(web3):
-    return web3.eth.contract(address=price_oracle_address, abi=price_oracle_abi)
\ No newline at end of file
+def cl_pool(address) -> BoundContract:
+    return codec("CLPool").at(address)
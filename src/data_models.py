@@ -1,6 +1,9 @@
 from dataclasses import dataclass
 
-@dataclass
+# Slotted records: no per-instance __dict__. Lp and Position are not frozen,
+# a frozen __init__ is ~7x slower and thousands are built per scan; treat
+# them as read-only all the same, they are shared through the snapshot.
+@dataclass(slots=True)
 class Lp:
     lp: str
     symbol: str
@@ -30,8 +33,11 @@ class Lp:
     nfpm: str
     alm: str
     root: str
+    # Not part of the Sugar tuple: when only tick/sqrt_ratio were re-read (slot0),
+    # the time the other fields (reserves, staked, emissions) were read; 0 = current
+    state_at: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     id: int
     lp: str
@@ -49,8 +55,10 @@ class Position:
     sqrt_ratio_lower: int
     sqrt_ratio_upper: int
     alm: str
+    # Not part of the Sugar tuple: the wallet the position was listed for
+    account: str = ""
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Token:
     symbol: str
     decimals: int
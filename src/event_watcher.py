@@ -0,0 +1,55 @@
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+from web3 import Web3
+
+# Slipstream (concentrated) pools emit the Uniswap V3 Swap event, the new tick is its last data word
+SWAP_TOPIC = Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24)").to_0x_hex()
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "2"))
+EVENT_MAX_BLOCK_RANGE = int(os.getenv("EVENT_MAX_BLOCK_RANGE", "500"))
+
+# get_logs(addresses, from_block, to_block, topic) -> raw log dicts
+LogFetcher = Callable[[List[str], int, int, str], List[dict]]
+
+
+def decode_swap_tick(log: dict) -> int:
+    data = log["data"]
+    data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+    return int.from_bytes(data[128:160], "big", signed=True)
+
+
+class SwapWatcher:
+    """
+    Follows the chain block by block and reports which watched pools swapped
+    since the last poll, with the tick each one ended on. One eth_blockNumber
+    plus one eth_getLogs per new block range replaces a full position rescan.
+    """
+
+    def __init__(self, get_logs_func: LogFetcher, get_block_number_func: Callable[[], int]):
+        self.get_logs_func = get_logs_func
+        self.get_block_number_func = get_block_number_func
+        self.last_block: Optional[int] = None
+
+    def reset(self, block_number: int):
+        """Start watching after `block_number`, the block the current state was read at."""
+        self.last_block = block_number
+
+    def poll(self, pools: Iterable[str]) -> Dict[str, int]:
+        """Returns {pool address (lowercase): latest tick} for pools with Swap logs in new blocks."""
+        head = self.get_block_number_func()
+        if self.last_block is None:
+            self.last_block = head
+            return {}
+
+        addresses = sorted({Web3.to_checksum_address(pool) for pool in pools})
+        ticks = {}
+        from_block = self.last_block + 1
+        while addresses and from_block <= head:
+            to_block = min(head, from_block + EVENT_MAX_BLOCK_RANGE - 1)
+            logs = self.get_logs_func(addresses, from_block, to_block, SWAP_TOPIC)
+            for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+                ticks[log["address"].lower()] = decode_swap_tick(log)
+            from_block = to_block + 1
+
+        self.last_block = head
+        return ticks
@@ -1,12 +1,15 @@
+import time
 from typing import List, Literal
 from decimal import Decimal
-from helpers import convert_by_decimals, convert_sqrtPriceX96_to_price, cal_lp_apr, cal_real_price
+from helpers import convert_by_decimals, cal_lp_apr, get_range_prices, get_range_prices_batch
 
 Style = Literal["ntfy", "telegram"]
 
 class LPFormatter:
-    def __init__(self, style: Style = "telegram"):
+    def __init__(self, style: Style = "telegram", show_account: bool = False):
         self.style = style
+        # Only worth a line when several wallets are monitored
+        self.show_account = show_account
 
     def convert_token_amount(self, raw_balance: int, decimals: int, precision: int = 4) -> str:
         value = convert_by_decimals(raw_balance=raw_balance, decimals=decimals, precision=precision)
@@ -21,17 +24,21 @@ class LPFormatter:
         real_apr = max_arp / div
         return f"{real_apr:,.{precision}f}"
 
-    def format_position(self, pos, lp, token0, token1, is_staked: bool = True) -> str:
+    def stale_note(self, lp) -> str:
+        """APR suffix when only the pool's tick was re-read (slot0), so reserves and emissions lag."""
+        if not lp.state_at:
+            return ""
+        return f" (pool data {int(time.time() - lp.state_at)}s old)"
+
+    def format_position(self, pos, lp, token0, token1, is_staked: bool = True, prices=None) -> str:
+        """`prices` is the position's (upper, now, lower) if already computed in a batch."""
         t0_amt = self.convert_token_amount(pos.staked0 if is_staked else pos.amount0, token0.decimals)
         t1_amt = self.convert_token_amount(pos.staked1 if is_staked else pos.amount1, token1.decimals)
 
         rewards = self.convert_token_amount(pos.emissions_earned, decimals=18)
-        lp_apr = self.calculate_lp_apr(lp, pos, precision=3)
+        lp_apr = self.calculate_lp_apr(lp, pos, precision=3) + "%" + self.stale_note(lp)
 
-        price_now = convert_sqrtPriceX96_to_price(lp.sqrt_ratio, precision=8)
-        price_upper = convert_sqrtPriceX96_to_price(pos.sqrt_ratio_upper, precision=8)
-        price_lower = convert_sqrtPriceX96_to_price(pos.sqrt_ratio_lower, precision=8)
-        (price_upper, price_now, price_lower) = cal_real_price(token0, token1, price_upper, price_now, price_lower)
+        (price_upper, price_now, price_lower) = prices or get_range_prices(pos, lp, token0, token1, precision=8)
 
         in_range = price_lower <= price_now <= price_upper
 
@@ -39,6 +46,7 @@ class LPFormatter:
         price_upper = self.format_price(price_upper)
         price_lower = self.format_price(price_lower)
         range_status = "✅ In Range" if in_range else "⚠️ Out of Range"
+        wallet = f"{pos.account[:6]}…{pos.account[-4:]}" if self.show_account and pos.account else None
 
         if self.style == "telegram":
             return (
@@ -47,8 +55,9 @@ class LPFormatter:
                 f"💰 {token0.symbol}: `{t0_amt}`\n"
                 f"💰 {token1.symbol}: `{t1_amt}`\n"
                 f"🏆 Rewards: `{rewards} AERO`\n"
-                f"💹 APR: `{lp_apr}%`\n\n"
+                f"💹 APR: `{lp_apr}`\n\n"
 
+                + (f"👛 Wallet: `{wallet}`\n" if wallet else "") +
                 f"🔒 Staked: *{'✅ Yes' if is_staked else '❌ No'}*\n"
                 f"🔍 Status: *{range_status}*\n\n"
 
@@ -65,8 +74,9 @@ class LPFormatter:
                 f"💰 {token0.symbol}: {t0_amt}\n"
                 f"💰 {token1.symbol}: {t1_amt}\n"
                 f"🏆 Rewards: {rewards} AERO\n"
-                f"💹 APR: {lp_apr}%\n\n"
+                f"💹 APR: {lp_apr}\n\n"
 
+                + (f"👛 Wallet: {wallet}\n" if wallet else "") +
                 f"🔒 Staked: {'✅ Yes' if is_staked else '❌ No'}\n"
                 f"🔍 Status: {range_status}\n\n"
 
@@ -80,7 +90,9 @@ class LPFormatter:
             return "❌ Unsupported format style"
 
     def format_all(self, positions, lps, get_token_info_func) -> List[str]:
+        token_pairs = [get_token_info_func(lp) for lp in lps]
+        prices = get_range_prices_batch(positions, lps, token_pairs, precision=8)
         return [
-            self.format_position(pos, lps[idx], *get_token_info_func(lps[idx])) + "\n"
+            self.format_position(pos, lps[idx], *token_pairs[idx], prices=prices[idx]) + "\n"
             for idx, pos in enumerate(positions)
         ]
@@ -1,49 +1,62 @@
 import os
-import requests
-import asyncio
 import traceback
 
 from web3 import Web3
-from decimal import Decimal, ROUND_DOWN, getcontext
+from decimal import Decimal
 from telegram import Update, BotCommand
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
-from typing import List, Union, List
-from threading import Lock
+from typing import Callable, Dict, Iterator, List, Union
 from io import BytesIO
 from requests.exceptions import HTTPError, ReadTimeout
 
-import matplotlib
-matplotlib.use("Agg")
-
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyBboxPatch
-from matplotlib.pyplot import subplots
-
-from contract import get_web3, erc20_abi, price_oracle, sugar_lp
+from async_rpc import close_sessions
+from contract import get_web3, erc20, price_oracle, sugar_lp, cl_pool, endpoint_pool
+from multicall import JsonRpcBatch, MulticallBatch, eth_call
 from data_models import Lp, Position, Token
-
-account_address = os.getenv("ACCOUNT_ADDRESS")
+from pool_discovery import POOL_PAGE_LIMIT, discover_last_pool_offset
+from pool_index import PoolIndex
+from adaptive_pager import AdaptivePager
+from chart import render_price_slider
+from token_registry import TokenRegistry
+from price_snapshot import PriceSnapshot
+from telegram_delivery import TelegramDelivery
+from media_cache import media_cache
+from event_watcher import SwapWatcher
+from price_math import lp_apr, range_prices, range_prices_batch, raw_to_decimal, sqrt_price_to_price
+from metrics import stage_timer
+from ntfy_dispatcher import NtfyDispatcher, NtfyMessage
+
+# Comma-separated ACCOUNT_ADDRESSES monitors several wallets in one scan, ACCOUNT_ADDRESS is the single-wallet form
+account_addresses = [
+    address.strip() for address in (os.getenv("ACCOUNT_ADDRESSES") or os.getenv("ACCOUNT_ADDRESS") or "").split(",")
+    if address.strip()
+]
+account_address = account_addresses[0] if account_addresses else None
 ntfy_topic = os.getenv("NTFY_TOPIC")
 telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
 aero = os.getenv("AERO_ADDRESS")
+# "jsonrpc" (one eth_call per request in a JSON-RPC batch) or "multicall3"
+batch_backend = os.getenv("RPC_BATCH_BACKEND", "jsonrpc")
+ntfy_dispatcher = NtfyDispatcher(topic=ntfy_topic)
 
 # HTTPError counter
 consecutive_net_errors = 0
 NET_ERROR_THRESHOLD = 5
 
-# Lock for safe batch requests
-web3_batch_lock = Lock()
-
-def safe_batch_requests():
+def safe_batch_requests(backend: str = None, allow_failure: bool = False):
+    # get_web3() hands out one Web3 per thread, so batches on different
+    # threads never share provider batching state and need no global lock
     class SafeBatch:
         def __enter__(self):
-            web3_batch_lock.acquire()
             self.web3 = get_web3()
-            self.batch = self.web3.batch_requests()
+            if (backend or batch_backend) == "multicall3":
+                self.batch = MulticallBatch(self.web3, allow_failure=allow_failure)
+            else:
+                self.batch = JsonRpcBatch(self.web3)
             return (self.web3, self.batch)
 
         def __exit__(self, exc_type, exc_value, tb):
-            web3_batch_lock.release()
+            pass
     return SafeBatch()
 
 
@@ -55,7 +68,8 @@ def handle_error(e: Exception, context: str = "Error"):
         consecutive_net_errors += 1
         if consecutive_net_errors >= NET_ERROR_THRESHOLD:
             send_ntfy_notification(
-                f"❌ {context} - {type(e).__name__} occurred {consecutive_net_errors} times consecutively."
+                f"❌ {context} - {type(e).__name__} occurred {consecutive_net_errors} times consecutively.\n\n"
+                f"RPC endpoints:\n{endpoint_pool.summary()}"
             )
             consecutive_net_errors = 0  # Reset sau khi gửi
         return
@@ -65,9 +79,12 @@ def handle_error(e: Exception, context: str = "Error"):
     send_ntfy_notification(f"❌ {context} - {type(e).__name__}: {e}")
 
 
+def get_block_number() -> int:
+    return get_web3().eth.block_number
+
+
 def get_all_lp(limit: int, offset: int) -> List[Lp]:
-    web3 = get_web3()
-    result = sugar_lp(web3).functions.all(limit, offset).call()
+    result = eth_call(get_web3(), sugar_lp().all(limit, offset))
     return [Lp(*item) for item in result]
 
 
@@ -77,7 +94,7 @@ def get_all_lp_batch(limit: int = 300, batch_size: int = 3, start_offset: int =
 
     with safe_batch_requests() as (web3, batch):
         for offset in offsets:
-            batch.add(sugar_lp(web3).functions.all(limit, offset))
+            batch.add(sugar_lp().all(limit, offset))
         batch_responses = batch.execute()
 
     for result in batch_responses:
@@ -86,15 +103,23 @@ def get_all_lp_batch(limit: int = 300, batch_size: int = 3, start_offset: int =
     return all_lps
 
 
+def probe_lp_pages(offsets: List[int]) -> List[bool]:
+    with safe_batch_requests() as (web3, batch):
+        for offset in offsets:
+            batch.add(sugar_lp().all(POOL_PAGE_LIMIT, offset))
+        batch_responses = batch.execute()
+
+    # The probed pages are full pool records, keep them
+    pool_index.record((Lp(*item) for result in batch_responses for item in result), keep=False)
+    return [len(result) > 0 for result in batch_responses]
+
+
 def get_lp_by_address(pool_address: str) -> Lp:
-    web3 = get_web3()
-    result = sugar_lp(web3).functions.byAddress(Web3.to_checksum_address(pool_address)).call()
-    return Lp(*result)
+    return pool_index.lookup([pool_address])[pool_address.lower()]
 
 
 def get_positions(limit: int, offset: int, account: str) -> List[Position]:
-    web3 = get_web3()
-    result = sugar_lp(web3).functions.positions(limit, offset, Web3.to_checksum_address(account)).call()
+    result = eth_call(get_web3(), sugar_lp().positions(limit, offset, account))
     return [Position(*item) for item in result]
 
 
@@ -109,7 +134,7 @@ def get_positions_batch(
 
     with safe_batch_requests() as (web3, batch):
         for offset in offsets:
-            batch.add(sugar_lp(web3).functions.positions(limit, offset, Web3.to_checksum_address(account)))
+            batch.add(sugar_lp().positions(limit, offset, account))
         batch_responses = batch.execute()
 
     for result in batch_responses:
@@ -129,7 +154,7 @@ def get_positions_unstaked_concentrated_batch(
 
     with safe_batch_requests() as (web3, batch):
         for offset in offsets:
-            batch.add(sugar_lp(web3).functions.positionsUnstakedConcentrated(limit, offset, Web3.to_checksum_address(account)))
+            batch.add(sugar_lp().positionsUnstakedConcentrated(limit, offset, account))
         batch_responses = batch.execute()
 
     for result in batch_responses:
@@ -139,81 +164,141 @@ def get_positions_unstaked_concentrated_batch(
 
 
 def get_positions_unstaked_concentrated(limit: int, offset: int, account: str) -> List[Position]:
-    web3 = get_web3()
-    result = sugar_lp(web3).functions.positionsUnstakedConcentrated(limit, offset, Web3.to_checksum_address(account)).call()
+    result = eth_call(get_web3(), sugar_lp().positionsUnstakedConcentrated(limit, offset, account))
     return [Position(*item) for item in result]
 
 
+def get_positions_window(
+    limit: int = 100,
+    batch_size: int = 3,
+    start_offset: int = 0,
+    accounts: List[str] = None
+) -> tuple[List[Position], List[Position]]:
+    """Fetch staked and unstaked positions of every account for the same pages in a single batch."""
+    offsets = [start_offset + i * limit for i in range(batch_size)]
+    accounts = [Web3.to_checksum_address(account) for account in (accounts or account_addresses)]
+
+    with safe_batch_requests() as (web3, batch):
+        for account in accounts:
+            for offset in offsets:
+                batch.add(sugar_lp().positions(limit, offset, account))
+        for account in accounts:
+            for offset in offsets:
+                batch.add(sugar_lp().positionsUnstakedConcentrated(limit, offset, account))
+        batch_responses = batch.execute()
+
+    return split_account_pages(batch_responses, accounts, batch_size)
+
+
+def split_account_pages(batch_responses: list, accounts: List[str], batch_size: int) -> tuple[List[Position], List[Position]]:
+    """Turn the [staked pages per account..., unstaked pages per account...] responses into tagged positions."""
+    pages = len(accounts) * batch_size
+    owners = [account for account in accounts for _ in range(batch_size)]
+    return (
+        [Position(*item, account) for account, result in zip(owners, batch_responses[:pages]) for item in result],
+        [Position(*item, account) for account, result in zip(owners, batch_responses[pages:]) for item in result]
+    )
+
+
+position_pager = AdaptivePager(limit=100)
+
+
+def scan_positions() -> Iterator[tuple[List[Position], List[Position]]]:
+    """Yield (staked, unstaked) positions window by window as each one completes."""
+    with stage_timer("discovery"):
+        last_non_empty_offset = discover_last_pool_offset(probe_lp_pages)
+    if last_non_empty_offset is None:
+        return
+
+    def fetch_window(offset: int, batch_size: int):
+        return get_positions_window(limit=100, batch_size=batch_size, start_offset=offset, accounts=account_addresses)
+
+    yield from position_pager.run(last_non_empty_offset, fetch_window)
+
+
 def get_all_positions() -> tuple[List[Position], List[Position]]:
-    offset = 10000
-    limit = 100
-    batch_size = 1
-    last_non_empty_offset = None
-
-    while True:
-        print(f"[INFO] Fetching from offset {offset}...")
-        lps = get_all_lp_batch(limit=limit, batch_size=batch_size, start_offset=offset)
-        if not lps:
-            print(f"[DONE] No more results at offset {offset}. Last non-empty offset: {last_non_empty_offset}")
-            break
-        last_non_empty_offset = offset
-        offset += limit * batch_size
-
-    offset = 0
     all_positions = []
     all_unstaked_positions = []
 
-    while offset <= last_non_empty_offset:
-        limit = 100
-        if offset < 10000: #2000 per batch
-            batch_size = 20
-        elif offset < 11000: #1000 per batch
-            batch_size = 10
-        else:
-            batch_size = 3
-
-        print(f"[INFO] Fetching positions from offset {offset} with batch_size {batch_size}...")
-        pos_batch = get_positions_batch(limit=limit, batch_size=batch_size, start_offset=offset, account=account_address)
+    for pos_batch, unstaked_batch in scan_positions():
         all_positions.extend(pos_batch)
-
-        print(f"[INFO] Fetching unstaked positions from offset {offset} with batch_size {batch_size}...")
-        unstaked_batch = get_positions_unstaked_concentrated_batch(limit=limit, batch_size=batch_size, start_offset=offset, account=account_address)
         all_unstaked_positions.extend(unstaked_batch)
 
-        offset += limit * batch_size
-
-
     return (all_positions, all_unstaked_positions)
 
 
-def get_lps_from_positions(positions: List[Position]) -> List[Lp]:
+def get_lps_by_address(pool_addresses: List[str]) -> List[Lp]:
     lps = []
-    if len(positions) == 0:
+    if len(pool_addresses) == 0:
         return lps
 
     with safe_batch_requests() as (web3, batch):
-        for pos in positions:
-            batch.add(sugar_lp(web3).functions.byAddress(Web3.to_checksum_address(pos.lp)))
+        for pool_address in pool_addresses:
+            batch.add(sugar_lp().byAddress(pool_address))
         batch_responses = batch.execute()
 
     for result in batch_responses:
         lps.append(Lp(*result))
 
     return lps
-    
 
-def get_lp_token_info(lp: Lp) -> tuple[Token, Token]:
+
+def get_pool_slot0(pool_addresses: List[str]) -> List[tuple[int, int]]:
     with safe_batch_requests() as (web3, batch):
-        token0 = web3.eth.contract(address=Web3.to_checksum_address(lp.token0), abi=erc20_abi)
-        token1 = web3.eth.contract(address=Web3.to_checksum_address(lp.token1), abi=erc20_abi)
+        for pool_address in pool_addresses:
+            batch.add(cl_pool(pool_address).slot0())
+        batch_responses = batch.execute()
+
+    return [(result[0], result[1]) for result in batch_responses]
+
+
+pool_index = PoolIndex(get_lps_by_address, get_pool_slot0)
+
+
+def get_lps_from_positions(positions: List[Position]) -> List[Lp]:
+    # Positions of several wallets often share pools: read each pool once, in
+    # full, so reserves, staked amounts and emissions are current every cycle
+    by_pool = pool_index.lookup((pos.lp for pos in positions), full_read=True)
+    return [by_pool[pos.lp.lower()] for pos in positions]
+
 
-        batch.add(token0.functions.symbol())
-        batch.add(token0.functions.decimals())
-        batch.add(token1.functions.symbol())
-        batch.add(token1.functions.decimals())
+def sync_pool_index() -> int:
+    return pool_index.sync(lambda offset: get_all_lp(POOL_PAGE_LIMIT, offset), POOL_PAGE_LIMIT)
+
+
+def get_swap_logs(addresses: List[str], from_block: int, to_block: int, topic: str) -> List[dict]:
+    return get_web3().eth.get_logs({
+        "address": addresses,
+        "fromBlock": from_block,
+        "toBlock": to_block,
+        "topics": [topic],
+    })
+
+
+swap_watcher = SwapWatcher(get_swap_logs, get_block_number)
+
+
+def fetch_tokens_batch(addresses: List[str]) -> List[Token]:
+    with safe_batch_requests() as (web3, batch):
+        for address in addresses:
+            token = erc20(address)
+            batch.add(token.symbol())
+            batch.add(token.decimals())
         batch_responses = batch.execute()
 
-    return (Token(batch_responses[0], batch_responses[1]), Token(batch_responses[2], batch_responses[3]))
+    return [Token(batch_responses[i], batch_responses[i + 1]) for i in range(0, len(batch_responses), 2)]
+
+
+token_registry = TokenRegistry(fetch_tokens_batch)
+
+
+def resolve_lp_tokens(lps: List[Lp]) -> Dict[str, Token]:
+    """Resolve every token referenced by `lps` with at most one RPC batch."""
+    return token_registry.resolve([addr for lp in lps for addr in (lp.token0, lp.token1)])
+
+
+def get_lp_token_info(lp: Lp) -> tuple[Token, Token]:
+    return token_registry.get_pair(lp.token0, lp.token1)
 
 
 def send_ntfy_notification(
@@ -225,9 +310,11 @@ def send_ntfy_notification(
     attach: str = None,
     actions: List[dict] = None,
     topic: str = ntfy_topic,
-):
+    on_done: Callable[[bool], None] = None,
+) -> bool:
     """
-    Send a rich notification via ntfy.sh
+    Queue a rich notification for ntfy.sh, delivered in the background by
+    ntfy_dispatcher. Returns False if the queue was full and it was dropped.
 
     :param message: Message body (required)
     :param title: Optional title of the notification
@@ -237,79 +324,40 @@ def send_ntfy_notification(
     :param attach: URL to attach media (image/file)
     :param actions: List of action dicts for interactive buttons
     :param topic: Topic name subscribed in ntfy app
+    :param on_done: Called from the ntfy worker with whether it was delivered
     """
-    url = f"http://localhost:80/{topic}"
-    headers = {
-        "Priority": priority
-    }
-
-    if title:
-        headers["Title"] = title
-    if tags:
-        headers["Tags"] = ",".join(tags) if isinstance(tags, list) else tags
-    if click:
-        headers["Click"] = click
-    if attach:
-        headers["Attach"] = attach
-    if actions:
-        import json
-        headers["Actions"] = json.dumps(actions)
-
-    response = requests.post(url, headers=headers, data=message.encode("utf-8"))
-
-    if response.status_code == 200:
-        print("✅ Notification sent successfully!")
-    else:
-        raise Exception(f"❌ Failed to send notification: {response.status_code} - {response.text}")
+    return ntfy_dispatcher.submit(NtfyMessage(message, title, priority, tags, click, attach, actions, topic, on_done))
 
 
 def handle_telegram_commands(get_messages_func, parse_mode="MarkdownV2", bot_ready_hook=False):
+    delivery = TelegramDelivery(delete_after=300, media_cache=media_cache)
+
     async def liquidity_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             user_message = update.message
-            asyncio.create_task(delete_after_delay(
-                context=context,
-                chat_id=user_message.chat_id,
-                message_id=user_message.message_id,
-                delay=300
-            ))
+            delivery.schedule_delete(context.bot, user_message.chat_id, user_message.message_id)
         except Exception as e:
             print(f"⚠️ Failed to schedule user message deletion: {e}")
 
-        # 👇 Lấy danh sách (message, image)
-        message_tuples = await get_messages_func(update, context)
-
-        # 📤 Gửi từng ảnh + caption
-        for msg, image in message_tuples:
-            try:
-                sent_msg = await context.bot.send_photo(
-                    chat_id=update.effective_chat.id,
-                    photo=image,
-                    caption=msg,
-                    parse_mode=parse_mode
-                )
-
-                asyncio.create_task(delete_after_delay(
-                    context=context,
-                    chat_id=sent_msg.chat_id,
-                    message_id=sent_msg.message_id,
-                    delay=300
-                ))
-            except Exception as e:
-                print(f"⚠️ Error sending photo message: {e}")
-
-    # 🧹 Hàm xóa sau delay
-    async def delete_after_delay(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int, delay: int):
-        await asyncio.sleep(delay)
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        except Exception as e:
-            print(f"❌ Failed to delete message {message_id}: {e}")
+        # 👇 Lấy danh sách (message, image): a list, or an async stream of them
+        messages = get_messages_func(update, context)
+
+        # 📤 Gửi theo album (tối đa 10 ảnh/album)
+        if hasattr(messages, "__aiter__"):
+            await delivery.send_stream(context.bot, update.effective_chat.id, messages, parse_mode=parse_mode)
+        else:
+            await delivery.send(context.bot, update.effective_chat.id, await messages, parse_mode=parse_mode)
 
     # 🚀 Khởi tạo bot
-    app = ApplicationBuilder().token(telegram_bot_token).build()
+    # Let several chats run /liquidity at the same time
+    app = ApplicationBuilder().token(telegram_bot_token).concurrent_updates(True).build()
     app.add_handler(CommandHandler("liquidity", liquidity_command))
 
+    # /liquidity reads through aiohttp sessions bound to the bot's event loop
+    async def close_rpc_sessions(app):
+        await close_sessions()
+    app.post_shutdown = close_rpc_sessions
+
     if bot_ready_hook:
         async def set_commands(app):
             await app.bot.set_my_commands([
@@ -322,95 +370,37 @@ def handle_telegram_commands(get_messages_func, parse_mode="MarkdownV2", bot_rea
 
 
 def convert_by_decimals(raw_balance: int, decimals: int, precision: int = 4) -> Decimal:
-    getcontext().prec = precision + 10
-    return Decimal(raw_balance) / Decimal(10 ** decimals)
+    return raw_to_decimal(raw_balance, decimals, precision)
 
 
 def convert_sqrtPriceX96_to_price(sqrtPriceX96: int, precision: int = 8) -> Decimal:
-    getcontext().prec = precision + 10
-    return (Decimal(sqrtPriceX96) / (2 ** 96)) ** 2
+    return sqrt_price_to_price(sqrtPriceX96, precision)
 
 
 def cal_real_price(token0, token1, upper: Decimal, now: Decimal, lower: Decimal) -> tuple[Decimal, Decimal, Decimal]:
+    # scaleb is exact and also works when token0 has fewer decimals than token1
     decimal_diff = token0.decimals - token1.decimals
     return (
-        upper * 10**decimal_diff,
-        now * 10**decimal_diff,
-        lower * 10**decimal_diff
+        upper.scaleb(decimal_diff),
+        now.scaleb(decimal_diff),
+        lower.scaleb(decimal_diff)
     )
 
 
-def create_price_slider(lower_price, price_now, upper_price, precision=8):
-    def fmt(val):
-        d = Decimal(str(val)).quantize(Decimal(f"1e-{precision}"), rounding=ROUND_DOWN)
-        return format(d.normalize(), 'f')
-
-    lower, current, upper = map(lambda v: Decimal(str(v)), (lower_price, price_now, upper_price))
-    min_range, max_range = min(lower, current, upper), max(lower, current, upper)
-    margin = (max_range - min_range) * Decimal("0.3")
-    view_min, view_max = float(min_range - margin), float(max_range + margin)
-    lower_f, current_f, upper_f = map(float, (lower, current, upper))
-
-    fig, ax = subplots(figsize=(9, 3.6), facecolor='#101615')
-    ax.set(xlim=(view_min, view_max), ylim=(0, 1.8))
-    ax.axis('off')
-
-    # Layout constants
-    bar_y = 0.9
-    bar_height = 0.06
-    arrow_offset = 0.10
-    label_offset = 0.45  # đã kéo xuống thêm để tránh đè
-    symmetric_offset = 0.18
-
-    active_color = '#00e6b8'
-    bg_color = '#5f6d67'
-    tick_color = '#f6c744'
-
-    # Bar backgrounds
-    ax.add_patch(FancyBboxPatch((view_min, bar_y - bar_height / 2),
-                                view_max - view_min, bar_height,
-                                boxstyle="round,pad=0.01", linewidth=0, facecolor=bg_color))
-    ax.add_patch(matplotlib.patches.Rectangle((lower_f, bar_y - bar_height / 2),
-                                              upper_f - lower_f, bar_height,
-                                              linewidth=0, facecolor=active_color, zorder=1))
-
-    # Endpoint circles
-    for x in (lower_f, upper_f):
-        ax.plot(x, bar_y, marker='o', markersize=13, color=active_color, zorder=2)
-
-    # Vertical tick
-    ax.plot([current_f]*2, [bar_y - arrow_offset, bar_y + arrow_offset],
-            color=tick_color, linewidth=2, zorder=3)
-    ax.annotate('', xy=(current_f, bar_y), xytext=(current_f, bar_y + arrow_offset),
-                arrowprops=dict(arrowstyle='-|>', color=tick_color, linewidth=2), zorder=4)
-    ax.annotate('', xy=(current_f, bar_y - arrow_offset), xytext=(current_f, bar_y),
-                arrowprops=dict(arrowstyle='<|-', color=tick_color, linewidth=2), zorder=4)
-
-    # Zone labels (kéo thấp hơn)
-    ax.text((view_min + lower_f) / 2, bar_y - label_offset, "OUT",
-            ha='center', va='center', fontsize=9, color='gray')
-    ax.text((lower_f + upper_f) / 2, bar_y - label_offset, "ACTIVE RANGE",
-            ha='center', va='center', fontsize=9, color=active_color)
-    ax.text((upper_f + view_max) / 2, bar_y - label_offset, "OUT",
-            ha='center', va='center', fontsize=9, color='gray')
-
-    # Price values (upper/lower)
-    ax.text(lower_f, bar_y + symmetric_offset, fmt(lower),
-            ha='center', va='bottom', fontsize=10, color=active_color, fontweight='bold')
-    ax.text(upper_f, bar_y + symmetric_offset, fmt(upper),
-            ha='center', va='bottom', fontsize=10, color=active_color, fontweight='bold')
-
-    # Boxed current price (cách thanh giá một khoảng bằng upper/lower)
-    ax.text(current_f, bar_y - symmetric_offset, fmt(current),
-            ha='center', va='top', fontsize=10, fontweight='bold',
-            color=tick_color,
-            bbox=dict(boxstyle="round,pad=0.25", fc="#101615", ec=tick_color, lw=1.5))
-
-    buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close()
-    buf.seek(0)
-    return buf
+def get_range_prices(pos: Position, lp: Lp, token0: Token, token1: Token, precision: int = 8) -> tuple[Decimal, Decimal, Decimal]:
+    """(upper, now, lower) real prices, each rounded once from the exact integer ratio."""
+    return range_prices(pos, lp, token0, token1, precision)
+
+
+def get_range_prices_batch(
+    positions: List[Position], lps: List[Lp], token_pairs: List[tuple[Token, Token]], precision: int = 8
+) -> List[tuple[Decimal, Decimal, Decimal]]:
+    """get_range_prices() for positions[i] in lps[i] with token_pairs[i], converting each pool's price once."""
+    return range_prices_batch(positions, lps, token_pairs, precision)
+
+
+def create_price_slider(lower_price, price_now, upper_price, precision=8) -> BytesIO:
+    return render_price_slider(lower_price, price_now, upper_price, precision=precision)
 
 
 def get_rate_to_eth_batch(token_list: List[str]) -> List[str]:
@@ -418,32 +408,25 @@ def get_rate_to_eth_batch(token_list: List[str]) -> List[str]:
 
     with safe_batch_requests() as (web3, batch):
         for token in token_list:
-            batch.add(price_oracle(web3).functions.getRateToEth(token, False))
+            batch.add(price_oracle().getRateToEth(token, False))
         batch_responses = batch.execute()
 
     for result in batch_responses:
         prices.append(result)
 
-    return prices    
+    return prices
+
+
+price_snapshot = PriceSnapshot(get_rate_to_eth_batch)
+
+
+def snapshot_lp_prices(lps: List[Lp]) -> Dict[str, int]:
+    """Refresh oracle rates for every token in `lps` (plus AERO) in one batch."""
+    if not lps:
+        return {}
+    return price_snapshot.prefetch([addr for lp in lps for addr in (lp.token0, lp.token1)] + [aero])
 
 
 def cal_lp_apr(lp: Lp, precision: int = 3) -> Decimal:
-    getcontext().prec = precision + 10
-    token0, token1 = get_lp_token_info(lp)
-    # print("token info: ", token0, token1)
-    apr = 0
-    one_year_emissions = convert_by_decimals(31_556_926 * lp.emissions, 18)
-    staked_token0 = convert_by_decimals(lp.staked0, token0.decimals)
-    staked_token1 = convert_by_decimals(lp.staked1, token1.decimals)
-    # print("staked: ", staked_token0, staked_token1)
-    rates_to_eth = get_rate_to_eth_batch([lp.token0, lp.token1, aero])
-    rate_token0 = Decimal(rates_to_eth[0]) /  10**(18 - token0.decimals)
-    rate_token1 = Decimal(rates_to_eth[1]) /  10**(18 - token1.decimals)
-    rate_aero = Decimal(rates_to_eth[2])                   
-    
-    # print("original rate ", token0.symbol, token1.symbol, "AERO: ", rates_to_eth)
-    # print("adjusted rate ", token0.symbol, token1.symbol, "AERO: ", rate_token0, rate_token1, rate_aero)
-
-    apr = 100 * one_year_emissions * rate_aero / (rate_token0 * staked_token0
-       + rate_token1 * staked_token1)
-    return apr
+    rate0, rate1, rate_aero = price_snapshot.get_rates([lp.token0, lp.token1, aero])
+    return lp_apr(lp.emissions, lp.staked0, lp.staked1, int(rate0), int(rate1), int(rate_aero), precision)
@@ -1,55 +1,194 @@
+import os
 import time
+import asyncio
 from threading import Thread
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator
 
+# First, so startup times count from before the heavy imports below
+from startup import mark, warm_caches
 from formatter import LPFormatter
 from helpers import (
+    get_block_number,
     get_all_positions,
     get_lps_from_positions,
+    pool_index,
+    sync_pool_index,
     get_lp_token_info,
+    resolve_lp_tokens,
+    snapshot_lp_prices,
+    price_snapshot,
+    token_registry,
     send_ntfy_notification,
+    ntfy_dispatcher,
     handle_telegram_commands,
-    convert_sqrtPriceX96_to_price,
-    cal_real_price,
+    get_range_prices_batch,
     create_price_slider,
-    handle_error
+    handle_error,
+    endpoint_pool,
+    account_addresses,
+    swap_watcher
 )
-from alert_db import (
-    init_db, load_alerted_positions, add_alerted_position,
-    remove_alerted_position, cleanup_alerted_positions
+from alert_db import alert_store
+from state_db import get_state, init_state_db, set_state
+from scan_snapshot import ScanSnapshot, SnapshotService
+from chart import CHART_RENDERER, chart_key
+from media_cache import media_cache, media_key
+from telegram_delivery import ChartMessage
+from event_watcher import EVENT_POLL_SECONDS
+from range_engine import evaluate_positions
+from metrics import stage_timer, start_metrics
+from async_helpers import (
+    async_get_block_number,
+    async_get_all_positions,
+    async_get_lps_from_positions,
+    async_resolve_lp_tokens,
+    async_snapshot_lp_prices
 )
 
 
-formatter_ntfy = LPFormatter(style="ntfy")
-formatter_telegram = LPFormatter(style="telegram")
+formatter_ntfy = LPFormatter(style="ntfy", show_account=len(account_addresses) > 1)
+formatter_telegram = LPFormatter(style="telegram", show_account=len(account_addresses) > 1)
 
+# Chart renderers serialize on one figure anyway, so a single worker is enough
+render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
 
-async def get_all_liquidity_messages(update=None, context=None) -> list[tuple[str, BytesIO]]:
-    results = []
+# Edit the "⏳ Fetching" placeholder with a rendered/total count while streaming
+LIQUIDITY_PROGRESS = os.getenv("LIQUIDITY_PROGRESS", "true").lower() == "true"
+LIQUIDITY_PROGRESS_INTERVAL = float(os.getenv("LIQUIDITY_PROGRESS_INTERVAL", "2"))
+
+# "poll": rescan everything every interval; "events": follow Swap logs between rescans
+ALERT_MODE = os.getenv("ALERT_MODE", "poll")
+# bot_state flag: position_{id} alert keys were moved to per-account keys
+ALERT_KEYS_MIGRATED_KEY = "alert_keys_per_account"
+alert_keys_migrated = False
+
+
+def fetch_scan_snapshot() -> ScanSnapshot:
+    block_number = get_block_number()
+    with stage_timer("positions"):
+        all_positions, all_unstaked_positions = get_all_positions()
+    # One deduplicated byAddress batch for every wallet's staked and unstaked positions
+    with stage_timer("lp_lookup"):
+        all_lps = get_lps_from_positions(all_positions + all_unstaked_positions)
+    lps, unstaked_lps = all_lps[:len(all_positions)], all_lps[len(all_positions):]
+    with stage_timer("tokens"):
+        tokens = resolve_lp_tokens(lps + unstaked_lps)
+    with stage_timer("prices"):
+        prices = snapshot_lp_prices(lps + unstaked_lps)
+    return ScanSnapshot(all_positions, all_unstaked_positions, lps, unstaked_lps, tokens, prices, block_number)
+
+
+async def afetch_scan_snapshot() -> ScanSnapshot:
+    block_number = await async_get_block_number()
+    with stage_timer("positions"):
+        all_positions, all_unstaked_positions = await async_get_all_positions()
+    with stage_timer("lp_lookup"):
+        all_lps = await async_get_lps_from_positions(all_positions + all_unstaked_positions)
+    lps, unstaked_lps = all_lps[:len(all_positions)], all_lps[len(all_positions):]
+    # Tokens and prices go out concurrently, so they share one stage
+    with stage_timer("tokens_prices"):
+        tokens, prices = await asyncio.gather(
+            async_resolve_lp_tokens(lps + unstaked_lps),
+            async_snapshot_lp_prices(lps + unstaked_lps)
+        )
+    return ScanSnapshot(all_positions, all_unstaked_positions, lps, unstaked_lps, tokens, prices, block_number)
+
+
+# The alert loop refreshes it every cycle, /liquidity reuses it while fresh
+snapshot_service = SnapshotService(fetch_scan_snapshot, afetch_scan_snapshot)
+
+
+def restore_snapshot() -> int:
+    """Last scan saved by the previous process, with its oracle rates as of when it was taken."""
+    restored = snapshot_service.warm()
+    if snapshot_service.latest is not None:
+        price_snapshot.seed(snapshot_service.latest.prices, snapshot_service.latest.taken_at)
+    return restored
+
+
+def warm_from_disk() -> dict:
+    return warm_caches({
+        "tokens": token_registry.warm,
+        "pool index": pool_index.warm,
+        "media": media_cache.warm,
+        "snapshot": restore_snapshot,
+    })
+
+
+async def stream_liquidity_messages(update=None, context=None) -> AsyncIterator[ChartMessage]:
+    """Yield a ChartMessage for each position as soon as its chart is ready."""
     waiting_message = None
+    last_progress = 0.0
+
+    async def report_progress(done, total):
+        nonlocal last_progress
+        if not (waiting_message and LIQUIDITY_PROGRESS) or done == total:
+            return
+        if time.monotonic() - last_progress < LIQUIDITY_PROGRESS_INTERVAL:
+            return
+        last_progress = time.monotonic()
+        try:
+            await waiting_message.edit_text(f"⏳ Rendering positions... {done}/{total}", parse_mode=None)
+        except Exception as e:
+            print(f"⚠️ Failed to update waiting message: {e}")
 
     try:
         if update:
             waiting_message = await update.message.reply_text("⏳ Fetching liquidity data, please wait...", parse_mode=None)
 
-        all_positions, all_unstaked_positions = get_all_positions()
-        lps = get_lps_from_positions(all_positions)
-        unstaked_lps = get_lps_from_positions(all_unstaked_positions)
+        snapshot = await snapshot_service.aget()
+        all_positions, all_unstaked_positions = snapshot.positions, snapshot.unstaked_positions
+        lps, unstaked_lps = snapshot.lps, snapshot.unstaked_lps
+        print(f"📦 Using scan snapshot from block {snapshot.block_number} ({snapshot.age:.0f}s old)")
+        # Tokens and oracle rates are in memory before the fan-out, so formatting
+        # never blocks the loop on RPC or SQLite (both no-ops while cached)
+        tokens, _ = await asyncio.gather(
+            async_resolve_lp_tokens(lps + unstaked_lps),
+            async_snapshot_lp_prices(lps + unstaked_lps)
+        )
+        loop = asyncio.get_running_loop()
+        # Message and chart use the same prices, converted once for every position
+        all_lps = lps + unstaked_lps
+        token_pairs = [(tokens[lp.token0.lower()], tokens[lp.token1.lower()]) for lp in all_lps]
+        prices = get_range_prices_batch(all_positions + all_unstaked_positions, all_lps, token_pairs, precision=8)
+
+        async def build_entry(pos, lp, is_staked, idx):
+            token0, token1 = token_pairs[idx]
+            msg = formatter_telegram.format_position(pos, lp, token0, token1, is_staked, prices=prices[idx])
 
-        def build_entry(pos, lp, is_staked):
-            token0, token1 = get_lp_token_info(lp)
-            msg = formatter_telegram.format_position(pos, lp, token0, token1, is_staked)
+            (price_upper, price_now, price_lower) = prices[idx]
 
-            price_now = convert_sqrtPriceX96_to_price(lp.sqrt_ratio, precision=8)
-            price_upper = convert_sqrtPriceX96_to_price(pos.sqrt_ratio_upper, precision=8)
-            price_lower = convert_sqrtPriceX96_to_price(pos.sqrt_ratio_lower, precision=8)
-            (price_upper, price_now, price_lower) = cal_real_price(token0, token1, price_upper, price_now, price_lower)
+            render = partial(create_price_slider, price_lower, price_now, price_upper)
+            key = media_key(*chart_key(price_lower, price_now, price_upper), CHART_RENDERER)
+            file_id = media_cache.get(pos.id, key)
+            if file_id:
+                # Same chart as last time: re-send the uploaded photo, skip render and upload
+                return ChartMessage(msg, file_id, (str(pos.id), key), render)
 
-            image = create_price_slider(price_lower, price_now, price_upper)
-            return (msg, image)
+            image = await loop.run_in_executor(render_executor, render)
+            return ChartMessage(msg, image, (str(pos.id), key), render)
 
-        results += [build_entry(pos, lps[i], True) for i, pos in enumerate(all_positions)]
-        results += [build_entry(pos, unstaked_lps[i], False) for i, pos in enumerate(all_unstaked_positions)]
+        # Renders are queued in position order (staked first) on the single
+        # render worker, so entries come back in that order, one at a time
+        tasks = [
+            *(asyncio.ensure_future(build_entry(pos, lps[i], True, i)) for i, pos in enumerate(all_positions)),
+            *(
+                asyncio.ensure_future(build_entry(pos, unstaked_lps[i], False, len(all_positions) + i))
+                for i, pos in enumerate(all_unstaked_positions)
+            )
+        ]
+        try:
+            for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                try:
+                    yield await task
+                except Exception as e:
+                    handle_error(e, "Liquidity Render")
+                await report_progress(done, len(tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
 
     except Exception as e:
         handle_error(e, "Liquidity Fetch")
@@ -61,49 +200,177 @@ async def get_all_liquidity_messages(update=None, context=None) -> list[tuple[st
             except Exception as e:
                 print(f"⚠️ Failed to delete waiting message: {e}")
 
-    return results
+
+async def get_all_liquidity_messages(update=None, context=None) -> list[ChartMessage]:
+    return [entry async for entry in stream_liquidity_messages(update, context)]
+
+
+def alert_key(pos) -> str:
+    return f"position_{pos.account.lower()}_{pos.id}"
+
+
+def migrate_alert_keys(positions):
+    """
+    Keys used to be position_{id}; carry their state over to the per-account
+    keys once, on the first scan after the upgrade (it needs the owners).
+    """
+    global alert_keys_migrated
+    if alert_keys_migrated:
+        return
+    if get_state(ALERT_KEYS_MIGRATED_KEY) is None:
+        moved = alert_store.rename({f"position_{pos.id}": alert_key(pos) for pos in positions})
+        alert_store.flush()
+        set_state(ALERT_KEYS_MIGRATED_KEY, 1)
+        print(f"🔑 Moved {moved} alert states to per-account keys")
+    alert_keys_migrated = True
+
+
+def alert_delivered(key: str, delivered: bool):
+    if not delivered:
+        alert_store.clear_alert(key)
+        print(f"⚠️ Alert for {key} was not delivered, it will be sent again")
+
+
+def check_and_alert(positions, lps, staked, alerted):
+    """Evaluate positions[i] in pool lps[i] (staked[i] tells which list it came from) and alert on range exits."""
+    with stage_timer("range_eval"):
+        report = evaluate_positions(positions, lps)
+
+    pending = []
+    for i, pos in enumerate(positions):
+        key = alert_key(pos)
+        alert_store.observe(key, lps[i].tick)
+
+        if not report.in_range[i] and key not in alerted:
+            pending.append(i)
+        elif report.in_range[i] and key in alerted:
+            alert_store.clear_alert(key)
+            alerted.remove(key)
+
+    # Token decimals, rates and Decimal formatting only for positions that get a message
+    snapshot_lp_prices([lps[i] for i in pending])
+    token_pairs = [get_lp_token_info(lps[i]) for i in pending]
+    prices = get_range_prices_batch([positions[i] for i in pending], [lps[i] for i in pending], token_pairs, precision=8)
+    # Queued for the ntfy worker; a burst of exits goes out as one digest.
+    # Marked now so the next cycle does not queue it again while it is in
+    # flight; un-marked if delivery finally fails, so a later cycle retries.
+    with ntfy_dispatcher.coalesce(title="Positions out of range"):
+        for n, i in enumerate(pending):
+            pos, lp = positions[i], lps[i]
+            key = alert_key(pos)
+            token0, token1 = token_pairs[n]
+            alert_store.mark_alerted(key, lp.tick)
+            alerted.add(key)
+            send_ntfy_notification(
+                formatter_ntfy.format_position(pos, lp, token0, token1, staked[i], prices=prices[n]),
+                on_done=partial(alert_delivered, key)
+            )
+
+
+def scan_and_alert() -> ScanSnapshot:
+    snapshot = snapshot_service.refresh()
+    all_positions, all_unstaked_positions = snapshot.positions, snapshot.unstaked_positions
+
+    # Before cleanup() drops the old keys as unknown
+    migrate_alert_keys(all_positions + all_unstaked_positions)
+    valid_keys = {alert_key(pos) for pos in all_positions + all_unstaked_positions}
+    alert_store.cleanup(valid_keys)
+    alerted = alert_store.alerted_keys()
+
+    # Staked and unstaked positions in one vectorized pass
+    check_and_alert(
+        all_positions + all_unstaked_positions,
+        snapshot.lps + snapshot.unstaked_lps,
+        [True] * len(all_positions) + [False] * len(all_unstaked_positions),
+        alerted
+    )
+    # One transaction for every state change of this cycle
+    alert_store.flush()
+
+    try:
+        sync_pool_index()
+    except Exception as e:
+        print(f"⚠️ Pool index sync failed: {e}")
+    return snapshot
+
+
+def watch_snapshot(snapshot: ScanSnapshot) -> tuple[dict, dict]:
+    """Follow Swap logs of the snapshot's pools from its block: (pool -> [(pos, is_staked)], pool -> tick)."""
+    swap_watcher.reset(snapshot.block_number)
+    watched, ticks = {}, {}
+    for positions, lps, is_staked in (
+        (snapshot.positions, snapshot.lps, True),
+        (snapshot.unstaked_positions, snapshot.unstaked_lps, False)
+    ):
+        for pos, lp in zip(positions, lps):
+            watched.setdefault(pos.lp.lower(), []).append((pos, is_staked))
+            ticks[pos.lp.lower()] = lp.tick
+    print(f"👀 Watching Swap logs of {len(watched)} pools from block {snapshot.block_number}")
+    return watched, ticks
+
+
+def run_event_loop(rescan_minutes=3):
+    """
+    Full scan every `rescan_minutes` to pick up opened/closed positions; in
+    between, follow Swap logs block by block and re-check only the positions
+    of pools whose tick moved, re-reading just those pools through the pool index.
+    A snapshot restored from disk that is still within `rescan_minutes` is
+    followed from its block, so a restart resumes without a full scan.
+    """
+    snapshot = snapshot_service.latest
+    watched, ticks = {}, {}
+    if snapshot is not None and snapshot.age < rescan_minutes * 60:
+        watched, ticks = watch_snapshot(snapshot)
+        mark("first cycle")
+
+    while True:
+        try:
+            if snapshot is None or snapshot.age >= rescan_minutes * 60:
+                print("🔄 Scanning LP positions for alert...")
+                with stage_timer("alert_cycle"):
+                    snapshot = scan_and_alert()
+                mark("first cycle")
+                watched, ticks = watch_snapshot(snapshot)
+
+            with stage_timer("event_poll"):
+                swapped = swap_watcher.poll(watched.keys())
+            moved = [pool for pool, tick in swapped.items() if tick != ticks.get(pool)]
+            if moved:
+                alerted = alert_store.alerted_keys()
+                positions, lps, staked = [], [], []
+                for pool, lp in pool_index.lookup(moved).items():
+                    ticks[pool] = lp.tick
+                    for pos, is_staked in watched[pool]:
+                        positions.append(pos)
+                        lps.append(lp)
+                        staked.append(is_staked)
+                check_and_alert(positions, lps, staked, alerted)
+                alert_store.flush()
+                print(f"⚡ Block {swap_watcher.last_block}: {len(moved)} pools moved, re-checked {len(positions)} positions")
+
+            time.sleep(EVENT_POLL_SECONDS)
+
+        except Exception as e:
+            handle_error(e, "Event Loop")
+            time.sleep(10)
 
 
 def run_alert_loop(interval_minutes=3):
     try:
-        init_db()
+        alert_store.init()
+
+        if ALERT_MODE == "events":
+            run_event_loop(rescan_minutes=interval_minutes)
+            return
 
         while True:
             try:
                 print("🔄 Scanning LP positions for alert...")
-                all_positions, all_unstaked_positions = get_all_positions()
-                lps = get_lps_from_positions(all_positions)
-                unstaked_lps = get_lps_from_positions(all_unstaked_positions)
-
-                valid_keys = {f"position_{pos.id}" for pos in all_positions + all_unstaked_positions}
-                cleanup_alerted_positions(valid_keys)
-                alerted = load_alerted_positions()
-
-                def check_and_alert(positions, lps, is_staked):
-                    for i, pos in enumerate(positions):
-                        lp = lps[i]
-                        token0, token1 = get_lp_token_info(lp)
-
-                        price_now = convert_sqrtPriceX96_to_price(lp.sqrt_ratio, precision=8)
-                        price_upper = convert_sqrtPriceX96_to_price(pos.sqrt_ratio_upper, precision=8)
-                        price_lower = convert_sqrtPriceX96_to_price(pos.sqrt_ratio_lower, precision=8)
-                        (price_upper, price_now, price_lower) = cal_real_price(token0, token1, price_upper, price_now, price_lower)
-
-                        in_range = price_lower <= price_now <= price_upper
-                        key = f"position_{pos.id}"
-
-                        if not in_range and key not in alerted:
-                            msg = formatter_ntfy.format_position(pos, lp, token0, token1, is_staked)
-                            send_ntfy_notification(msg)
-                            add_alerted_position(key)
-                            alerted.add(key)
-                        elif in_range and key in alerted:
-                            remove_alerted_position(key)
-                            alerted.remove(key)
-
-                check_and_alert(all_positions, lps, True)
-                check_and_alert(all_unstaked_positions, unstaked_lps, False)
+                with stage_timer("alert_cycle"):
+                    scan_and_alert()
+                mark("first cycle")
 
+                print(f"📡 RPC endpoints:\n{endpoint_pool.summary()}")
                 print(f"✅ Done. Sleeping {interval_minutes} minutes...\n")
                 time.sleep(interval_minutes * 60)
 
@@ -117,7 +384,12 @@ def run_alert_loop(interval_minutes=3):
 
 if __name__ == "__main__":
     try:
+        mark("imports")
+        init_state_db()
+        start_metrics()
+        warm_from_disk()
+        mark("caches warm")
         Thread(target=run_alert_loop, daemon=True).start()
-        handle_telegram_commands(get_all_liquidity_messages, parse_mode="MarkdownV2", bot_ready_hook=True)
+        handle_telegram_commands(stream_liquidity_messages, parse_mode="MarkdownV2", bot_ready_hook=True)
     except Exception as e:
         handle_error(e, "Main Thread")
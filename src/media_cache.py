@@ -0,0 +1,111 @@
+import asyncio
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from alert_db import DB_PATH
+from metrics import record_cache
+from state_db import connect
+
+MEDIA_CACHE_SIZE = int(os.getenv("MEDIA_CACHE_SIZE", "1024"))
+
+
+def media_key(*parts) -> str:
+    return "|".join(str(part) for part in parts)
+
+
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telegram_media (
+    position_id TEXT PRIMARY KEY,
+    chart_key TEXT NOT NULL,
+    file_id TEXT NOT NULL
+)
+"""
+
+
+class MediaCache:
+    """
+    Telegram file_id of the last chart uploaded for each position, stored
+    together with the quantized prices it was drawn from. A position whose
+    chart key is unchanged is re-sent by file_id instead of re-uploading the
+    PNG; a changed key, a rejected file_id or LRU overflow evicts the entry.
+    """
+
+    def __init__(self, max_size: int = MEDIA_CACHE_SIZE, db_path: str = DB_PATH):
+        self.max_size = max_size
+        self.db_path = db_path
+        self._items: "OrderedDict[str, tuple[str, str]]" = OrderedDict()  # position -> (chart key, file_id)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, position_id: str, chart_key: str, file_id: str) -> Optional[str]:
+        self._items[position_id] = (chart_key, file_id)
+        self._items.move_to_end(position_id)
+        if len(self._items) > self.max_size:
+            evicted, _ = self._items.popitem(last=False)
+            return evicted
+        return None
+
+    def warm(self) -> int:
+        """Load persisted file_ids into memory, returns the number loaded."""
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            rows = conn.execute(
+                "SELECT position_id, chart_key, file_id FROM telegram_media LIMIT ?", (self.max_size,)
+            ).fetchall()
+
+        with self._lock:
+            for position_id, chart_key, file_id in rows:
+                self._remember(position_id, chart_key, file_id)
+
+        print(f"🖼️ Media cache warmed with {len(rows)} charts")
+        return len(rows)
+
+    def get(self, position_id, chart_key: str) -> Optional[str]:
+        position_id = str(position_id)
+        with self._lock:
+            entry = self._items.get(position_id)
+            if entry is not None and entry[0] == chart_key:
+                self._items.move_to_end(position_id)
+                self.hits += 1
+                record_cache("media", hits=1)
+                return entry[1]
+            self.misses += 1
+            if entry is not None:
+                # The price range moved, the old chart will never be sent again. Memory
+                # only: get() runs on the event loop, and put() replaces the row anyway
+                del self._items[position_id]
+        record_cache("media", misses=1)
+        return None
+
+    def put(self, position_id, chart_key: str, file_id: str):
+        position_id = str(position_id)
+        with self._lock:
+            evicted = self._remember(position_id, chart_key, file_id)
+
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO telegram_media (position_id, chart_key, file_id) VALUES (?, ?, ?)",
+                (position_id, chart_key, file_id)
+            )
+            if evicted is not None:
+                conn.execute("DELETE FROM telegram_media WHERE position_id = ?", (evicted,))
+
+    def forget(self, position_id):
+        position_id = str(position_id)
+        with self._lock:
+            self._items.pop(position_id, None)
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            conn.execute("DELETE FROM telegram_media WHERE position_id = ?", (position_id,))
+
+    async def aput(self, position_id, chart_key: str, file_id: str):
+        """put() with the SQLite write off the event loop."""
+        await asyncio.to_thread(self.put, position_id, chart_key, file_id)
+
+    async def aforget(self, position_id):
+        """forget() with the SQLite write off the event loop."""
+        await asyncio.to_thread(self.forget, position_id)
+
+
+media_cache = MediaCache()
@@ -0,0 +1,225 @@
+import os
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, List, Sequence, Tuple
+
+# Prometheus text endpoint on this port (0 = off), and a summary print every N seconds (0 = off)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+LabelKey = Tuple[str, ...]
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self):
+        return [f"{self.name}{self._labels(key)} {value}" for key, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [bucket counts..., count, sum, max]
+        self._values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0, 0.0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-3] += 1
+            state[-2] += value
+            state[-1] = max(state[-1], value)
+
+    def stats(self) -> Dict[LabelKey, Tuple[int, float, float]]:
+        """key -> (count, sum, max)"""
+        with self._lock:
+            return {key: (state[-3], state[-2], state[-1]) for key, state in self._values.items()}
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {count}")
+            lines.append(f"{self.name}_bucket{self._labels(key, INF_LABEL)} {state[-3]}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {state[-2]}")
+            lines.append(f"{self.name}_count{self._labels(key)} {state[-3]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram("lpbot_stage_seconds", "Wall time of pipeline stages", ["stage"]))
+stage_errors = registry.register(Counter("lpbot_stage_errors_total", "Pipeline stages that raised", ["stage"]))
+rpc_seconds = registry.register(Histogram("lpbot_rpc_seconds", "JSON-RPC round trip time", ["endpoint", "method", "batch"]))
+rpc_errors = registry.register(Counter("lpbot_rpc_errors_total", "Failed JSON-RPC round trips", ["endpoint", "kind"]))
+rpc_batch_calls = registry.register(Histogram("lpbot_rpc_batch_calls", "Calls per JSON-RPC batch or multicall chunk", ["backend"], SIZE_BUCKETS))
+cache_requests = registry.register(Counter("lpbot_cache_requests_total", "Cache lookups", ["cache", "result"]))
+messages_sent = registry.register(Counter("lpbot_messages_total", "Outgoing notifications", ["channel", "status"]))
+startup_seconds = registry.register(Gauge("lpbot_startup_seconds", "Seconds from process start to startup milestones", ["event"]))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    start = time.monotonic()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        stage_seconds.observe(time.monotonic() - start, stage=stage)
+
+
+def record_rpc(endpoint: str, method: str, seconds: float, calls: int = 1, error: Exception = None):
+    batch = calls > 1 or method == "batch"
+    rpc_seconds.observe(seconds, endpoint=endpoint, method=method, batch=str(batch).lower())
+    if batch:
+        rpc_batch_calls.observe(calls, backend="jsonrpc")
+    if error is not None:
+        rpc_errors.inc(endpoint=endpoint, kind=type(error).__name__)
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    if hits:
+        cache_requests.inc(hits, cache=cache, result="hit")
+    if misses:
+        cache_requests.inc(misses, cache=cache, result="miss")
+
+
+def batch_method(payload: list) -> str:
+    methods = {request.get("method") for request in payload}
+    return methods.pop() if len(methods) == 1 else "mixed"
+
+
+def summary() -> str:
+    lines = ["📊 Stages:"]
+    for (stage,), (count, total, longest) in sorted(stage_seconds.stats().items()):
+        lines.append(f"  {stage:<18} x{count:<5} avg {total / count:.3f}s max {longest:.3f}s")
+
+    lines.append("📡 RPC:")
+    for (endpoint, method, batch), (count, total, longest) in sorted(rpc_seconds.stats().items()):
+        kind = "batch" if batch == "true" else "single"
+        lines.append(f"  {endpoint} {method} ({kind}) x{count} avg {total / count * 1000:.0f}ms max {longest * 1000:.0f}ms")
+
+    cache = cache_requests.values()
+    names = sorted({name for name, _ in cache})
+    if names:
+        lines.append("🗃️ Caches:")
+    for name in names:
+        hits, misses = cache.get((name, "hit"), 0), cache.get((name, "miss"), 0)
+        lines.append(f"  {name:<12} {hits / (hits + misses) * 100:5.1f}% hit ({hits:.0f}/{hits + misses:.0f})")
+    return "\n".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _log_forever(interval: float):
+    while True:
+        time.sleep(interval)
+        print(summary())
+
+
+def start_metrics(port: int = METRICS_PORT, log_interval: float = METRICS_LOG_INTERVAL):
+    """Start the /metrics endpoint and the periodic summary, whichever is configured."""
+    if port:
+        server = ThreadingHTTPServer((METRICS_HOST, port), _MetricsHandler)
+        server.daemon_threads = True
+        Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+        print(f"📈 Metrics on http://{METRICS_HOST}:{server.server_port}/metrics")
+    if log_interval > 0:
+        Thread(target=_log_forever, args=(log_interval,), daemon=True, name="metrics-log").start()
@@ -0,0 +1,139 @@
+import os
+from typing import Any, List
+
+from codec import ContractCall, decode_results, eth_call_params
+from contract import multicall3
+from metrics import rpc_batch_calls
+
+MULTICALL_MAX_CALLDATA = int(os.getenv("MULTICALL_MAX_CALLDATA", "100000"))
+MULTICALL_GAS_BUDGET = int(os.getenv("MULTICALL_GAS_BUDGET", "40000000"))
+
+# Rough eth_call gas per sub-call, used only to split aggregate3 chunks so a
+# single chunk stays under the providers' eth_call gas cap. Paged Sugar
+# calls are charged per requested item (their first argument is the limit).
+ESTIMATED_GAS = {
+    "symbol": 30_000,
+    "decimals": 30_000,
+    "getRateToEth": 2_000_000,
+    "byAddress": 400_000,
+}
+ESTIMATED_GAS_PER_ITEM = {
+    "all": 150_000,
+    "positions": 120_000,
+    "positionsUnstakedConcentrated": 120_000,
+}
+DEFAULT_GAS = 500_000
+
+
+def eth_call(web3, call: ContractCall) -> Any:
+    """Send a single eth_call through web3's provider and decode its result."""
+    response = web3.provider.make_request("eth_call", eth_call_params(call))
+    return decode_results([call], [response])[0]
+
+
+def eth_call_batch(web3, calls: List[ContractCall]) -> List[Any]:
+    """Send `calls` as eth_calls in one JSON-RPC batch through web3's provider and decode the results."""
+    responses = web3.provider.make_batch_request([("eth_call", eth_call_params(call)) for call in calls])
+    return decode_results(calls, responses)
+
+
+class JsonRpcBatch:
+    """One eth_call per added ContractCall, all sent in a single JSON-RPC batch."""
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self._calls = []
+
+    def add(self, call: ContractCall):
+        self._calls.append(call)
+
+    def execute(self) -> List[Any]:
+        if not self._calls:
+            return []
+        calls, self._calls = self._calls, []
+        return eth_call_batch(self.web3, calls)
+
+
+class MulticallError(Exception):
+    def __init__(self, failures: List[tuple[int, str]]):
+        self.failures = failures
+        super().__init__(f"{len(failures)} multicall sub-calls failed: {failures[:5]}")
+
+
+def estimate_gas(call: ContractCall) -> int:
+    name = call.function.name
+    if name in ESTIMATED_GAS_PER_ITEM:
+        return ESTIMATED_GAS_PER_ITEM[name] * max(int(call.args[0]), 1)
+    return ESTIMATED_GAS.get(name, DEFAULT_GAS)
+
+
+def chunk_calls(calls: List[tuple[Any, bytes, int]]) -> List[List[int]]:
+    """Split (call, calldata, gas) entries into index chunks under the calldata and gas budgets."""
+    chunks = []
+    current, size, gas = [], 0, 0
+
+    for idx, (_, data, call_gas) in enumerate(calls):
+        if current and (size + len(data) > MULTICALL_MAX_CALLDATA or gas + call_gas > MULTICALL_GAS_BUDGET):
+            chunks.append(current)
+            current, size, gas = [], 0, 0
+        current.append(idx)
+        size += len(data)
+        gas += call_gas
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class MulticallBatch:
+    """
+    Drop-in replacement for JsonRpcBatch that packs every added
+    ContractCall into Multicall3.aggregate3 with allowFailure=True.
+    Chunks are sent together as one JSON-RPC batch, so a whole scan step is
+    a single round trip and a handful of metered eth_calls.
+
+    A reverting sub-call does not revert its neighbours. By default
+    execute() still raises MulticallError after decoding; with
+    allow_failure=True failed entries come back as None instead.
+    """
+
+    def __init__(self, web3, allow_failure: bool = False):
+        self.web3 = web3
+        self.allow_failure = allow_failure
+        self._calls = []
+
+    def add(self, call: ContractCall):
+        self._calls.append((call, call.data, estimate_gas(call)))
+
+    def execute(self) -> List[Any]:
+        if not self._calls:
+            return []
+
+        chunks = chunk_calls(self._calls)
+        requests = [
+            multicall3().aggregate3([
+                (self._calls[idx][0].to, True, self._calls[idx][1]) for idx in chunk
+            ])
+            for chunk in chunks
+        ]
+        for chunk in chunks:
+            rpc_batch_calls.observe(len(chunk), backend="multicall3")
+        chunk_results = eth_call_batch(self.web3, requests)
+
+        results = [None] * len(self._calls)
+        failures = []
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for idx, (success, return_data) in zip(chunk, chunk_result):
+                call = self._calls[idx][0]
+                if not success:
+                    failures.append((idx, call.function.name))
+                    continue
+                try:
+                    results[idx] = call.decode(return_data)
+                except Exception as e:
+                    failures.append((idx, f"{call.function.name}: {e}"))
+
+        self._calls = []
+        if failures and not self.allow_failure:
+            raise MulticallError(failures)
+        return results
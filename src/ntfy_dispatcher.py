@@ -0,0 +1,266 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import messages_sent, stage_timer
+
+NTFY_URL = os.getenv("NTFY_URL", "http://localhost:80")
+NTFY_QUEUE_SIZE = int(os.getenv("NTFY_QUEUE_SIZE", "1000"))
+NTFY_TIMEOUT = float(os.getenv("NTFY_TIMEOUT", "10"))
+NTFY_MAX_ATTEMPTS = int(os.getenv("NTFY_MAX_ATTEMPTS", "5"))
+NTFY_BACKOFF = float(os.getenv("NTFY_BACKOFF", "1"))  # seconds, doubled on every retry
+NTFY_MAX_BACKOFF = 60
+# Alerts raised in one cycle are merged into a digest once there are at least this many (0 = never)
+NTFY_DIGEST_MIN = int(os.getenv("NTFY_DIGEST_MIN", "3"))
+# ntfy turns larger bodies into attachments
+NTFY_MAX_MESSAGE_BYTES = 4000
+DIGEST_SEPARATOR = "\n\n———\n\n"
+
+
+@dataclass
+class NtfyMessage:
+    message: str
+    title: str = "Alert"
+    priority: str = "high"
+    tags: Union[str, List[str]] = "rotating_light"
+    click: Optional[str] = None
+    attach: Optional[str] = None
+    actions: Optional[List[dict]] = None
+    topic: Optional[str] = None
+    # Called from the ntfy worker with whether the message was delivered (False if dropped)
+    on_done: Optional[Callable[[bool], None]] = None
+
+    def headers(self) -> dict:
+        headers = {"Priority": self.priority}
+        if self.title:
+            headers["Title"] = self.title
+        if self.tags:
+            headers["Tags"] = ",".join(self.tags) if isinstance(self.tags, list) else self.tags
+        if self.click:
+            headers["Click"] = self.click
+        if self.attach:
+            headers["Attach"] = self.attach
+        if self.actions:
+            headers["Actions"] = json.dumps(self.actions)
+        return headers
+
+    @property
+    def plain(self) -> bool:
+        """Only plain messages can be merged into a digest without losing anything."""
+        return not (self.click or self.attach or self.actions)
+
+
+def is_retryable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def notify_done(msg: NtfyMessage, delivered: bool):
+    if msg.on_done is None:
+        return
+    try:
+        msg.on_done(delivered)
+    except Exception as e:
+        print(f"❌ ntfy delivery callback error: {e}")
+
+
+def _notify_all(messages: List[NtfyMessage]) -> Optional[Callable[[bool], None]]:
+    """One on_done for a digest, reporting to every merged message that has one."""
+    if not any(msg.on_done for msg in messages):
+        return None
+    return lambda delivered: [notify_done(msg, delivered) for msg in messages]
+
+
+def build_digests(messages: List[NtfyMessage], title: str) -> List[NtfyMessage]:
+    """Merge messages sharing topic/priority/tags into as few bodies under NTFY_MAX_MESSAGE_BYTES as possible."""
+    groups = {}
+    for msg in messages:
+        tags = tuple(msg.tags) if isinstance(msg.tags, list) else msg.tags
+        groups.setdefault((msg.topic, msg.priority, tags), []).append(msg)
+
+    digests = []
+    for group in groups.values():
+        chunks, current, size = [], [], 0
+        for msg in group:
+            length = len(msg.message.encode("utf-8")) + len(DIGEST_SEPARATOR.encode("utf-8"))
+            if current and size + length > NTFY_MAX_MESSAGE_BYTES:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(msg)
+            size += length
+
+        if current:
+            chunks.append(current)
+        for chunk in chunks:
+            first = chunk[0]
+            digests.append(NtfyMessage(
+                DIGEST_SEPARATOR.join(msg.message for msg in chunk),
+                title=f"{title} ({len(chunk)})" if len(chunk) > 1 else first.title,
+                priority=first.priority, tags=first.tags, topic=first.topic,
+                on_done=_notify_all(chunk)
+            ))
+    return digests
+
+
+class NtfyDispatcher:
+    """
+    Delivers ntfy notifications from a background thread so the alert loop
+    never waits on the ntfy server. Messages go into a bounded queue (the
+    oldest is dropped when it is full) and are POSTed over one pooled
+    session with a timeout, retrying timeouts, connection errors, 429 and
+    5xx with exponential backoff. Inside coalesce(), messages raised by the
+    calling thread are held back and sent as digests when the block exits.
+    """
+
+    def __init__(
+        self,
+        base_url: str = NTFY_URL,
+        topic: str = None,
+        queue_size: int = NTFY_QUEUE_SIZE,
+        timeout: float = NTFY_TIMEOUT,
+        max_attempts: int = NTFY_MAX_ATTEMPTS,
+        backoff: float = NTFY_BACKOFF,
+        digest_min: int = NTFY_DIGEST_MIN,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.topic = topic
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.digest_min = digest_min
+        self._queue: "queue.Queue[NtfyMessage]" = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._session: Optional[requests.Session] = None
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _get_session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_maxsize=1))
+            session.mount("https://", HTTPAdapter(pool_maxsize=1))
+            self._session = session
+        return self._session
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                # Give queued alerts a chance to go out when the process exits
+                atexit.register(self.drain)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True, name="ntfy")
+                self._worker.start()
+
+    def submit(self, msg: NtfyMessage) -> bool:
+        """
+        Queue `msg` for delivery, returns False if it was dropped instead.
+        The outcome (delivered, failed after retries, or dropped later) goes
+        to msg.on_done; inside coalesce() that is the only way to learn it.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None and msg.plain:
+            buffer.append(msg)
+            return True
+        return self._enqueue(msg)
+
+    def _enqueue(self, msg: NtfyMessage) -> bool:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(msg)
+            return True
+        except queue.Full:
+            pass
+        # Newer alerts matter more than a backlog the server could not take
+        try:
+            dropped = self._queue.get_nowait()
+            self._queue.task_done()
+            messages_sent.inc(channel="ntfy", status="dropped")
+            print(f"⚠️ ntfy queue full, dropped: {dropped.title}")
+            notify_done(dropped, False)
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(msg)
+            return True
+        except queue.Full:
+            messages_sent.inc(channel="ntfy", status="dropped")
+            notify_done(msg, False)
+            return False
+
+    @contextmanager
+    def coalesce(self, title: str = "Alerts"):
+        """Hold back this thread's plain messages and send them as digests on exit."""
+        if getattr(self._local, "buffer", None) is not None:
+            yield  # already inside an outer coalesce()
+            return
+
+        self._local.buffer = []
+        try:
+            yield
+        finally:
+            buffered, self._local.buffer = self._local.buffer, None
+            if self.digest_min and len(buffered) >= self.digest_min:
+                buffered = build_digests(buffered, title)
+            for msg in buffered:
+                self._enqueue(msg)
+
+    def _run(self):
+        while True:
+            msg = self._queue.get()
+            delivered = False
+            try:
+                delivered = self.post(msg)
+            except Exception as e:
+                print(f"❌ ntfy worker error: {e}")
+            finally:
+                notify_done(msg, delivered)
+                self._queue.task_done()
+
+    def post(self, msg: NtfyMessage) -> bool:
+        """Send one message now, retrying transient failures. Returns whether it was delivered."""
+        url = f"{self.base_url}/{msg.topic or self.topic}"
+        headers = msg.headers()
+        data = msg.message.encode("utf-8")
+
+        for attempt in range(1, self.max_attempts + 1):
+            delay = min(self.backoff * 2 ** (attempt - 1), NTFY_MAX_BACKOFF)
+            try:
+                with stage_timer("ntfy"):
+                    response = self._get_session().post(url, headers=headers, data=data, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = type(e).__name__
+            else:
+                if response.status_code == 200:
+                    messages_sent.inc(channel="ntfy", status="sent")
+                    print("✅ Notification sent successfully!")
+                    return True
+                reason = f"{response.status_code} - {response.text.strip()}"
+                if not is_retryable(response.status_code):
+                    break
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = min(float(retry_after), NTFY_MAX_BACKOFF)
+
+            if attempt < self.max_attempts:
+                messages_sent.inc(channel="ntfy", status="retried")
+                print(f"⚠️ ntfy send failed ({reason}), retry {attempt}/{self.max_attempts - 1} in {delay:.0f}s")
+                time.sleep(delay)
+
+        messages_sent.inc(channel="ntfy", status="failed")
+        print(f"❌ Failed to send notification: {reason}")
+        return False
+
+    def drain(self, timeout: float = 10) -> bool:
+        """Wait up to `timeout` seconds for queued messages to go out, returns whether the queue emptied."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
@@ -0,0 +1,86 @@
+from typing import Callable, List, Optional
+
+from state_db import get_state, set_state
+
+POOL_PAGE_LIMIT = 100
+FULL_PROBE_START_OFFSET = 10000
+GALLOP_FANOUT = 4
+STATE_KEY = "last_non_empty_pool_offset"
+
+# probe(offsets) -> [True if LpSugar.all(POOL_PAGE_LIMIT, offset) is non-empty, ...]
+PageProbe = Callable[[List[int]], List[bool]]
+
+
+def _gallop(probe: PageProbe, known: int) -> tuple[int, int]:
+    """
+    Starting from a non-empty page, probe exponentially growing offsets
+    (GALLOP_FANOUT per batch) until an empty page is found.
+    Returns (last non-empty offset, first empty offset).
+    """
+    step = POOL_PAGE_LIMIT
+    while True:
+        offsets = [known + step * 2 ** k for k in range(GALLOP_FANOUT)]
+        flags = probe(offsets)
+        for offset, non_empty in zip(offsets, flags):
+            if not non_empty:
+                return known, offset
+            known = offset
+        step *= 2 ** GALLOP_FANOUT
+
+
+def _bisect(probe: PageProbe, lo: int, hi: int) -> int:
+    # lo is a non-empty page, hi an empty one; narrow down to adjacent pages
+    while hi - lo > POOL_PAGE_LIMIT:
+        mid = lo + ((hi - lo) // POOL_PAGE_LIMIT // 2) * POOL_PAGE_LIMIT
+        if probe([mid])[0]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def _search_from(probe: PageProbe, known: int) -> Optional[int]:
+    known_non_empty, next_non_empty = probe([known, known + POOL_PAGE_LIMIT])
+    if not known_non_empty:
+        # Pools are never removed, so the stored boundary is wrong
+        return None
+    if not next_non_empty:
+        return known
+    lo, hi = _gallop(probe, known + POOL_PAGE_LIMIT)
+    return _bisect(probe, lo, hi)
+
+
+def _full_probe(probe: PageProbe) -> Optional[int]:
+    start = FULL_PROBE_START_OFFSET
+    if not probe([start])[0]:
+        if not probe([0])[0]:
+            return None
+        start = 0
+    lo, hi = _gallop(probe, start)
+    return _bisect(probe, lo, hi)
+
+
+def discover_last_pool_offset(probe: PageProbe) -> Optional[int]:
+    """
+    Find the offset of the last non-empty LpSugar.all page.
+
+    The last known value is kept in SQLite; since the pool count only grows,
+    a cycle usually costs a single batch of two probes around that boundary.
+    A full galloping probe runs only when no value is stored or it is stale.
+    """
+    stored = get_state(STATE_KEY)
+    result = None
+
+    if stored is not None:
+        result = _search_from(probe, int(stored))
+        if result is None:
+            print(f"[WARN] Stored pool offset {stored} is empty, running full probe...")
+
+    if result is None:
+        result = _full_probe(probe)
+
+    if result is not None and str(result) != stored:
+        set_state(STATE_KEY, result)
+
+    print(f"[DONE] Last non-empty pool offset: {result}")
+    return result
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import fields, replace
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from alert_db import DB_PATH
+from data_models import Lp
+from metrics import record_cache
+from state_db import connect, get_state, set_state
+
+# Full LpSugar.byAddress re-read interval for Swap re-checks; in between, concentrated
+# pools only get slot0(). Below the 3-minute alert interval; scans always read in full.
+POOL_STATE_TTL = float(os.getenv("POOL_STATE_TTL", "120"))
+# Pools kept in memory; the rest of the universe only lives in the table
+POOL_INDEX_CACHE_SIZE = int(os.getenv("POOL_INDEX_CACHE_SIZE", "2048"))
+# LpSugar.all pages folded into the index per alert cycle (0 = only what scans touch)
+POOL_INDEX_SYNC_PAGES = int(os.getenv("POOL_INDEX_SYNC_PAGES", "1"))
+SYNC_CURSOR_KEY = "pool_index_offset"
+LP_FIELDS = [f.name for f in fields(Lp)]
+
+# fetch(pool addresses) -> [Lp, ...] in the same order, one byAddress batch
+FullFetcher = Callable[[List[str]], List[Lp]]
+# fetch(pool addresses) -> [(sqrt_ratio, tick), ...] in the same order, one slot0() batch
+Slot0Fetcher = Callable[[List[str]], List[Tuple[int, int]]]
+# fetch(offset) -> [Lp, ...], one LpSugar.all page
+PageFetcher = Callable[[int], List[Lp]]
+
+
+def is_concentrated(lp: Lp) -> bool:
+    # Sugar reports the tick spacing as the type of Slipstream pools, 0/-1 for v2 stable/volatile
+    return lp.type > 0
+
+
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pool_index (
+    address TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class PoolIndex:
+    """
+    Address -> last full Sugar record of every pool seen, in the
+    `pool_index` table, with the `max_size` most recently used pools in
+    memory. Scans re-read every pool they hold with byAddress, once per
+    pool however many positions share it. Swap re-checks re-read a pool in
+    full only once its record is older than `ttl`; in between, concentrated
+    pools just refresh tick and sqrt_ratio with slot0(), and the Lp they get
+    carries the age of the rest in `state_at`.
+    """
+
+    def __init__(
+        self,
+        fetch_full_func: FullFetcher,
+        fetch_slot0_func: Slot0Fetcher,
+        ttl: float = POOL_STATE_TTL,
+        max_size: int = POOL_INDEX_CACHE_SIZE,
+        db_path: str = DB_PATH,
+    ):
+        self.fetch_full_func = fetch_full_func
+        self.fetch_slot0_func = fetch_slot0_func
+        self.ttl = ttl
+        self.max_size = max_size
+        self.db_path = db_path
+        # address (lowercase) -> (Lp, time of the last full read), least recently used first
+        self._pools: "OrderedDict[str, Tuple[Lp, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def _remember(self, address: str, lp: Lp, read_at: float):
+        self._pools[address] = (lp, read_at)
+        self._pools.move_to_end(address)
+        while len(self._pools) > self.max_size:
+            self._pools.popitem(last=False)
+
+    def warm(self) -> int:
+        """Load the most recently read pools into memory, returns how many."""
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            rows = conn.execute(
+                "SELECT address, record, updated_at FROM pool_index ORDER BY updated_at DESC LIMIT ?", (self.max_size,)
+            ).fetchall()
+
+        with self._lock:
+            for address, record, updated_at in reversed(rows):
+                self._remember(address, Lp(*json.loads(record)), updated_at)
+
+        print(f"🏊 Pool index warmed with {len(rows)} pools")
+        return len(rows)
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    def get(self, address: str) -> Optional[Lp]:
+        """Last full record of the pool (static fields current, the rest as of its last read), or None."""
+        entry = self._pools.get(address.lower())
+        return entry[0] if entry else None
+
+    def record(self, lps: Iterable[Lp], now: float = None, keep: bool = True):
+        """
+        Store freshly read full records (byAddress results or all() pages).
+        With keep=False (bulk pages) only pools already in memory are updated there.
+        """
+        now = time.time() if now is None else now
+        lps = list(lps)
+        if not lps:
+            return
+
+        with self._lock:
+            for lp in lps:
+                address = lp.lp.lower()
+                if keep or address in self._pools:
+                    self._remember(address, lp, now)
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pool_index (address, record, updated_at) VALUES (?, ?, ?)",
+                [(lp.lp.lower(), json.dumps([getattr(lp, name) for name in LP_FIELDS]), now) for lp in lps]
+            )
+
+    def _plan(self, pools: List[str], full_read: bool) -> Tuple[List[str], Dict[str, Tuple[Lp, float]]]:
+        """Split deduplicated pools into (needs a full read, {pool: record slot0 is applied to})."""
+        now = time.time()
+        full, slot0 = [], {}
+        with self._lock:
+            for pool in pools:
+                entry = self._pools.get(pool)
+                if entry is not None:
+                    self._pools.move_to_end(pool)
+                if full_read or entry is None or now - entry[1] > self.ttl or not is_concentrated(entry[0]):
+                    full.append(pool)
+                else:
+                    slot0[pool] = entry
+        record_cache("pool_index", hits=len(slot0), misses=len(full))
+        return full, slot0
+
+    def _merge(self, full: List[str], full_lps: List[Lp], slot0: Dict[str, Tuple[Lp, float]], slot0_states) -> Dict[str, Lp]:
+        self.record(full_lps)
+        result = dict(zip(full, full_lps))
+        for (pool, (lp, read_at)), (sqrt_ratio, tick) in zip(slot0.items(), slot0_states):
+            result[pool] = replace(lp, sqrt_ratio=sqrt_ratio, tick=tick, state_at=read_at)
+        return result
+
+    def lookup(self, pools: Iterable[str], full_read: bool = False) -> Dict[str, Lp]:
+        """
+        Current Lp of every pool in `pools`, keyed by lowercase address; one
+        batch per kind of read. full_read=True re-reads every pool with byAddress.
+        """
+        wanted = list(dict.fromkeys(pool.lower() for pool in pools))
+        full, slot0 = self._plan(wanted, full_read)
+        slot0_states = []
+        if slot0:
+            try:
+                slot0_states = self.fetch_slot0_func(list(slot0))
+            except Exception as e:
+                print(f"⚠️ slot0 batch failed, re-reading {len(slot0)} pools with byAddress: {e}")
+                full, slot0 = full + list(slot0), {}
+        full_lps = self.fetch_full_func(full) if full else []
+        return self._merge(full, full_lps, slot0, slot0_states)
+
+    async def alookup(self, pools: Iterable[str], afetch_full_func, afetch_slot0_func, full_read: bool = False) -> Dict[str, Lp]:
+        """Same as lookup(), reading with the coroutine functions given."""
+        wanted = list(dict.fromkeys(pool.lower() for pool in pools))
+        full, slot0 = self._plan(wanted, full_read)
+        slot0_states = []
+        if slot0:
+            try:
+                slot0_states = await afetch_slot0_func(list(slot0))
+            except Exception as e:
+                print(f"⚠️ slot0 batch failed, re-reading {len(slot0)} pools with byAddress: {e}")
+                full, slot0 = full + list(slot0), {}
+        full_lps = await afetch_full_func(full) if full else []
+        # record() writes to SQLite, keep it off the event loop
+        return await asyncio.to_thread(self._merge, full, full_lps, slot0, slot0_states)
+
+    def sync(self, fetch_page_func: PageFetcher, page_size: int, pages: int = POOL_INDEX_SYNC_PAGES) -> int:
+        """
+        Fold the next `pages` LpSugar.all pages into the index, continuing
+        from where the last call stopped and starting over after the last
+        page. Returns the number of pools read.
+        """
+        offset = int(get_state(SYNC_CURSOR_KEY, 0))
+        read = 0
+        for _ in range(pages):
+            lps = fetch_page_func(offset)
+            self.record(lps, keep=False)
+            read += len(lps)
+            offset = offset + page_size if len(lps) == page_size else 0
+        set_state(SYNC_CURSOR_KEY, offset)
+        return read
@@ -0,0 +1,100 @@
+from decimal import Context, Decimal
+from typing import Dict, List, Tuple
+
+Q96 = 1 << 96
+Q192 = 1 << 192
+SECONDS_PER_YEAR = 31_556_926
+# 10**n for every exponent a token decimals difference or 18 - decimals can need
+POW10: Tuple[int, ...] = tuple(10 ** n for n in range(78))
+# Significant digits on top of the displayed fractional digits, as the old getcontext().prec did
+GUARD_DIGITS = 10
+
+_contexts: Dict[int, Context] = {}
+
+
+def context_for(precision: int) -> Context:
+    """
+    Read-only Context per precision. Arithmetic goes through its methods
+    instead of the global getcontext(), so threads never see each other's
+    precision.
+    """
+    ctx = _contexts.get(precision)
+    if ctx is None:
+        ctx = _contexts.setdefault(precision, Context(prec=precision + GUARD_DIGITS))
+    return ctx
+
+
+def ratio(numerator: int, denominator: int, precision: int) -> Decimal:
+    # Both sides are exact integers, so this is the only rounding step
+    return context_for(precision).divide(Decimal(numerator), Decimal(denominator))
+
+
+def raw_to_decimal(raw: int, decimals: int, precision: int = 4) -> Decimal:
+    return Decimal(raw).scaleb(-decimals, context_for(precision))
+
+
+def sqrt_price_to_price(sqrt_price_x96: int, precision: int = 8) -> Decimal:
+    return ratio(sqrt_price_x96 * sqrt_price_x96, Q192, precision)
+
+
+def real_price(sqrt_price_x96: int, decimals0: int, decimals1: int, precision: int = 8) -> Decimal:
+    """token1 per token0 from sqrtPriceX96, adjusted for token decimals."""
+    numerator, denominator = sqrt_price_x96 * sqrt_price_x96, Q192
+    diff = decimals0 - decimals1
+    if diff >= 0:
+        numerator *= POW10[diff]
+    else:
+        denominator *= POW10[-diff]
+    return ratio(numerator, denominator, precision)
+
+
+def range_prices(pos, lp, token0, token1, precision: int = 8) -> Tuple[Decimal, Decimal, Decimal]:
+    """(upper, now, lower) real prices of a position, in the order cal_real_price() returns them."""
+    return (
+        real_price(pos.sqrt_ratio_upper, token0.decimals, token1.decimals, precision),
+        real_price(lp.sqrt_ratio, token0.decimals, token1.decimals, precision),
+        real_price(pos.sqrt_ratio_lower, token0.decimals, token1.decimals, precision),
+    )
+
+
+def range_prices_batch(positions, lps, token_pairs, precision: int = 8) -> List[Tuple[Decimal, Decimal, Decimal]]:
+    """
+    range_prices() for many positions; lps[i] and token_pairs[i] belong to
+    positions[i]. A pool's current price is converted once for all the
+    positions in it.
+    """
+    now_prices: Dict[Tuple[int, int, int], Decimal] = {}
+    result = []
+    for pos, lp, (token0, token1) in zip(positions, lps, token_pairs):
+        decimals0, decimals1 = token0.decimals, token1.decimals
+        key = (lp.sqrt_ratio, decimals0, decimals1)
+        now = now_prices.get(key)
+        if now is None:
+            now = now_prices[key] = real_price(lp.sqrt_ratio, decimals0, decimals1, precision)
+        result.append((
+            real_price(pos.sqrt_ratio_upper, decimals0, decimals1, precision),
+            now,
+            real_price(pos.sqrt_ratio_lower, decimals0, decimals1, precision),
+        ))
+    return result
+
+
+def lp_apr(
+    emissions: int,
+    staked0: int,
+    staked1: int,
+    rate0: int,
+    rate1: int,
+    rate_aero: int,
+    precision: int = 3,
+) -> Decimal:
+    """
+    Yearly emissions value over staked value, in percent. Rates are the
+    oracle's 1e18-scaled ETH rates, so the token decimals cancel out:
+    100 * year * emissions * rate_aero / (rate0 * staked0 + rate1 * staked1).
+    Returns 0 when nothing is staked.
+    """
+    staked_value = rate0 * staked0 + rate1 * staked1
+    if staked_value == 0:
+        return Decimal(0)
+    return ratio(100 * SECONDS_PER_YEAR * emissions * rate_aero, staked_value, precision)
@@ -0,0 +1,72 @@
+import os
+import time
+from threading import Lock
+from typing import Callable, Dict, Iterable, List
+
+from metrics import record_cache
+
+PRICE_TTL_SECONDS = float(os.getenv("PRICE_TTL_SECONDS", "60"))
+
+# fetch(tokens) -> [getRateToEth result, ...] in the same order, one RPC batch
+RateFetcher = Callable[[List[str]], List[int]]
+
+
+class PriceSnapshot:
+    """
+    TTL cache of OffchainOracle.getRateToEth rates shared by every formatter.
+    Tokens that are missing or older than `ttl` seconds are refreshed
+    together in one deduplicated batch.
+    """
+
+    def __init__(self, fetch_func: RateFetcher, ttl: float = PRICE_TTL_SECONDS):
+        self.fetch_func = fetch_func
+        self.ttl = ttl
+        self._rates: Dict[str, tuple[int, float]] = {}
+        self._lock = Lock()
+
+    def _stale(self, tokens: List[str], now: float) -> List[str]:
+        with self._lock:
+            stale = [
+                token for token in tokens
+                if token not in self._rates or now - self._rates[token][1] > self.ttl
+            ]
+        record_cache("prices", hits=len(tokens) - len(stale), misses=len(stale))
+        return stale
+
+    def _store(self, wanted: List[str], stale: List[str], rates: List[int], now: float) -> Dict[str, int]:
+        with self._lock:
+            for token, rate in zip(stale, rates):
+                self._rates[token] = (rate, now)
+            return {token: self._rates[token][0] for token in wanted}
+
+    def prefetch(self, tokens: Iterable[str]) -> Dict[str, int]:
+        wanted = list(dict.fromkeys(token.lower() for token in tokens))
+        now = time.monotonic()
+        stale = self._stale(wanted, now)
+        rates = self.fetch_func(stale) if stale else []
+        return self._store(wanted, stale, rates, now)
+
+    async def aprefetch(self, tokens: Iterable[str], afetch_func) -> Dict[str, int]:
+        """Same as prefetch(), refreshing stale rates with the coroutine function `afetch_func`."""
+        wanted = list(dict.fromkeys(token.lower() for token in tokens))
+        now = time.monotonic()
+        stale = self._stale(wanted, now)
+        rates = await afetch_func(stale) if stale else []
+        return self._store(wanted, stale, rates, now)
+
+    def get_rates(self, tokens: List[str]) -> List[int]:
+        rates = self.prefetch(tokens)
+        return [rates[token.lower()] for token in tokens]
+
+    def seed(self, rates: Dict[str, int], taken_at: float):
+        """Load rates read at wall-clock time `taken_at` (e.g. from a restored scan), keeping their age."""
+        read_at = time.monotonic() - max(time.time() - taken_at, 0)
+        with self._lock:
+            for token, rate in rates.items():
+                token = token.lower()
+                if token not in self._rates or self._rates[token][1] < read_at:
+                    self._rates[token] = (rate, read_at)
+
+    def clear(self):
+        with self._lock:
+            self._rates.clear()
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from data_models import Lp, Position
+
+TICK_BASE = 1.0001
+
+
+@dataclass
+class RangeReport:
+    in_range: np.ndarray  # bool
+    ticks_to_lower: np.ndarray  # int64, tick - tick_lower (negative below the range)
+    ticks_to_upper: np.ndarray  # int64, tick_upper - tick (negative above the range)
+    distance_ticks: np.ndarray  # int64, to the nearest edge; negative means that far outside
+    distance_pct: np.ndarray  # float64, price move in % that reaches the nearest edge
+
+    def __len__(self):
+        return len(self.in_range)
+
+    def out_of_range(self) -> np.ndarray:
+        return np.flatnonzero(~self.in_range)
+
+
+def evaluate_ranges(
+    ticks: np.ndarray,
+    tick_lower: np.ndarray,
+    tick_upper: np.ndarray,
+    sqrt_ratios: Sequence[int] = None,
+    sqrt_ratio_upper: Sequence[int] = None,
+) -> RangeReport:
+    """
+    In/out of range and distance to the edges for every position in one pass.
+    A position is in range while tick_lower <= tick < tick_upper; on the upper
+    edge tick itself, the exact uint160 sqrt ratios decide (price exactly at
+    the upper bound still counts as in range, like the Decimal comparison did).
+    """
+    ticks = np.asarray(ticks, dtype=np.int64)
+    tick_lower = np.asarray(tick_lower, dtype=np.int64)
+    tick_upper = np.asarray(tick_upper, dtype=np.int64)
+
+    to_lower = ticks - tick_lower
+    to_upper = tick_upper - ticks
+    in_range = (to_lower >= 0) & (to_upper > 0)
+
+    if sqrt_ratios is not None and sqrt_ratio_upper is not None:
+        for i in np.flatnonzero(to_upper == 0):
+            # uint160 does not fit NumPy ints, compare the Python ints for these few rows
+            in_range[i] = sqrt_ratios[i] <= sqrt_ratio_upper[i]
+
+    # Inside both are >= 0; outside, the violated edge is the negative one
+    distance = np.minimum(to_lower, to_upper)
+    distance_pct = (np.power(TICK_BASE, np.abs(distance)) - 1) * 100 * np.sign(distance)
+
+    return RangeReport(in_range, to_lower, to_upper, distance, distance_pct)
+
+
+def evaluate_positions(positions: List[Position], lps: List[Lp]) -> RangeReport:
+    """evaluate_ranges() over positions and their pools (lps[i] is the pool of positions[i])."""
+    return evaluate_ranges(
+        np.fromiter((lp.tick for lp in lps), dtype=np.int64, count=len(lps)),
+        np.fromiter((pos.tick_lower for pos in positions), dtype=np.int64, count=len(positions)),
+        np.fromiter((pos.tick_upper for pos in positions), dtype=np.int64, count=len(positions)),
+        [lp.sqrt_ratio for lp in lps],
+        [pos.sqrt_ratio_upper for pos in positions],
+    )
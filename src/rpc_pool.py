@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from requests.exceptions import HTTPError
+from web3 import Web3
+from web3._utils.batching import sort_batch_response_by_response_ids
+
+from metrics import record_rpc
+
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "30"))
+# Send a duplicate request to the next best endpoint when the first one has
+# not answered after this many seconds (0 disables hedging)
+RPC_HEDGE_AFTER = float(os.getenv("RPC_HEDGE_AFTER", "0"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("RPC_CIRCUIT_FAILURES", "3"))
+CIRCUIT_COOLDOWN = float(os.getenv("RPC_CIRCUIT_COOLDOWN", "30"))
+CIRCUIT_MAX_COOLDOWN = 600
+RATE_LIMIT_PENALTY_WINDOW = 60
+
+RATE_LIMIT_MARKERS = ("rate limit", "too many requests", "429")
+
+
+def is_rate_limited(error) -> bool:
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code == 429
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+class EndpointStats:
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None  # EWMA, seconds
+        self.recent = deque(maxlen=50)  # True = success
+        self.calls = 0
+        self.inflight = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.last_rate_limited = 0.0
+        self.consecutive_failures = 0
+        self.cooldown = CIRCUIT_COOLDOWN
+        self.open_until = 0.0
+
+    @property
+    def name(self) -> str:
+        # Strip API keys from the path when printing
+        return self.url.split("//", 1)[-1].split("/", 1)[0]
+
+    @property
+    def error_rate(self) -> float:
+        return 1 - sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+    def score(self, now: float) -> float:
+        if self.latency is None:
+            return float(self.inflight)  # try unknown endpoints first
+        # In-flight requests push parallel work onto the other endpoints
+        score = self.latency * (1 + 4 * self.error_rate) * (1 + self.inflight)
+        if now - self.last_rate_limited < RATE_LIMIT_PENALTY_WINDOW:
+            score += 5
+        return score
+
+    def __str__(self) -> str:
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "n/a"
+        state = "open" if self.is_open(time.monotonic()) else "closed"
+        return (
+            f"{self.name}: {latency}, calls={self.calls}, errors={self.errors} "
+            f"({self.error_rate:.0%} recent), 429={self.rate_limited}, circuit={state}"
+        )
+
+
+class EndpointPool:
+    """
+    Health-scored set of RPC endpoints. Each request goes to the endpoint
+    with the best latency/error score. Endpoints that fail
+    CIRCUIT_FAILURE_THRESHOLD times in a row are skipped for a cooldown that
+    doubles on every failed half-open trial.
+    """
+
+    def __init__(self, endpoints: List[str], hedge_after: float = RPC_HEDGE_AFTER):
+        self.endpoints = [EndpointStats(url) for url in endpoints]
+        self.hedge_after = hedge_after
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(endpoints), thread_name_prefix="rpc-hedge")
+
+    def ranked(self) -> List[EndpointStats]:
+        now = time.monotonic()
+        with self._lock:
+            closed = sorted((ep for ep in self.endpoints if not ep.is_open(now)), key=lambda ep: ep.score(now))
+            # If every circuit is open, fall back to whichever reopens first
+            tripped = sorted((ep for ep in self.endpoints if ep.is_open(now)), key=lambda ep: ep.open_until)
+        return closed + tripped
+
+    def begin(self, ep: EndpointStats):
+        with self._lock:
+            ep.inflight += 1
+
+    def record_success(self, ep: EndpointStats, latency: float):
+        with self._lock:
+            ep.inflight -= 1
+            ep.calls += 1
+            ep.recent.append(True)
+            ep.latency = latency if ep.latency is None else 0.8 * ep.latency + 0.2 * latency
+            if ep.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                print(f"🟢 RPC {ep.name} recovered")
+            ep.consecutive_failures = 0
+            ep.cooldown = CIRCUIT_COOLDOWN
+
+    def record_failure(self, ep: EndpointStats, error: Exception, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            ep.inflight -= 1
+            ep.calls += 1
+            ep.errors += 1
+            ep.recent.append(False)
+            ep.latency = latency if ep.latency is None else 0.8 * ep.latency + 0.2 * latency
+            if is_rate_limited(error):
+                ep.rate_limited += 1
+                ep.last_rate_limited = now
+            ep.consecutive_failures += 1
+            if ep.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                ep.open_until = now + ep.cooldown
+                print(f"🔴 RPC {ep.name} circuit open for {ep.cooldown:.0f}s ({type(error).__name__})")
+                ep.cooldown = min(ep.cooldown * 2, CIRCUIT_MAX_COOLDOWN)
+
+    def get_web3(self) -> Web3:
+        # One Web3 per thread: web3's batching state lives on the provider
+        web3 = getattr(self._local, "web3", None)
+        if web3 is None:
+            web3 = Web3(PooledHTTPProvider(self))
+            self._local.web3 = web3
+        return web3
+
+    def summary(self) -> str:
+        return "\n".join(str(ep) for ep in self.endpoints)
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """
+    HTTPProvider that picks an endpoint from the pool for every request.
+    Sessions are cached per endpoint by web3's session manager, so
+    connections are kept alive between requests. Failed requests fail over
+    to the next endpoint; slow ones are optionally hedged.
+    """
+
+    def __init__(self, pool: EndpointPool):
+        super().__init__(pool.endpoints[0].url, request_kwargs={"timeout": RPC_TIMEOUT})
+        self.pool = pool
+
+    def __str__(self) -> str:
+        return f"Pooled RPC connection ({len(self.pool.endpoints)} endpoints)"
+
+    def _post(self, ep: EndpointStats, request_data: bytes, method: str = "", calls: int = 1):
+        self.pool.begin(ep)
+        start = time.monotonic()
+        try:
+            raw_response = self._request_session_manager.make_post_request(
+                ep.url, request_data, **self.get_request_kwargs()
+            )
+            response = self.decode_rpc_response(raw_response)
+            error = response.get("error") if isinstance(response, dict) else None
+            if error and is_rate_limited(error.get("message", "")):
+                raise HTTPError(f"Rate limited by {ep.name}: {error}")
+        except Exception as e:
+            elapsed = time.monotonic() - start
+            self.pool.record_failure(ep, e, elapsed)
+            record_rpc(ep.name, method, elapsed, calls, error=e)
+            raise
+        elapsed = time.monotonic() - start
+        self.pool.record_success(ep, elapsed)
+        record_rpc(ep.name, method, elapsed, calls)
+        return response
+
+    def _hedged(self, candidates: List[EndpointStats], request_data: bytes, method: str, calls: int,
+                tried: List[EndpointStats]):
+        """Send to the best endpoint, and to the next one too if it is slow; `tried` gets every endpoint used."""
+        tried.append(candidates[0])
+        primary = self.pool._executor.submit(self._post, candidates[0], request_data, method, calls)
+        done, _ = wait([primary], timeout=self.pool.hedge_after)
+        if done or len(candidates) < 2:
+            return primary.result()
+
+        tried.append(candidates[1])
+        backup = self.pool._executor.submit(self._post, candidates[1], request_data, method, calls)
+        pending = {primary, backup}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _send(self, request_data: bytes, method: str = "", calls: int = 1):
+        candidates = self.pool.ranked()
+        if self.pool.hedge_after > 0:
+            tried: List[EndpointStats] = []
+            try:
+                return self._hedged(candidates, request_data, method, calls, tried)
+            except Exception:
+                # A primary that fails fast is never hedged: fall back to everything not sent to yet
+                candidates = [ep for ep in candidates if ep not in tried]
+                if not candidates:
+                    raise
+
+        error: Optional[Exception] = None
+        for ep in candidates:
+            try:
+                return self._post(ep, request_data, method, calls)
+            except Exception as e:
+                error = e
+        raise error
+
+    def make_request(self, method, params):
+        return self._send(self.encode_rpc_request(method, params), method)
+
+    def make_batch_request(self, batch_requests):
+        methods = {method for method, _ in batch_requests}
+        method = methods.pop() if len(methods) == 1 else "mixed"
+        response = self._send(self.encode_batch_rpc_request(batch_requests), method, len(batch_requests))
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object
+            return response
+        return sort_batch_response_by_response_ids(response)
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass, field, fields
+from threading import Lock
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from alert_db import DB_PATH
+from data_models import Lp, Position, Token
+from metrics import record_cache
+from state_db import connect
+
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", "180"))
+LP_FIELDS = [f.name for f in fields(Lp)]
+POSITION_FIELDS = [f.name for f in fields(Position)]
+
+
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    record TEXT NOT NULL
+)
+"""
+
+
+@dataclass
+class ScanSnapshot:
+    positions: List[Position]
+    unstaked_positions: List[Position]
+    lps: List[Lp]
+    unstaked_lps: List[Lp]
+    tokens: Dict[str, Token]
+    prices: Dict[str, int]
+    block_number: int
+    taken_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.taken_at
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "positions": [[getattr(pos, name) for name in POSITION_FIELDS] for pos in self.positions],
+            "unstaked_positions": [[getattr(pos, name) for name in POSITION_FIELDS] for pos in self.unstaked_positions],
+            "lps": [[getattr(lp, name) for name in LP_FIELDS] for lp in self.lps],
+            "unstaked_lps": [[getattr(lp, name) for name in LP_FIELDS] for lp in self.unstaked_lps],
+            "tokens": {address: [token.symbol, token.decimals] for address, token in self.tokens.items()},
+            "prices": self.prices,
+            "block_number": self.block_number,
+            "taken_at": self.taken_at,
+        })
+
+    @classmethod
+    def from_json(cls, record: str) -> "ScanSnapshot":
+        data = json.loads(record)
+        return cls(
+            [Position(*values) for values in data["positions"]],
+            [Position(*values) for values in data["unstaked_positions"]],
+            [Lp(*values) for values in data["lps"]],
+            [Lp(*values) for values in data["unstaked_lps"]],
+            {address: Token(*values) for address, values in data["tokens"].items()},
+            data["prices"],
+            data["block_number"],
+            data["taken_at"],
+        )
+
+
+class SnapshotService:
+    """
+    Holds the latest full scan and shares it between the alert loop and
+    /liquidity. Readers get the cached snapshot while it is younger than
+    `max_age`; concurrent refreshes (from any thread or the event loop)
+    collapse into a single in-flight fetch. Every new snapshot is saved to
+    the `scan_snapshot` table so warm() can hand it out after a restart.
+    """
+
+    def __init__(
+        self,
+        fetch_func: Callable[[], ScanSnapshot],
+        afetch_func: Optional[Callable[[], Awaitable[ScanSnapshot]]] = None,
+        max_age: float = SNAPSHOT_MAX_AGE,
+        db_path: str = DB_PATH,
+    ):
+        self.fetch_func = fetch_func
+        self.afetch_func = afetch_func
+        self.max_age = max_age
+        self.db_path = db_path
+        self.latest: Optional[ScanSnapshot] = None
+        self._inflight: Optional[Future] = None
+        self._lock = Lock()
+
+    def warm(self) -> int:
+        """Restore the last saved snapshot as `latest`, returns its number of positions."""
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            row = conn.execute("SELECT record FROM scan_snapshot WHERE id = 0").fetchone()
+        if row is None:
+            return 0
+
+        snapshot = ScanSnapshot.from_json(row[0])
+        with self._lock:
+            if self.latest is None:
+                self.latest = snapshot
+        print(f"📦 Scan snapshot restored from block {snapshot.block_number} ({snapshot.age:.0f}s old)")
+        return len(snapshot.positions) + len(snapshot.unstaked_positions)
+
+    def _save(self, snapshot: ScanSnapshot):
+        try:
+            with connect(self.db_path, TABLE_SCHEMA) as conn:
+                conn.execute("INSERT OR REPLACE INTO scan_snapshot (id, record) VALUES (0, ?)", (snapshot.to_json(),))
+        except Exception as e:
+            print(f"⚠️ Failed to save scan snapshot: {e}")
+
+    def _fresh(self, max_age: Optional[float]) -> Optional[ScanSnapshot]:
+        limit = self.max_age if max_age is None else max_age
+        snapshot = self.latest
+        if snapshot is not None and snapshot.age <= limit:
+            record_cache("snapshot", hits=1)
+            return snapshot
+        record_cache("snapshot", misses=1)
+        return None
+
+    def _join_or_lead(self) -> tuple[Future, bool]:
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight, False
+            self._inflight = Future()
+            return self._inflight, True
+
+    def _finish(self, future: Future, snapshot: ScanSnapshot = None, error: Exception = None):
+        with self._lock:
+            if snapshot is not None:
+                self.latest = snapshot
+            self._inflight = None
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(snapshot)
+
+    def _abandon(self, future: Future):
+        """The leader was cancelled or interrupted: free the slot and let waiters lead a new fetch."""
+        with self._lock:
+            if self._inflight is future:
+                self._inflight = None
+        future.cancel()
+
+    def refresh(self) -> ScanSnapshot:
+        while True:
+            future, leader = self._join_or_lead()
+            if leader:
+                try:
+                    snapshot = self.fetch_func()
+                except Exception as e:
+                    self._finish(future, error=e)
+                except BaseException:
+                    self._abandon(future)
+                    raise
+                else:
+                    self._finish(future, snapshot=snapshot)
+                    self._save(snapshot)
+            try:
+                return future.result()
+            except CancelledError:
+                continue  # the leader gave up without a result, fetch again
+
+    def get(self, max_age: Optional[float] = None) -> ScanSnapshot:
+        return self._fresh(max_age) or self.refresh()
+
+    async def arefresh(self) -> ScanSnapshot:
+        while True:
+            future, leader = self._join_or_lead()
+            if leader:
+                try:
+                    if self.afetch_func is not None:
+                        snapshot = await self.afetch_func()
+                    else:
+                        snapshot = await asyncio.to_thread(self.fetch_func)
+                except Exception as e:
+                    self._finish(future, error=e)
+                except BaseException:
+                    # Cancelled (e.g. a /liquidity handler at shutdown): never leave
+                    # _inflight pointing at a Future nobody will resolve
+                    self._abandon(future)
+                    raise
+                else:
+                    self._finish(future, snapshot=snapshot)
+                    # JSON of every position and pool plus a SQLite write, off the event loop
+                    await asyncio.to_thread(self._save, snapshot)
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise  # this task itself is being cancelled
+                # the leader was cancelled, fetch again
+
+    async def aget(self, max_age: Optional[float] = None) -> ScanSnapshot:
+        return self._fresh(max_age) or await self.arefresh()
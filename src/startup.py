@@ -0,0 +1,37 @@
+import time
+import traceback
+from typing import Callable, Dict
+
+from metrics import startup_seconds
+
+# Taken when main.py imports this module, before web3, telegram and the rest
+STARTED_AT = time.monotonic()
+
+_marked = set()
+
+
+def mark(event: str) -> float:
+    """Record the first time `event` is reached, in seconds since startup; later calls are ignored."""
+    elapsed = time.monotonic() - STARTED_AT
+    if event not in _marked:
+        _marked.add(event)
+        startup_seconds.set(elapsed, event=event)
+        print(f"🚀 {event} after {elapsed:.2f}s")
+    return elapsed
+
+
+def warm_caches(warmers: Dict[str, Callable[[], int]]) -> Dict[str, int]:
+    """
+    Run each cache's warm() in turn so the first cycle after a restart
+    starts from what the last process left on disk. A cache that fails to
+    load stays cold; it never stops the bot from starting.
+    """
+    start = time.monotonic()
+    loaded = {}
+    for name, warm in warmers.items():
+        try:
+            loaded[name] = warm()
+        except Exception:
+            print(f"⚠️ Could not warm {name}, starting it cold:\n{traceback.format_exc()}")
+    print(f"♨️ Caches warmed from disk in {(time.monotonic() - start) * 1000:.0f}ms")
+    return loaded
@@ -0,0 +1,42 @@
+import sqlite3
+from contextlib import closing, contextmanager
+
+from alert_db import DB_PATH
+
+# (db_path, schema) pairs already created in this process
+_created = set()
+
+
+@contextmanager
+def connect(db_path: str, schema: str):
+    """One transaction on a connection that is closed afterwards; `schema` runs once per file."""
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        if (db_path, schema) not in _created:
+            conn.execute(schema)
+            _created.add((db_path, schema))
+        yield conn
+
+
+def init_state_db():
+    with closing(sqlite3.connect(DB_PATH)) as conn, conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bot_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+
+
+def get_state(key: str, default=None):
+    with closing(sqlite3.connect(DB_PATH)) as conn, conn:
+        row = conn.execute("SELECT value FROM bot_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+
+def set_state(key: str, value):
+    with closing(sqlite3.connect(DB_PATH)) as conn, conn:
+        conn.execute(
+            "INSERT INTO bot_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import os
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from telegram import InputMediaPhoto
+from telegram.error import RetryAfter
+
+from media_cache import MediaCache
+from metrics import messages_sent, stage_timer
+
+ALBUM_SIZE = 10  # Telegram's send_media_group limit
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))  # messages/s across all chats
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # messages/s per chat
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "4"))
+MAX_SEND_ATTEMPTS = 3
+
+
+@dataclass
+class ChartMessage:
+    caption: str
+    photo: Union[BytesIO, str]  # PNG to upload, or the file_id of an earlier upload
+    media_key: Optional[tuple[str, str]] = None  # (position id, chart key) to cache the upload under
+    render: Optional[Callable[[], BytesIO]] = None  # re-renders the chart if a cached file_id is rejected
+
+
+def as_chart_message(item) -> ChartMessage:
+    return item if isinstance(item, ChartMessage) else ChartMessage(*item)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class DeletionScheduler:
+    """
+    One task that deletes messages when they expire, backed by a heap of
+    (due time, chat id, message id), instead of a sleeping task per message.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, int]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.bot = None
+
+    def schedule(self, bot, chat_id: int, message_id: int, delay: float):
+        self.bot = bot
+        heapq.heappush(self._heap, (time.monotonic() + delay, chat_id, message_id))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while self._heap:
+            due, chat_id, message_id = self._heap[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            try:
+                await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                print(f"❌ Failed to delete message {message_id}: {e}")
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+
+class TelegramDelivery:
+    """
+    Sends (caption, image) results as media-group albums of up to 10 photos.
+    Each chat's albums go out in order under a per-chat rate limit, while
+    different chats are served concurrently (bounded, and under one global
+    token bucket). Sent messages are handed to the deletion scheduler, and
+    the file_id of every freshly uploaded chart is kept in the media cache.
+    """
+
+    def __init__(self, delete_after: float = 300, media_cache: Optional[MediaCache] = None):
+        self.delete_after = delete_after
+        self.media_cache = media_cache
+        self.scheduler = DeletionScheduler()
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(TELEGRAM_CHAT_RATE, 3)
+        return self.chat_buckets[chat_id]
+
+    def schedule_delete(self, bot, chat_id: int, message_id: int):
+        self.scheduler.schedule(bot, chat_id, message_id, self.delete_after)
+
+    async def _with_retry(self, send, items: Sequence[ChartMessage]):
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            for item in items:
+                if hasattr(item.photo, "seek"):
+                    item.photo.seek(0)
+            try:
+                return await send()
+            except RetryAfter as e:
+                delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                print(f"⏳ Telegram flood control, retrying in {delay}s")
+                if attempt == MAX_SEND_ATTEMPTS:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _send_single(self, bot, chat_id: int, item: ChartMessage, parse_mode: str):
+        try:
+            return await self._with_retry(
+                lambda: bot.send_photo(chat_id=chat_id, photo=item.photo, caption=item.caption, parse_mode=parse_mode),
+                [item]
+            )
+        except RetryAfter:
+            raise
+        except Exception as e:
+            if not (isinstance(item.photo, str) and item.render):
+                raise
+            # A cached file_id Telegram no longer accepts: drop it and upload again
+            print(f"⚠️ Cached chart rejected ({e}), uploading again")
+            if self.media_cache and item.media_key:
+                await self.media_cache.aforget(item.media_key[0])
+            item.photo = await asyncio.to_thread(item.render)
+            return await self._send_single(bot, chat_id, item, parse_mode)
+
+    async def _send_album(self, bot, chat_id: int, album: Sequence[ChartMessage], parse_mode: str) -> List[tuple]:
+        """Returns (item, sent message) pairs for every item that went out."""
+        if len(album) == 1:
+            return [(album[0], await self._send_single(bot, chat_id, album[0], parse_mode))]
+
+        try:
+            messages = await self._with_retry(
+                lambda: bot.send_media_group(
+                    chat_id=chat_id,
+                    media=[InputMediaPhoto(media=item.photo, caption=item.caption, parse_mode=parse_mode) for item in album]
+                ),
+                album
+            )
+            return list(zip(album, messages))
+        except RetryAfter:
+            raise
+        except Exception as e:
+            # e.g. one bad caption fails the whole album: fall back photo by photo
+            print(f"⚠️ Album send failed ({e}), sending photos individually")
+            sent = []
+            for item in album:
+                try:
+                    sent.append((item, await self._send_single(bot, chat_id, item, parse_mode)))
+                except Exception as e:
+                    print(f"⚠️ Error sending photo message: {e}")
+            return sent
+
+    async def _remember_upload(self, item: ChartMessage, message):
+        if self.media_cache is None or item.media_key is None or isinstance(item.photo, str):
+            return
+        if getattr(message, "photo", None):
+            # Largest size; Telegram accepts it back for any chat of this bot
+            await self.media_cache.aput(*item.media_key, message.photo[-1].file_id)
+
+    async def _deliver(self, bot, chat_id: int, album: Sequence[ChartMessage], parse_mode: str) -> int:
+        await self._chat_bucket(chat_id).acquire()
+        await self.global_bucket.acquire(len(album))
+        try:
+            with stage_timer("telegram_send"):
+                sent = await self._send_album(bot, chat_id, album, parse_mode)
+        except Exception as e:
+            print(f"⚠️ Error sending photo messages: {e}")
+            messages_sent.inc(len(album), channel="telegram", status="failed")
+            return 0
+
+        messages_sent.inc(len(sent), channel="telegram", status="sent")
+        if len(sent) < len(album):
+            messages_sent.inc(len(album) - len(sent), channel="telegram", status="failed")
+
+        for item, message in sent:
+            await self._remember_upload(item, message)
+            self.schedule_delete(bot, message.chat_id, message.message_id)
+        return len(sent)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(TELEGRAM_SEND_CONCURRENCY)
+        return self._semaphore
+
+    async def send(self, bot, chat_id: int, items: Sequence, parse_mode: str = "MarkdownV2") -> int:
+        """Deliver (caption, image) items to one chat, returns the number of messages sent."""
+        items = [as_chart_message(item) for item in items]
+        sent_count = 0
+        async with self._get_semaphore():
+            for start in range(0, len(items), ALBUM_SIZE):
+                sent_count += await self._deliver(bot, chat_id, items[start:start + ALBUM_SIZE], parse_mode)
+        return sent_count
+
+    async def send_stream(self, bot, chat_id: int, stream: AsyncIterator, parse_mode: str = "MarkdownV2") -> int:
+        """
+        Deliver items while the producer is still yielding them. The first
+        item goes out on its own; whatever piles up during a send is sent
+        next as one album.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for item in stream:
+                    await queue.put(as_chart_message(item))
+            finally:
+                await queue.put(done)
+
+        producer = asyncio.create_task(produce())
+        sent_count = 0
+        finished = False
+        try:
+            async with self._get_semaphore():
+                while not finished:
+                    album = [await queue.get()]
+                    while len(album) < ALBUM_SIZE and not queue.empty():
+                        album.append(queue.get_nowait())
+                    if album[-1] is done:
+                        album.pop()
+                        finished = True
+                    if album:
+                        sent_count += await self._deliver(bot, chat_id, album, parse_mode)
+        finally:
+            if not producer.done():
+                producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        return sent_count
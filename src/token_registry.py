@@ -0,0 +1,115 @@
+import asyncio
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, Iterable, List
+
+from alert_db import DB_PATH
+from data_models import Token
+from metrics import record_cache
+from state_db import connect
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+# fetch(addresses) -> [Token, ...] in the same order, one RPC batch
+TokenFetcher = Callable[[List[str]], List[Token]]
+
+
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    address TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    decimals INTEGER NOT NULL
+)
+"""
+
+
+class TokenRegistry:
+    """
+    Process-wide symbol/decimals cache. ERC20 metadata never changes, so
+    entries live in an in-memory LRU backed by the `tokens` table and only
+    cache misses ever reach the RPC, deduplicated into a single batch.
+    """
+
+    def __init__(self, fetch_func: TokenFetcher, max_size: int = TOKEN_CACHE_SIZE, db_path: str = DB_PATH):
+        self.fetch_func = fetch_func
+        self.max_size = max_size
+        self.db_path = db_path
+        self._cache: "OrderedDict[str, Token]" = OrderedDict()
+        self._lock = Lock()
+
+    def _remember(self, address: str, token: Token):
+        self._cache[address] = token
+        self._cache.move_to_end(address)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def warm(self) -> int:
+        """Load persisted tokens into memory, returns the number loaded."""
+        with connect(self.db_path, TABLE_SCHEMA) as conn:
+            rows = conn.execute("SELECT address, symbol, decimals FROM tokens LIMIT ?", (self.max_size,)).fetchall()
+
+        with self._lock:
+            for address, symbol, decimals in rows:
+                self._remember(address, Token(symbol, decimals))
+
+        print(f"🪙 Token registry warmed with {len(rows)} tokens")
+        return len(rows)
+
+    def _lookup(self, addresses: Iterable[str]) -> tuple[List[str], Dict[str, Token], List[str]]:
+        wanted = list(dict.fromkeys(address.lower() for address in addresses))
+        found = {}
+
+        with self._lock:
+            for address in wanted:
+                if address in self._cache:
+                    self._cache.move_to_end(address)
+                    found[address] = self._cache[address]
+
+        missing = [address for address in wanted if address not in found]
+        if missing:
+            with connect(self.db_path, TABLE_SCHEMA) as conn:
+                placeholders = ",".join("?" * len(missing))
+                rows = conn.execute(
+                    f"SELECT address, symbol, decimals FROM tokens WHERE address IN ({placeholders})", missing
+                ).fetchall()
+            for address, symbol, decimals in rows:
+                found[address] = Token(symbol, decimals)
+            missing = [address for address in missing if address not in found]
+
+        record_cache("tokens", hits=len(found), misses=len(missing))
+        return wanted, found, missing
+
+    def _store(self, wanted: List[str], found: Dict[str, Token], missing: List[str], fetched: List[Token]) -> Dict[str, Token]:
+        if missing:
+            with connect(self.db_path, TABLE_SCHEMA) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO tokens (address, symbol, decimals) VALUES (?, ?, ?)",
+                    [(address, token.symbol, token.decimals) for address, token in zip(missing, fetched)]
+                )
+            found.update(zip(missing, fetched))
+
+        with self._lock:
+            for address in wanted:
+                self._remember(address, found[address])
+
+        return found
+
+    def resolve(self, addresses: Iterable[str]) -> Dict[str, Token]:
+        wanted, found, missing = self._lookup(addresses)
+        fetched = self.fetch_func(missing) if missing else []
+        return self._store(wanted, found, missing, fetched)
+
+    async def aresolve(self, addresses: Iterable[str], afetch_func) -> Dict[str, Token]:
+        """Same as resolve(), fetching misses with the coroutine function `afetch_func`."""
+        # Misses are looked up in and written to SQLite, both off the event loop
+        wanted, found, missing = await asyncio.to_thread(self._lookup, addresses)
+        fetched = await afetch_func(missing) if missing else []
+        return await asyncio.to_thread(self._store, wanted, found, missing, fetched)
+
+    def get(self, address: str) -> Token:
+        return self.resolve([address])[address.lower()]
+
+    def get_pair(self, token0: str, token1: str) -> tuple[Token, Token]:
+        tokens = self.resolve([token0, token1])
+        return (tokens[token0.lower()], tokens[token1.lower()])